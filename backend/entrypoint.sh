@@ -29,6 +29,5 @@ END
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
 
-# Start server
-echo "Starting Django server..."
-exec python manage.py runserver 0.0.0.0:8000
+# Run the container's command (the ASGI server by default, see the Dockerfile's CMD)
+exec "$@"
@@ -5,6 +5,7 @@ Django settings for inspection_backend project.
 import os
 from pathlib import Path
 from datetime import timedelta
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -43,6 +44,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third party apps
     'rest_framework',
@@ -58,6 +60,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'inspections.middleware.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -65,6 +68,9 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'inspections.middleware.IdempotencyMiddleware',
+    'inspections.middleware.ReplicaRoutingMiddleware',
+    'inspections.middleware.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'inspection_backend.urls'
@@ -101,6 +107,24 @@ DATABASES = {
     }
 }
 
+# Read replicas, e.g. DB_REPLICA_HOSTS=replica-1,replica-2:5433 (same credentials as the primary).
+# Safe reads are routed to them by inspections.db_router.
+DATABASE_REPLICAS = []
+for _index, _host in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    _host, _, _port = _host.strip().partition(':')
+    DATABASES[f'replica_{_index}'] = {
+        **DATABASES['default'],
+        'HOST': _host,
+        'PORT': _port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{_index}')
+
+DATABASE_ROUTERS = ['inspections.db_router.PrimaryReplicaRouter']
+
+# Seconds a user's reads stay on the primary after they write (must exceed replication lag)
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '15'))
+
 
 # Custom User Model
 AUTH_USER_MODEL = 'inspections.User'
@@ -165,7 +189,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'inspections.authentication.CachedUserJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -174,11 +198,20 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
-        'rest_framework.filters.SearchFilter',
-        'rest_framework.filters.OrderingFilter',
+        'inspections.search.FullTextSearchFilter',
+        'inspections.search.SearchRankOrderingFilter',
     ),
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
+        'inspections.renderers.ORJSONRenderer',
+        'inspections.renderers.MessagePackRenderer',
+        'inspections.renderers.LegacyMessagePackRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'inspections.parsers.ORJSONParser',
+        'inspections.parsers.MessagePackParser',
+        'inspections.parsers.LegacyMessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
@@ -246,6 +279,7 @@ ADMIN_SECTIONS = [
         [
             'User',
             'Client',
+            'ClientMembership',
             'Person',
             'PersonCredential',
             'CompetenceAuthorization',
@@ -298,8 +332,87 @@ SIMPLE_JWT.update({
     'USER_ID_CLAIM': 'user_id',
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
+    # Access tokens carry `role` and `client_ids` claims
+    'TOKEN_OBTAIN_SERIALIZER': 'inspections.authentication.RoleTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'inspections.authentication.RoleTokenRefreshSerializer',
 })
 
+# Seconds an authenticated user's snapshot (row + client memberships) is cached in Redis.
+# Saving the user or their memberships drops it immediately.
+AUTH_USER_CACHE_SECONDS = int(os.getenv('AUTH_USER_CACHE_SECONDS', '300'))
+
+# Query budgets: record SQL per request, flag N+1 shapes and fail requests over budget.
+# Viewsets can override the default with a `query_budget` int or {action: int} dict.
+QUERY_BUDGET_ENABLED = os.getenv('QUERY_BUDGET_ENABLED', str(DEBUG)) == 'True'
+QUERY_BUDGET_DEFAULT = int(os.getenv('QUERY_BUDGET_DEFAULT', '50'))
+QUERY_BUDGET_N_PLUS_ONE_THRESHOLD = 5
+
+# Operations dashboard: credentials expiring within this many days are flagged
+DASHBOARD_EXPIRY_WINDOW_DAYS = int(os.getenv('DASHBOARD_EXPIRY_WINDOW_DAYS', '30'))
+
+# Batch API: maximum number of sub-requests per /api/batch/ call
+BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', '25'))
+
+# Bulk answer upsert: maximum answers per /api/inspections/{id}/answers/ call
+INSPECTION_ANSWERS_MAX = int(os.getenv('INSPECTION_ANSWERS_MAX', '500'))
+
+# Approvals inbox: maximum decisions per /api/inspections/decisions/ call
+INSPECTION_DECISIONS_MAX = int(os.getenv('INSPECTION_DECISIONS_MAX', '200'))
+
+# Bulk equipment upsert: maximum rows per /api/equipment/bulk/ call and rows validated/written per chunk
+EQUIPMENT_BULK_MAX = int(os.getenv('EQUIPMENT_BULK_MAX', '50000'))
+EQUIPMENT_BULK_CHUNK_SIZE = int(os.getenv('EQUIPMENT_BULK_CHUNK_SIZE', '1000'))
+
+# Register imports (XLSX/CSV): upload size and row limits, rows validated and loaded
+# per chunk, and how many row errors a failed import reports
+IMPORT_MAX_UPLOAD_BYTES = int(os.getenv('IMPORT_MAX_UPLOAD_BYTES', str(100 * 1024 * 1024)))
+IMPORT_MAX_ROWS = int(os.getenv('IMPORT_MAX_ROWS', '500000'))
+IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', '5000'))
+IMPORT_MAX_ERRORS = int(os.getenv('IMPORT_MAX_ERRORS', '1000'))
+
+# CSV/XLSX exports of list endpoints: rows fetched per server-side cursor round trip
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '2000'))
+
+# Delta sync: rows per entity per call, how long deletions are remembered, and how
+# long fresh writes are held back so late-committing transactions aren't skipped
+SYNC_PAGE_SIZE = int(os.getenv('SYNC_PAGE_SIZE', '500'))
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv('SYNC_TOMBSTONE_RETENTION_DAYS', '30'))
+SYNC_SETTLE_SECONDS = int(os.getenv('SYNC_SETTLE_SECONDS', '10'))
+
+# Lists using EstimatedCountPagination count exactly below this many (estimated) rows
+PAGINATION_EXACT_COUNT_THRESHOLD = int(os.getenv('PAGINATION_EXACT_COUNT_THRESHOLD', '10000'))
+
+# Async endpoints: Redis cache for verification/resolve payloads and signed download URLs
+ASYNC_CACHE_URL = os.getenv('ASYNC_CACHE_URL', 'redis://localhost:6379/1')
+ASYNC_CACHE_SECONDS = int(os.getenv('ASYNC_CACHE_SECONDS', '60'))
+ASYNC_CACHE_TIMEOUT_SECONDS = float(os.getenv('ASYNC_CACHE_TIMEOUT_SECONDS', '0.5'))
+STORAGE_SIGNED_URL_SECONDS = int(os.getenv('STORAGE_SIGNED_URL_SECONDS', '900'))
+
+# Idempotency-Key support for POST requests: how long a completed response is replayed,
+# and how long a key stays claimed by a request that never finishes (e.g. a killed worker)
+IDEMPOTENCY_KEY_SECONDS = int(os.getenv('IDEMPOTENCY_KEY_SECONDS', '86400'))
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv('IDEMPOTENCY_LOCK_SECONDS', '300'))
+
+# Serve model serializer output from compiled read paths (see inspections.compiled_serializers)
+COMPILED_SERIALIZERS = os.getenv('COMPILED_SERIALIZERS', 'True') == 'True'
+
+# Response compression (brotli/gzip negotiated per request)
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+COMPRESSION_EXCLUDED_CONTENT_TYPES = [
+    'image/',
+    'video/',
+    'audio/',
+    'font/woff',
+    'application/pdf',
+    'application/zip',
+    'application/gzip',
+    'application/x-gzip',
+    'application/octet-stream',
+    'application/vnd.openxmlformats-officedocument.',
+]
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = _split_env_list('CORS_ALLOWED_ORIGINS') or [
     'http://localhost:3000',
@@ -307,6 +420,8 @@ CORS_ALLOWED_ORIGINS = _split_env_list('CORS_ALLOWED_ORIGINS') or [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed']
 
 
 # Celery Configuration
@@ -316,6 +431,17 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    # Recompute the dated dashboard counters from the source tables
+    'refresh-dashboard-rollups': {
+        'task': 'inspections.tasks.refresh_dashboard_rollups',
+        'schedule': int(os.getenv('DASHBOARD_REFRESH_SECONDS', '900')),
+    },
+    'purge-sync-tombstones': {
+        'task': 'inspections.tasks.purge_sync_tombstones',
+        'schedule': 24 * 60 * 60,
+    },
+}
 
 
 # Email Configuration
@@ -333,6 +459,10 @@ COMPANY_NAME = 'Times United'
 COMPANY_FULL_NAME = 'Times United Verifications & Inspections'
 COMPANY_DIVISION = 'Inspection Division'
 STICKER_CODE_PREFIX = 'TUVINSP'
+# Sticker generation: batches above STICKER_GENERATE_SYNC_MAX run as a Celery task
+STICKER_GENERATE_SYNC_MAX = int(os.getenv('STICKER_GENERATE_SYNC_MAX', '1000'))
+STICKER_GENERATE_MAX = int(os.getenv('STICKER_GENERATE_MAX', '100000'))
+STICKER_BULK_CHUNK_SIZE = int(os.getenv('STICKER_BULK_CHUNK_SIZE', '2000'))
 CERTIFICATE_RETENTION_YEARS = 10
 
 # Storage Configuration (MinIO / S3)
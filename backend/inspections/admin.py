@@ -3,7 +3,7 @@ from django.conf import settings
 from collections import OrderedDict
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from .models import (
-    User, Client, Equipment, JobOrder, JobLineItem,
+    User, Client, ClientMembership, Equipment, JobOrder, JobLineItem,
     Inspection, InspectionAnswer, PhotoRef, Certificate,
     Sticker, FieldInspectionReport, Approval, Publication,
     Tool, Calibration, AuditLog, CompetenceAuthorization,
@@ -99,6 +99,15 @@ class ClientAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at', 'updated_at', 'created_by', 'updated_by']
 
 
+@admin.register(ClientMembership, site=inspection_admin_site)
+class ClientMembershipAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'client', 'created_at']
+    list_filter = ['client']
+    search_fields = ['user__username', 'user__email', 'client__name']
+    autocomplete_fields = ['user', 'client']
+    readonly_fields = ['created_at', 'updated_at']
+
+
 @admin.register(Service, site=inspection_admin_site)
 class ServiceAdmin(admin.ModelAdmin):
     list_display = ['id', 'code', 'name_en', 'category', 'status', 'discipline']
@@ -0,0 +1,108 @@
+"""
+Redis cache for the async endpoints
+
+Reads and writes go through `redis.asyncio`, so a cache hit never leaves the
+event loop. Clients are kept per event loop because an asyncio connection
+pool is bound to the loop that created it. The cache is an accelerator
+only: when Redis is unreachable every call degrades to a miss.
+"""
+import asyncio
+import logging
+import weakref
+
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+from django.db import router, transaction
+
+from .models import Sticker
+from .renderers import ORJSONRenderer
+
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'inspections:async'
+
+_async_clients = weakref.WeakKeyDictionary()
+_sync_client = None
+
+
+def cache_key(kind, value):
+    return f'{KEY_PREFIX}:{kind}:{value}'
+
+
+def get_async_client(url=None):
+    """Async Redis client for `url` (ASYNC_CACHE_URL by default) bound to the running loop"""
+    url = url or settings.ASYNC_CACHE_URL
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get(url)
+    if client is None:
+        client = clients[url] = aioredis.from_url(
+            url,
+            socket_timeout=settings.ASYNC_CACHE_TIMEOUT_SECONDS,
+            socket_connect_timeout=settings.ASYNC_CACHE_TIMEOUT_SECONDS,
+        )
+    return client
+
+
+async def get_json(key):
+    """Cached JSON bytes for `key`, or None on a miss or cache error"""
+    try:
+        return await get_async_client().get(key)
+    except (redis.RedisError, OSError) as e:
+        logger.warning('Async cache read failed for %s: %s', key, e)
+        return None
+
+
+async def set_json(key, data, timeout=None):
+    """Cache `data` as JSON for `timeout` seconds and return the encoded bytes"""
+    content = ORJSONRenderer().render(data)
+    try:
+        await get_async_client().set(key, content, ex=timeout or settings.ASYNC_CACHE_SECONDS)
+    except (redis.RedisError, OSError) as e:
+        logger.warning('Async cache write failed for %s: %s', key, e)
+    return content
+
+
+def get_sync_client():
+    """Blocking Redis client for ASYNC_CACHE_URL, for use from sync code"""
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = redis.Redis.from_url(
+            settings.ASYNC_CACHE_URL,
+            socket_timeout=settings.ASYNC_CACHE_TIMEOUT_SECONDS,
+            socket_connect_timeout=settings.ASYNC_CACHE_TIMEOUT_SECONDS,
+        )
+    return _sync_client
+
+
+def _delete(keys):
+    try:
+        get_sync_client().delete(*keys)
+    except (redis.RedisError, OSError) as e:
+        logger.warning('Async cache invalidation failed for %s: %s', ', '.join(keys), e)
+
+
+def invalidate(*keys, using=None):
+    """
+    Drop cached payloads once the current transaction on database `using`
+    (the default one if not given) commits, so a reader can't re-cache the
+    rows it replaces before they are visible. Called from sync code.
+    """
+    if keys:
+        transaction.on_commit(lambda: _delete(keys), using=using)
+
+
+def invalidate_stickers(using=None, **lookup):
+    """
+    Drop the cached resolve payloads of the stickers matching `lookup`. A
+    payload embeds the assigned equipment with its latest certificate and
+    inspection history. Equipment edits and the inspection workflow steps
+    (assign, submit, decide, certificate, publish) call this; answer and photo
+    edits in between only show once the entry expires.
+    """
+    # Read where the write went, so a lagging replica can't hide a sticker
+    codes = Sticker.objects.using(using or router.db_for_write(Sticker)).filter(
+        **lookup
+    ).values_list('sticker_code', flat=True)
+    invalidate(*(cache_key('sticker', code) for code in codes), using=using)
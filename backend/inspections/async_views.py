@@ -0,0 +1,313 @@
+"""
+Async views for I/O-bound endpoints
+
+Certificate and FIR verification, sticker resolve, storage URL signing and
+task status are hit by QR scans and polling clients far more often than
+anything else, and spend their time waiting on the database or Redis. These
+views run natively under ASGI: payloads are served from the async Redis
+cache when possible and misses use the async ORM with every related row
+loaded up front, so a worker's event loop keeps serving other requests
+while these wait.
+
+They answer on the same URLs as the viewset actions they replace (see
+urls.py) and render through the API's renderers, so JSON and MessagePack
+clients get identical payloads.
+"""
+import inspect
+import uuid
+from functools import cache
+
+import orjson
+import redis
+from asgiref.sync import sync_to_async
+from celery.result import AsyncResult
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import models
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from . import async_cache
+from .authentication import aget_snapshot, user_from_snapshot
+from .models import Certificate, FieldInspectionReport, Inspection, Sticker
+from .renderers import ORJSONRenderer
+from .serializers import (
+    CertificateSerializer, EquipmentSerializer, FieldInspectionReportSerializer,
+    InspectionSerializer, StickerSerializer
+)
+
+
+_negotiator = DefaultContentNegotiation()
+
+INSPECTION_RELATED = ('inspector', 'job_line_item__equipment__client')
+INSPECTION_PREFETCH = ('answers__photos', 'photos')
+
+
+def render(request, data=None, status_code=status.HTTP_200_OK, json_content=None):
+    """
+    Render `data` with the renderer the client negotiated, like a DRF Response.
+
+    `json_content` is already-encoded JSON for `data` (a cache hit); it is sent
+    as is to JSON clients and only decoded for the others.
+    """
+    renderers = [renderer_class() for renderer_class in api_settings.DEFAULT_RENDERER_CLASSES]
+    try:
+        renderer, media_type = _negotiator.select_renderer(Request(request), renderers)
+    except NotAcceptable:
+        renderer, media_type = renderers[0], renderers[0].media_type
+
+    if json_content is not None and isinstance(renderer, ORJSONRenderer):
+        content = json_content
+    else:
+        if json_content is not None:
+            data = orjson.loads(json_content)
+        content = renderer.render(data, media_type, {})
+
+    content_type = media_type if renderer.charset is None else f'{media_type}; charset={renderer.charset}'
+    return HttpResponse(content, status=status_code, content_type=content_type)
+
+
+def error(request, message, status_code):
+    return render(request, {'error': message}, status_code)
+
+
+def not_found(request, model):
+    return render(
+        request,
+        {'detail': f'No {model._meta.object_name} matches the given query.'},
+        status.HTTP_404_NOT_FOUND,
+    )
+
+
+async def authenticate(request):
+    """
+    Return (user, None) for a valid JWT or (None, 401 response).
+
+    Token validation is pure CPU and the user comes from the snapshot cache.
+    """
+    authenticator = JWTAuthentication()
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return None, unauthorized(request, 'Authentication credentials were not provided.')
+
+    try:
+        validated_token = authenticator.get_validated_token(raw_token)
+        user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+    except (InvalidToken, TokenError, KeyError):
+        return None, unauthorized(request, 'Given token not valid for any token type')
+
+    snapshot = await aget_snapshot(user_id)
+    if snapshot is None:
+        return None, unauthorized(request, 'User not found')
+    if not snapshot['is_active']:
+        return None, unauthorized(request, 'User is inactive')
+    return user_from_snapshot(snapshot), None
+
+
+def unauthorized(request, detail):
+    response = render(request, {'detail': detail}, status.HTTP_401_UNAUTHORIZED)
+    response.headers['WWW-Authenticate'] = 'Bearer realm="api"'
+    return response
+
+
+def parse_token(value):
+    try:
+        return uuid.UUID(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@require_GET
+async def certificate_public(request):
+    """Public certificate view via share token"""
+    token = request.GET.get('token')
+    if not token:
+        return error(request, 'Token is required', status.HTTP_400_BAD_REQUEST)
+    token = parse_token(token)
+    if token is None:
+        return not_found(request, Certificate)
+
+    key = async_cache.cache_key('certificate', token)
+    cached = await async_cache.get_json(key)
+    if cached is not None:
+        return render(request, json_content=cached)
+
+    certificate = await Certificate.objects.select_related(
+        'inspection__job_line_item__equipment__client',
+        'inspection__inspector',
+        'generated_by',
+    ).prefetch_related(
+        'inspection__answers__photos', 'inspection__photos'
+    ).filter(share_link_token=token, status='PUBLISHED').afirst()
+    if certificate is None:
+        return not_found(request, Certificate)
+
+    data = CertificateSerializer(certificate, context={'request': request}).data
+    return render(request, json_content=await async_cache.set_json(key, data))
+
+
+@require_GET
+async def field_report_public(request):
+    """Public access to shared FIR via share token"""
+    token = request.GET.get('token')
+    if not token:
+        return error(request, 'Token is required', status.HTTP_400_BAD_REQUEST)
+    token = parse_token(token)
+    if token is None:
+        return not_found(request, FieldInspectionReport)
+
+    key = async_cache.cache_key('field_report', token)
+    cached = await async_cache.get_json(key)
+    if cached is not None:
+        return render(request, json_content=cached)
+
+    report = await FieldInspectionReport.objects.select_related(
+        'job_order__client'
+    ).prefetch_related('job_order__line_items').filter(share_link_token=token).afirst()
+    if report is None:
+        return not_found(request, FieldInspectionReport)
+
+    data = FieldInspectionReportSerializer(report, context={'request': request}).data
+    return render(request, json_content=await async_cache.set_json(key, data))
+
+
+@require_GET
+async def sticker_resolve(request, code):
+    """Resolve sticker code to equipment and certificate info"""
+    _, response = await authenticate(request)
+    if response is not None:
+        return response
+
+    key = async_cache.cache_key('sticker', code)
+    cached = await async_cache.get_json(key)
+    if cached is not None:
+        return render(request, json_content=cached)
+
+    sticker = await Sticker.objects.select_related(
+        'assigned_equipment__client', 'assigned_by'
+    ).filter(sticker_code=code).afirst()
+    if sticker is None:
+        return not_found(request, Sticker)
+
+    data = {
+        'sticker': StickerSerializer(sticker).data,
+        'equipment': None,
+        'latest_certificate': None,
+        'inspection_history': [],
+    }
+
+    equipment = sticker.assigned_equipment
+    if equipment:
+        data['equipment'] = EquipmentSerializer(equipment).data
+        inspections = Inspection.objects.filter(
+            job_line_item__equipment=equipment
+        ).select_related(*INSPECTION_RELATED).prefetch_related(*INSPECTION_PREFETCH).order_by('-created_at')
+
+        latest_inspection = await inspections.filter(status='APPROVED').select_related(
+            'certificate__generated_by'
+        ).afirst()
+        certificate = getattr(latest_inspection, 'certificate', None) if latest_inspection else None
+        if certificate:
+            data['latest_certificate'] = CertificateSerializer(certificate).data
+
+        history = [inspection async for inspection in inspections[:5]]
+        data['inspection_history'] = InspectionSerializer(history, many=True).data
+
+    return render(request, json_content=await async_cache.set_json(key, data))
+
+
+@cache
+def upload_prefixes():
+    """Storage prefixes the API's file fields upload to"""
+    prefixes = set()
+    for model in apps.get_app_config('inspections').get_models():
+        for field in model._meta.get_fields():
+            if isinstance(field, models.FileField) and isinstance(field.upload_to, str) and field.upload_to:
+                prefixes.add(field.upload_to.rstrip('/') + '/')
+    return tuple(sorted(prefixes))
+
+
+@require_GET
+async def sign_storage_url(request):
+    """Short-lived download URL for a stored file"""
+    user, response = await authenticate(request)
+    if response is not None:
+        return response
+    if user.role == 'CLIENT':
+        return render(
+            request,
+            {'detail': 'You do not have permission to perform this action.'},
+            status.HTTP_403_FORBIDDEN,
+        )
+
+    path = request.GET.get('path', '')
+    if not path:
+        return error(request, 'Path is required', status.HTTP_400_BAD_REQUEST)
+    if '..' in path.split('/') or path.startswith('/') or not path.startswith(upload_prefixes()):
+        return error(request, 'Path is not a stored upload', status.HTTP_400_BAD_REQUEST)
+
+    # Signing is computed locally (no request to the object store)
+    expires_in = settings.STORAGE_SIGNED_URL_SECONDS
+    if 'expire' in inspect.signature(default_storage.url).parameters:
+        url = default_storage.url(path, expire=expires_in)
+    else:
+        url, expires_in = default_storage.url(path), None
+
+    return render(request, {'path': path, 'url': request.build_absolute_uri(url), 'expires_in': expires_in})
+
+
+async def read_task_result(task_id):
+    """(status, result) of a Celery task, read straight from a Redis result backend"""
+    backend_url = settings.CELERY_RESULT_BACKEND
+    if not backend_url.startswith(('redis://', 'rediss://')):
+        result = AsyncResult(task_id)
+        state = await sync_to_async(lambda: result.state, thread_sensitive=False)()
+        return state, await sync_to_async(lambda: result.result, thread_sensitive=False)()
+
+    meta = await async_cache.get_async_client(backend_url).get(f'celery-task-meta-{task_id}')
+    if meta is None:
+        return 'PENDING', None
+    meta = orjson.loads(meta)
+    return meta.get('status', 'PENDING'), meta.get('result')
+
+
+@require_GET
+async def task_status(request, task_id):
+    """State and result of a background task"""
+    user, response = await authenticate(request)
+    if response is not None:
+        return response
+    if user.role == 'CLIENT':
+        return render(
+            request,
+            {'detail': 'You do not have permission to perform this action.'},
+            status.HTTP_403_FORBIDDEN,
+        )
+
+    try:
+        state, result = await read_task_result(task_id)
+    except (redis.RedisError, OSError):
+        return error(request, 'Task status is temporarily unavailable', status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    data = {'task_id': task_id, 'status': state, 'result': None}
+    if state == 'SUCCESS':
+        data['result'] = result
+    elif state == 'PROGRESS':
+        data['progress'] = result
+    elif state == 'FAILURE':
+        # The Redis backend stores exceptions as {'exc_type', 'exc_message': [args]}
+        if isinstance(result, dict):
+            message = result.get('exc_message')
+            result = ' '.join(map(str, message)) if isinstance(message, (list, tuple)) else message
+        data['error'] = str(result)
+    return render(request, data)
@@ -0,0 +1,186 @@
+"""
+JWT authentication served from cached user snapshots
+
+Access tokens carry the user's `role` and `client_ids` (the clients a CLIENT
+user may see; empty for staff) so frontends and other token consumers need
+no extra lookup. On the server, `CachedUserJWTAuthentication` builds `request.user` from a
+snapshot of the user's row and memberships kept in Redis for
+AUTH_USER_CACHE_SECONDS, so an authenticated request touches the database
+only for its own work.
+
+The snapshot, not the token, is authoritative: saving a user or changing
+their client memberships drops it once the change commits (signals.py), so
+role and is_active changes apply on the next request rather than when the
+token expires.
+"""
+import logging
+
+import orjson
+import redis
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import (
+    SimpleJWTScheme, TokenObtainPairSerializerExtension, TokenRefreshSerializerExtension
+)
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import async_cache
+from .db_router import use_primary
+from .models import ClientMembership, User
+
+
+logger = logging.getLogger(__name__)
+
+# User columns kept in a snapshot; anything else is loaded on first access
+SNAPSHOT_FIELDS = (
+    'id', 'username', 'email', 'first_name', 'last_name', 'role',
+    'competence', 'phone', 'is_active', 'is_staff', 'is_superuser',
+)
+
+
+def snapshot_key(user_id):
+    return async_cache.cache_key('user', user_id)
+
+
+def _read_snapshot(user_id):
+    """Snapshot from the database (the primary, so a fresh change is never re-cached stale)"""
+    with use_primary():
+        row = User.objects.filter(pk=user_id).values(*SNAPSHOT_FIELDS).first()
+        if row is None:
+            return None
+        row['client_ids'] = list(
+            ClientMembership.objects.filter(user_id=user_id).values_list('client_id', flat=True)
+        ) if row['role'] == User.Role.CLIENT else []
+    return row
+
+
+async def _aread_snapshot(user_id):
+    with use_primary():
+        row = await User.objects.filter(pk=user_id).values(*SNAPSHOT_FIELDS).afirst()
+        if row is None:
+            return None
+        row['client_ids'] = [
+            client_id async for client_id in
+            ClientMembership.objects.filter(user_id=user_id).values_list('client_id', flat=True)
+        ] if row['role'] == User.Role.CLIENT else []
+    return row
+
+
+def get_snapshot(user_id):
+    """User snapshot dict for `user_id`, or None if there is no such user"""
+    key = snapshot_key(user_id)
+    client = async_cache.get_sync_client()
+    try:
+        cached = client.get(key)
+    except (redis.RedisError, OSError) as e:
+        logger.warning('User snapshot read failed for %s: %s', user_id, e)
+        return _read_snapshot(user_id)
+    if cached is not None:
+        return orjson.loads(cached)
+
+    snapshot = _read_snapshot(user_id)
+    if snapshot is not None:
+        try:
+            client.set(key, orjson.dumps(snapshot), ex=settings.AUTH_USER_CACHE_SECONDS)
+        except (redis.RedisError, OSError) as e:
+            logger.warning('User snapshot write failed for %s: %s', user_id, e)
+    return snapshot
+
+
+async def aget_snapshot(user_id):
+    key = snapshot_key(user_id)
+    client = async_cache.get_async_client()
+    try:
+        cached = await client.get(key)
+    except (redis.RedisError, OSError) as e:
+        logger.warning('User snapshot read failed for %s: %s', user_id, e)
+        return await _aread_snapshot(user_id)
+    if cached is not None:
+        return orjson.loads(cached)
+
+    snapshot = await _aread_snapshot(user_id)
+    if snapshot is not None:
+        try:
+            await client.set(key, orjson.dumps(snapshot), ex=settings.AUTH_USER_CACHE_SECONDS)
+        except (redis.RedisError, OSError) as e:
+            logger.warning('User snapshot write failed for %s: %s', user_id, e)
+    return snapshot
+
+
+def user_from_snapshot(snapshot):
+    """
+    A User instance for `snapshot`. Columns outside the snapshot are deferred,
+    so they load on access and `save()` writes only the snapshot columns.
+    """
+    # from_db expects values in concrete field order
+    names = [field.attname for field in User._meta.concrete_fields if field.attname in snapshot]
+    user = User.from_db(DEFAULT_DB_ALIAS, names, [snapshot[name] for name in names])
+    user._snapshot_client_ids = snapshot['client_ids']
+    return user
+
+
+def invalidate_snapshot(user_id, using=None):
+    """Drop the snapshot once the transaction on `using` that changed it commits"""
+    async_cache.invalidate(snapshot_key(user_id), using=using)
+
+
+class CachedUserJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that serves the user from the snapshot cache"""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        snapshot = get_snapshot(user_id)
+        if snapshot is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if not snapshot['is_active']:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user_from_snapshot(snapshot)
+
+
+class RoleRefreshToken(RefreshToken):
+    """Refresh token whose access tokens carry the user's current role and client scope"""
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        snapshot = get_snapshot(self[jwt_settings.USER_ID_CLAIM])
+        if snapshot is not None:
+            access['role'] = snapshot['role']
+            access['client_ids'] = snapshot['client_ids']
+        return access
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RoleRefreshToken
+
+    class Meta:
+        ref_name = 'TokenObtainPair'
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RoleRefreshToken
+
+    class Meta:
+        ref_name = 'TokenRefresh'
+
+
+# Document the subclasses like simplejwt's own classes
+class CachedUserJWTScheme(SimpleJWTScheme):
+    target_class = CachedUserJWTAuthentication
+
+
+class RoleTokenObtainPairSerializerExtension(TokenObtainPairSerializerExtension):
+    target_class = RoleTokenObtainPairSerializer
+
+
+class RoleTokenRefreshSerializerExtension(TokenRefreshSerializerExtension):
+    target_class = RoleTokenRefreshSerializer
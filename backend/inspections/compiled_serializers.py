@@ -0,0 +1,247 @@
+"""
+Compiled read paths for model serializers
+
+DRF's `Serializer.to_representation` re-dispatches every field on every row:
+it walks `_readable_fields`, calls `get_attribute` through the generic source
+resolver, wraps foreign keys in `PKOnlyObject` and then calls the field's
+`to_representation`. For large list pages that dispatch dominates the cost.
+
+`compile_representation` turns a bound serializer into a flat function that
+reads plain model columns and foreign key ids straight off the instance and
+only falls back to the field's own `get_attribute`/`to_representation` where
+DRF behaviour can't be reproduced with a plain attribute read. The output is
+identical to the uncompiled serializer.
+"""
+import inspect
+from collections.abc import Mapping
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist
+from rest_framework import ISO_8601
+from rest_framework import fields as drf_fields
+from rest_framework import relations, serializers
+from rest_framework.fields import SkipField, is_simple_callable
+from rest_framework.relations import PKOnlyObject
+from rest_framework.settings import api_settings
+
+
+# Per serializer class: ((field_name, kind, attname), ...)
+_plan_cache = {}
+
+# Per (function, bound): whether DRF would call it as a zero-argument source
+_simple_callable_cache = {}
+
+_ATTR = 'attr'
+_PK = 'pk'
+_METHOD = 'method'
+_FIELD = 'field'
+
+
+def _model_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+def _classify(field, model):
+    """Return (kind, attname) describing how `field` can be read off an instance"""
+    if isinstance(field, drf_fields.SerializerMethodField):
+        return _METHOD, None
+
+    if model is None or len(field.source_attrs) != 1:
+        return _FIELD, None
+
+    model_field = _model_field(model, field.source_attrs[0])
+    if model_field is None or not getattr(model_field, 'concrete', False):
+        return _FIELD, None
+
+    if (
+        type(field) is relations.PrimaryKeyRelatedField
+        and field.pk_field is None
+        and model_field.is_relation
+        and (model_field.many_to_one or model_field.one_to_one)
+    ):
+        return _PK, model_field.attname
+
+    if (
+        not model_field.is_relation
+        and model_field.attname == field.source_attrs[0]
+        and type(field).get_attribute is drf_fields.Field.get_attribute
+        and not isinstance(field, serializers.BaseSerializer)
+    ):
+        return _ATTR, model_field.attname
+
+    return _FIELD, None
+
+
+def _get_plan(serializer, readable):
+    key = (type(serializer), tuple(field.field_name for field in readable))
+    plan = _plan_cache.get(key)
+    if plan is None:
+        model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+        plan = tuple(
+            (field.field_name,) + _classify(field, model)
+            for field in readable
+        )
+        _plan_cache[key] = plan
+    return plan
+
+
+def _is_simple_callable(value):
+    """`is_simple_callable` with the signature inspection memoised per function"""
+    if not callable(value):
+        return False
+    if not (inspect.isfunction(value) or inspect.ismethod(value)):
+        return is_simple_callable(value)
+    key = (getattr(value, '__func__', value), inspect.ismethod(value))
+    result = _simple_callable_cache.get(key)
+    if result is None:
+        result = _simple_callable_cache[key] = is_simple_callable(value)
+    return result
+
+
+def _source_getter(field):
+    """
+    Equivalent of `field.get_attribute` for dotted sources.
+
+    Any lookup error is replayed through DRF's own `get_attribute` so defaults,
+    SkipField and error messages stay exactly the same.
+    """
+    attrs = tuple(field.source_attrs)
+
+    def get_attribute(instance):
+        value = instance
+        try:
+            for attr in attrs:
+                try:
+                    if isinstance(value, Mapping):
+                        value = value[attr]
+                    else:
+                        value = getattr(value, attr)
+                except ObjectDoesNotExist:
+                    return None
+                if _is_simple_callable(value):
+                    value = value()
+        except Exception:
+            return field.get_attribute(instance)
+        return value
+
+    return get_attribute
+
+
+def _datetime_converter(field):
+    """ISO 8601 DateTimeField output with the field timezone resolved once"""
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if field_timezone is None:
+        return field.to_representation
+    drf_to_representation = field.to_representation
+
+    def to_representation(value):
+        if not value or isinstance(value, str) or value.utcoffset() is None:
+            return drf_to_representation(value)
+        try:
+            value = value.astimezone(field_timezone).isoformat()
+        except OverflowError:
+            return drf_to_representation(value)
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    return to_representation
+
+
+def _date_isoformat(value):
+    return value if isinstance(value, str) else value.isoformat()
+
+
+def _converter(field):
+    """Fast equivalent of `field.to_representation` for non-null values"""
+    field_class = type(field)
+    to_representation = field_class.to_representation
+    if to_representation is drf_fields.IntegerField.to_representation:
+        return int
+    if to_representation is drf_fields.CharField.to_representation:
+        return str
+    if (
+        to_representation is drf_fields.DateTimeField.to_representation
+        and field_class.enforce_timezone is drf_fields.DateTimeField.enforce_timezone
+        and field_class.default_timezone is drf_fields.DateTimeField.default_timezone
+    ):
+        return _datetime_converter(field)
+    if (
+        to_representation is drf_fields.DateField.to_representation
+        and getattr(field, 'format', api_settings.DATE_FORMAT) is not None
+        and getattr(field, 'format', api_settings.DATE_FORMAT).lower() == ISO_8601
+    ):
+        return _date_isoformat
+    return field.to_representation
+
+
+def compile_representation(serializer):
+    """Compile `serializer.to_representation` into a flat instance -> dict function"""
+    readable = list(serializer._readable_fields)
+    plan = _get_plan(serializer, readable)
+    fields = {field.field_name: field for field in readable}
+
+    steps = []
+    for name, kind, attname in plan:
+        field = fields[name]
+        if kind == _ATTR:
+            steps.append((name, kind, attname, _converter(field)))
+        elif kind == _PK:
+            steps.append((name, kind, attname, None))
+        elif kind == _METHOD:
+            steps.append((name, kind, getattr(serializer, field.method_name), None))
+        elif type(field).get_attribute is drf_fields.Field.get_attribute:
+            steps.append((name, kind, _source_getter(field), _converter(field)))
+        else:
+            steps.append((name, kind, field.get_attribute, field.to_representation))
+    steps = tuple(steps)
+
+    fallback = super(CompiledRepresentationMixin, serializer).to_representation
+
+    def to_representation(instance):
+        if isinstance(instance, Mapping):
+            return fallback(instance)
+
+        ret = {}
+        for name, kind, getter, convert in steps:
+            if kind == _ATTR:
+                value = getattr(instance, getter)
+                ret[name] = None if value is None else convert(value)
+            elif kind == _PK:
+                ret[name] = getattr(instance, getter)
+            elif kind == _METHOD:
+                ret[name] = getter(instance)
+            else:
+                try:
+                    attribute = getter(instance)
+                except SkipField:
+                    continue
+                check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+                ret[name] = None if check_for_none is None else convert(attribute)
+        return ret
+
+    return to_representation
+
+
+class CompiledRepresentationMixin:
+    """
+    Serve `to_representation` from a compiled read path.
+
+    The compiled function is built once per serializer instance, so a list
+    serializer compiles its child once for the whole page. Set
+    COMPILED_SERIALIZERS = False to fall back to DRF's generic implementation.
+    """
+
+    def to_representation(self, instance):
+        if not getattr(settings, 'COMPILED_SERIALIZERS', True):
+            return super().to_representation(instance)
+        compiled = self.__dict__.get('_compiled_representation')
+        if compiled is None:
+            compiled = self._compiled_representation = compile_representation(self)
+        return compiled(instance)
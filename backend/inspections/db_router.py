@@ -0,0 +1,142 @@
+"""
+Primary/replica database routing
+
+Writes always go to the primary. Reads go to one of DATABASE_REPLICAS only
+when slightly stale data is acceptable, and to the primary otherwise:
+
+* requests with an unsafe method read from the primary, so a workflow step
+  validates against current state;
+* once a request or task has written, the rest of its reads stay on the
+  primary, as do reads inside a transaction;
+* after a user's request writes, that user's reads stay on the primary for
+  REPLICA_STICKY_SECONDS (longer than replication lag), so the next page
+  they load shows their own changes;
+* `use_primary()` pins a block or view to the primary, and `use_replica()`
+  lets work outside a request (reports, exports) opt in to the replicas.
+
+`ReplicaRoutingMiddleware` applies the request rules. Without replicas
+configured every read resolves to the primary.
+"""
+import logging
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import redis
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from . import async_cache
+
+
+logger = logging.getLogger(__name__)
+
+
+class RoutingState:
+    """Per-request (or per-block) routing state"""
+
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+_state = ContextVar('db_routing_state', default=None)
+_pinned = ContextVar('db_routing_pinned', default=False)
+
+
+def reads_from_replica():
+    """Whether a read issued now may be served by a replica"""
+    if _pinned.get() or not settings.DATABASE_REPLICAS:
+        return False
+    state = _state.get()
+    if state is None or not state.replica or state.wrote:
+        return False
+    return not connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+@contextmanager
+def route(replica):
+    """Route the block's reads to a replica (`replica=True`) or the primary; yields the RoutingState"""
+    state = RoutingState(replica)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+        outer = _state.get()
+        if state.wrote and outer is not None:
+            outer.wrote = True
+
+
+def use_replica():
+    """Serve the block's reads from a replica until it writes (also a decorator)"""
+    return route(replica=True)
+
+
+@contextmanager
+def use_primary():
+    """Pin every read in the block to the primary (also a decorator)"""
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """Database router for the primary and its read replicas"""
+
+    def db_for_read(self, model, **hints):
+        if reads_from_replica():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas mirror the primary, so rows from any alias can be related
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def sticky_key(user_id):
+    return async_cache.cache_key('primary_sticky', user_id)
+
+
+def is_sticky(user_id):
+    """Whether the user wrote recently enough that their reads must stay on the primary"""
+    try:
+        return bool(async_cache.get_sync_client().exists(sticky_key(user_id)))
+    except (redis.RedisError, OSError) as e:
+        # Without the marker a replica could hide the user's own writes
+        logger.warning('Replica stickiness check failed for user %s: %s', user_id, e)
+        return True
+
+
+async def ais_sticky(user_id):
+    try:
+        return bool(await async_cache.get_async_client().exists(sticky_key(user_id)))
+    except (redis.RedisError, OSError) as e:
+        logger.warning('Replica stickiness check failed for user %s: %s', user_id, e)
+        return True
+
+
+def mark_sticky(user_id):
+    """Keep the user's reads on the primary for REPLICA_STICKY_SECONDS"""
+    try:
+        async_cache.get_sync_client().set(sticky_key(user_id), 1, ex=settings.REPLICA_STICKY_SECONDS)
+    except (redis.RedisError, OSError) as e:
+        logger.warning('Replica stickiness update failed for user %s: %s', user_id, e)
+
+
+async def amark_sticky(user_id):
+    try:
+        await async_cache.get_async_client().set(sticky_key(user_id), 1, ex=settings.REPLICA_STICKY_SECONDS)
+    except (redis.RedisError, OSError) as e:
+        logger.warning('Replica stickiness update failed for user %s: %s', user_id, e)
@@ -0,0 +1,121 @@
+"""
+Bulk equipment register upserts
+
+Rows are matched to existing equipment by `tag_code`: a known code updates
+that equipment and a new code creates it. Each row is a complete record, so
+optional fields it leaves out are cleared on update.
+
+Rows are consumed from any iterable in chunks of EQUIPMENT_BULK_CHUNK_SIZE,
+so a streamed request body is never held in memory whole. Each chunk is
+validated with one query for its clients and one for its tag codes, then
+written with a single INSERT ... ON CONFLICT (tag_code) DO UPDATE. Callers
+run the upsert in a transaction and roll it back when any row is invalid.
+Once a row has failed, later chunks are still validated but no longer
+written.
+"""
+from itertools import islice
+
+from django.conf import settings
+from rest_framework import serializers
+
+from . import async_cache
+from .models import Client, Equipment
+from .serializers import EquipmentBulkItemSerializer
+
+
+# `client` is left out so a row created by a concurrent request for another
+# client between the ownership check and the upsert is never moved
+UPDATE_FIELDS = [
+    'type', 'manufacturer', 'model', 'serial_number',
+    'swl', 'location', 'next_due', 'updated_by', 'updated_at',
+]
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def _invalid(result, errors):
+    result.update(status='invalid', errors=errors)
+
+
+def upsert_equipment(rows, user):
+    """
+    Create or update equipment for every row. Returns (results, valid):
+    per-row results in input order and whether every row was valid.
+    """
+    item_serializer = EquipmentBulkItemSerializer()
+    results = []
+    seen_tags = set()
+    known_clients = set()
+    valid = True
+
+    for chunk in _chunks(rows, settings.EQUIPMENT_BULK_CHUNK_SIZE):
+        accepted = []
+        for row in chunk:
+            result = {
+                'index': len(results),
+                'tag_code': row.get('tag_code') if isinstance(row, dict) else None,
+            }
+            results.append(result)
+            if isinstance(row, Exception):
+                _invalid(result, {'non_field_errors': [str(row)]})
+                continue
+            try:
+                attrs = item_serializer.run_validation(row)
+            except serializers.ValidationError as exc:
+                _invalid(result, exc.detail)
+                continue
+            if attrs['tag_code'] in seen_tags:
+                _invalid(result, {'tag_code': ['Duplicate tag_code in this request.']})
+                continue
+            seen_tags.add(attrs['tag_code'])
+            accepted.append((result, attrs))
+
+        client_ids = {attrs['client'] for _, attrs in accepted} - known_clients
+        known_clients.update(Client.objects.filter(id__in=client_ids).values_list('id', flat=True))
+        existing = {
+            tag_code: (equipment_id, client_id)
+            for tag_code, equipment_id, client_id in Equipment.objects.filter(
+                tag_code__in=[attrs['tag_code'] for _, attrs in accepted]
+            ).values_list('tag_code', 'id', 'client_id')
+        }
+
+        written = []
+        for result, attrs in accepted:
+            client_id = attrs.pop('client')
+            current = existing.get(attrs['tag_code'])
+            if client_id not in known_clients:
+                _invalid(result, {'client': [f'Invalid pk "{client_id}" - object does not exist.']})
+            elif current is not None and current[1] != client_id:
+                _invalid(result, {'tag_code': ['Equipment with this tag_code belongs to another client.']})
+            elif current is not None:
+                written.append((result, 'updated', Equipment(client_id=client_id, updated_by=user, **attrs)))
+            else:
+                written.append((result, 'created', Equipment(client_id=client_id, created_by=user, **attrs)))
+
+        valid = valid and all(result.get('status') != 'invalid' for result in results[-len(chunk):])
+        if not valid:
+            continue
+
+        Equipment.objects.bulk_create(
+            [equipment for _, _, equipment in written],
+            update_conflicts=True,
+            unique_fields=['tag_code'],
+            update_fields=UPDATE_FIELDS,
+        )
+        for result, status, equipment in written:
+            result.update(id=equipment.id, status=status)
+        # The upsert skips post_save, so drop the sticker payloads embedding updated equipment here
+        async_cache.invalidate_stickers(assigned_equipment__in=[
+            existing[equipment.tag_code][0] for _, status, equipment in written if status == 'updated'
+        ])
+
+    if not valid:
+        for result in results:
+            if result.get('status') != 'invalid':
+                result.update(status='valid', errors={})
+                result.pop('id', None)
+    return results, valid
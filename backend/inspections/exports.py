@@ -0,0 +1,118 @@
+"""
+Spreadsheet exports of list endpoints
+
+A viewset with `ExportMixin` and `export_fields` serves its list as CSV or
+XLSX, selected with `?format=csv|xlsx` or the Accept header. The export
+uses the same queryset as the JSON list, with the viewset's filters,
+search, ordering and client scoping. It has every matching row rather than
+one page.
+
+Rows are read as plain tuples through `values_list(...).iterator()`, which
+uses a server-side cursor on PostgreSQL and fetches EXPORT_CHUNK_SIZE rows
+at a time. Each chunk is rendered as it arrives, so memory stays flat
+whatever the row count. A CSV export starts sending bytes immediately. An
+XLSX workbook can only be streamed once it has been assembled in a
+temporary file.
+
+Under ASGI Django would drain a plain iterator into a list before sending
+it, so there the body is an async iterator that renders one chunk at a
+time in the request's database thread.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.exceptions import FieldDoesNotExist
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.text import capfirst, slugify
+from rest_framework.response import Response
+
+from .renderers import CSVRenderer, ORJSONRenderer, XLSXRenderer
+
+
+EXPORT_RENDERERS = (CSVRenderer, XLSXRenderer)
+
+
+def column_label(model, lookup):
+    """Header for a lookup: the verbose name of the field it ends on"""
+    *path, name = lookup.split('__')
+    for part in path:
+        model = model._meta.get_field(part).related_model
+    try:
+        return capfirst(model._meta.get_field(name).verbose_name)
+    except FieldDoesNotExist:
+        return capfirst(name.replace('_', ' '))
+
+
+def export_columns(model, export_fields):
+    """[(lookup, header)] for `export_fields` entries, each a lookup or a (lookup, header) pair"""
+    return [
+        field if isinstance(field, tuple) else (field, column_label(model, field))
+        for field in export_fields
+    ]
+
+
+async def _aiter_chunks(chunks):
+    """Yield from the sync iterator `chunks` without blocking the event loop"""
+    done = object()
+    # Thread-sensitive, so the server-side cursor stays on the connection that opened it
+    fetch = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (chunk := await fetch(chunks, done)) is not done:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close, thread_sensitive=True)()
+
+
+def export_response(request, queryset, export_fields, renderer):
+    """A streaming download of every row of `queryset`"""
+    model = queryset.model
+    columns = export_columns(model, export_fields)
+    # Rows are read after the view returns, outside the request's routing, so pick the database now
+    queryset = queryset.using(queryset.db).prefetch_related(None)
+    rows = queryset.values_list(*(lookup for lookup, _ in columns)).iterator(
+        chunk_size=settings.EXPORT_CHUNK_SIZE
+    )
+
+    chunks = renderer.stream([header for _, header in columns], rows)
+    if isinstance(request._request, ASGIRequest):
+        chunks = _aiter_chunks(chunks)
+    response = StreamingHttpResponse(
+        chunks,
+        content_type=renderer.media_type,
+    )
+    filename = f'{slugify(model._meta.verbose_name_plural)}-{timezone.localdate():%Y%m%d}.{renderer.format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+class ExportMixin:
+    """
+    Serve the viewset's list as CSV or XLSX. `export_fields` lists the
+    exported columns as field lookups (following forward relations only) or
+    (lookup, header) pairs.
+    """
+    export_fields = None
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if self.action == 'list' and self.export_fields:
+            renderers += [renderer_class() for renderer_class in EXPORT_RENDERERS]
+        return renderers
+
+    def list(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, EXPORT_RENDERERS):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_response(request, queryset, self.export_fields, renderer)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        # Errors are reported as JSON, not as a spreadsheet
+        if (
+            isinstance(response, Response) and response.exception
+            and isinstance(getattr(request, 'accepted_renderer', None), EXPORT_RENDERERS)
+        ):
+            request.accepted_renderer = ORJSONRenderer()
+            request.accepted_media_type = ORJSONRenderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,136 @@
+"""
+Idempotency keys for POST requests
+
+A client that may retry a POST (mobile apps on flaky networks) sends an
+`Idempotency-Key` header. The first request with a key claims it in Redis
+and runs; its response is stored for IDEMPOTENCY_KEY_SECONDS and replayed
+verbatim to any retry, so certificate generation, sticker batches and
+publication are not repeated. A retry that arrives while the original is
+still running gets 409 instead of starting the work a second time.
+
+Keys are scoped to the authenticated user, and a key reused for a different
+request (method, path or body) is refused with 422. Server errors release
+the key so the client can retry. When Redis is unreachable requests run
+without idempotency rather than failing.
+"""
+import base64
+import hashlib
+import logging
+
+import orjson
+import redis
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+
+from . import async_cache
+
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+
+def record_key(user_id, key):
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return async_cache.cache_key('idempotency', f'{user_id}:{digest}')
+
+
+def fingerprint(request):
+    """Hash of what makes a request the same request: method, full path and body"""
+    digest = hashlib.sha256(f'{request.method} {request.get_full_path()}\n'.encode())
+    length = request.META.get('CONTENT_LENGTH') or '0'
+    limit = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+    if request.content_type == 'multipart/form-data' or (
+        limit is not None and length.isdigit() and int(length) > limit
+    ):
+        # Uploads and streamed bodies may be too large to hold in memory, so only their size is compared
+        digest.update(length.encode())
+    else:
+        digest.update(request.body)
+    return digest.hexdigest()
+
+
+def _marker(request_fingerprint):
+    return orjson.dumps({'fingerprint': request_fingerprint})
+
+
+def _record(request_fingerprint, response):
+    return orjson.dumps({
+        'fingerprint': request_fingerprint,
+        'status': response.status_code,
+        'headers': [
+            [name, value] for name, value in response.headers.items() if name.lower() != 'content-length'
+        ],
+        'content': base64.b64encode(response.content).decode(),
+    })
+
+
+def _storable(response):
+    return not response.streaming and response.status_code < 500
+
+
+def claim(key, request_fingerprint):
+    """
+    Claim `key` for a new request. Returns None if the caller now owns it,
+    otherwise the stored record ({'fingerprint'} alone while in flight).
+    """
+    client = async_cache.get_sync_client()
+    if client.set(key, _marker(request_fingerprint), nx=True, ex=settings.IDEMPOTENCY_LOCK_SECONDS):
+        return None
+    stored = client.get(key)
+    return orjson.loads(stored) if stored else {'fingerprint': request_fingerprint}
+
+
+async def aclaim(key, request_fingerprint):
+    client = async_cache.get_async_client()
+    if await client.set(key, _marker(request_fingerprint), nx=True, ex=settings.IDEMPOTENCY_LOCK_SECONDS):
+        return None
+    stored = await client.get(key)
+    return orjson.loads(stored) if stored else {'fingerprint': request_fingerprint}
+
+
+def complete(key, request_fingerprint, response):
+    """Store the response for replay, or release the key if it can't be replayed"""
+    client = async_cache.get_sync_client()
+    try:
+        if _storable(response):
+            client.set(key, _record(request_fingerprint, response), ex=settings.IDEMPOTENCY_KEY_SECONDS)
+        else:
+            client.delete(key)
+    except (redis.RedisError, OSError) as e:
+        logger.warning('Idempotency record write failed for %s: %s', key, e)
+
+
+async def acomplete(key, request_fingerprint, response):
+    client = async_cache.get_async_client()
+    try:
+        if _storable(response):
+            await client.set(key, _record(request_fingerprint, response), ex=settings.IDEMPOTENCY_KEY_SECONDS)
+        else:
+            await client.delete(key)
+    except (redis.RedisError, OSError) as e:
+        logger.warning('Idempotency record write failed for %s: %s', key, e)
+
+
+def stored_response(record, request_fingerprint):
+    """Response for a request whose key was already claimed"""
+    if record['fingerprint'] != request_fingerprint:
+        return JsonResponse(
+            {'error': 'Idempotency-Key was already used for a different request'},
+            status=422,
+        )
+    if 'status' not in record:
+        response = JsonResponse(
+            {'error': 'A request with this Idempotency-Key is still being processed'},
+            status=409,
+        )
+        response.headers['Retry-After'] = '1'
+        return response
+
+    response = HttpResponse(base64.b64decode(record['content']), status=record['status'])
+    for name, value in record['headers']:
+        response.headers[name] = value
+    response.headers[REPLAYED_HEADER] = 'true'
+    return response
@@ -0,0 +1,449 @@
+"""
+Spreadsheet register imports
+
+Clients send their equipment, tool and people registers as XLSX or CSV
+files. `run_import` streams a file row by row, using openpyxl's read-only
+mode for XLSX and the csv module for CSV, so a register's size never
+dictates the worker's memory. Header cells are matched to model fields by
+field name, verbose name or a register alias. Rows are validated with the
+model fields' own cleaning, and choice fields accept labels as well as
+values.
+
+Rows are processed in chunks of IMPORT_CHUNK_SIZE, with one query per chunk
+for the rows they match. Each chunk is COPY'd into a temporary staging
+table, and the register is merged into its table with a single
+INSERT ... SELECT ... ON CONFLICT DO UPDATE at the end.
+
+An import is all-or-nothing. It runs in one transaction, and after the
+first invalid row the file is still read to the end to report every error
+(up to IMPORT_MAX_ERRORS), but nothing is written. Updates change only the
+columns the file contains; new rows take model defaults for the rest.
+"""
+import csv
+import io
+import re
+import zipfile
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connections, router, transaction
+from django.db.models import DecimalField, FloatField
+from django.utils import timezone
+from django.utils.text import capfirst
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+from . import async_cache, rollups
+from .models import Equipment, Person, Tool, ToolCategory
+
+
+class RegisterImportError(Exception):
+    """The file as a whole can't be imported (format, header or size)"""
+
+
+class Register:
+    """How the rows of one kind of register map onto a model"""
+
+    def __init__(self, name, model, fields, key=None, client=None, related=None, aliases=None):
+        self.name = name
+        self.model = model
+        self.fields = [model._meta.get_field(name) for name in fields]
+        # Natural key rows are matched on; registers without one only create
+        self.key = key
+        self.key_field = model._meta.get_field(key) if key else None
+        # 'required' or 'optional' when rows belong to the client the file is imported for
+        self.client = client
+        # Foreign keys given by a natural key of the related model: {field: related field}
+        self.related = related or {}
+        self.aliases = aliases or {}
+
+    def column_names(self):
+        """Normalised header -> field name"""
+        names = {}
+        for field in self.fields:
+            names[normalise(field.name)] = field.name
+            names[normalise(field.verbose_name)] = field.name
+        for alias, name in self.aliases.items():
+            names[normalise(alias)] = name
+        return names
+
+    def required_fields(self):
+        return [
+            field.name for field in self.fields
+            if not field.blank and not field.has_default() and field.name != 'client'
+        ]
+
+    def insert_fields(self):
+        """Columns written for every row: all concrete fields but the pk and generated columns"""
+        return [
+            field for field in self.model._meta.concrete_fields
+            if not field.primary_key and not field.generated
+        ]
+
+
+REGISTERS = {
+    register.name: register for register in [
+        Register(
+            'equipment', Equipment,
+            ['tag_code', 'type', 'manufacturer', 'model', 'serial_number', 'swl', 'location', 'next_due'],
+            key='tag_code',
+            client='required',
+            aliases={
+                'tag': 'tag_code', 'tag_no': 'tag_code', 'equipment_type': 'type',
+                'serial_no': 'serial_number', 'safe_working_load': 'swl',
+                'next_due_date': 'next_due', 'next_inspection': 'next_due',
+            },
+        ),
+        Register(
+            'tools', Tool,
+            ['name', 'serial_number', 'category', 'assignment_mode', 'location', 'calibration_due'],
+            key='serial_number',
+            related={'category': 'code'},
+            aliases={
+                'tool_name': 'name', 'serial': 'serial_number', 'serial_no': 'serial_number',
+                'category_code': 'category', 'calibration_due_date': 'calibration_due',
+            },
+        ),
+        Register(
+            'people', Person,
+            ['first_name', 'last_name', 'email', 'phone', 'person_type', 'employer', 'notes'],
+            client='optional',
+            aliases={
+                'given_name': 'first_name', 'surname': 'last_name', 'email_address': 'email',
+                'phone_number': 'phone', 'type': 'person_type', 'company': 'employer',
+            },
+        ),
+    ]
+}
+
+RELATED_MODELS = {'category': ToolCategory}
+
+
+def normalise(header):
+    return re.sub(r'[^a-z0-9]+', '_', str(header or '').strip().lower()).strip('_')
+
+
+def read_xlsx(file):
+    """(estimated data rows or None, row iterator) for the first sheet of a workbook"""
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except (InvalidFileException, zipfile.BadZipFile, KeyError, OSError, ValueError) as e:
+        raise RegisterImportError(f'Not a readable XLSX workbook: {e}')
+    sheet = workbook.worksheets[0]
+    total = sheet.max_row - 1 if sheet.max_row else None
+
+    def rows():
+        try:
+            yield from sheet.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+    return total, rows()
+
+
+def read_csv(file):
+    """(None, row iterator) for a UTF-8 CSV file, delimiter detected from its start"""
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        sample = text.read(64 * 1024)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+    except UnicodeDecodeError:
+        raise RegisterImportError('CSV files must be UTF-8 encoded')
+
+    def rows():
+        try:
+            yield from csv.reader(text, dialect)
+        except UnicodeDecodeError:
+            raise RegisterImportError('CSV files must be UTF-8 encoded')
+        except csv.Error as e:
+            raise RegisterImportError(f'CSV parse error: {e}')
+
+    return None, rows()
+
+
+READERS = {'.xlsx': read_xlsx, '.csv': read_csv}
+
+
+def map_header(register, header):
+    """[(column index, field name)] for the header row, and the headers that were ignored"""
+    names = register.column_names()
+    columns, ignored, seen = [], [], {}
+    for index, cell in enumerate(header):
+        if cell is None or str(cell).strip() == '':
+            continue
+        name = names.get(normalise(cell))
+        if name is None:
+            ignored.append(str(cell))
+            continue
+        if name in seen:
+            raise RegisterImportError(f'Columns "{seen[name]}" and "{cell}" both map to {name}')
+        seen[name] = cell
+        columns.append((index, name))
+
+    missing = [name for name in register.required_fields() if name not in seen]
+    if missing:
+        raise RegisterImportError(f'Missing required columns: {", ".join(missing)}')
+    return columns, ignored
+
+
+def choice_values(field):
+    """Lowercased value and label -> stored value, so sheets may use either"""
+    values = {}
+    for value, label in field.flatchoices:
+        values[str(value).lower()] = value
+        values[str(label).lower()] = value
+    return values
+
+
+class RowCleaner:
+    """Turns a sheet row into model attribute values, or raises {field: [messages]}"""
+
+    def __init__(self, register, columns):
+        self.register = register
+        self.columns = [(index, register.model._meta.get_field(name)) for index, name in columns]
+        self.choices = {field.name: choice_values(field) for _, field in self.columns if field.choices}
+        self.related = {
+            name: {
+                str(natural_key): pk for natural_key, pk in
+                RELATED_MODELS[name].objects.values_list(natural_key_field, 'pk')
+            }
+            for name, natural_key_field in register.related.items()
+        }
+
+    def clean_value(self, field, value):
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == '':
+            if field.has_default():
+                return field.get_default()
+            if not field.blank:
+                raise ValidationError('This field is required.')
+            return None if field.null else ''
+        if field.name in self.related:
+            pk = self.related[field.name].get(str(value))
+            if pk is None:
+                raise ValidationError(f'Unknown {field.verbose_name} "{value}".')
+            return pk
+        # Spreadsheet numbers arrive as floats; 1234.0 in a text column means "1234"
+        if isinstance(value, float) and value.is_integer() and not isinstance(field, (DecimalField, FloatField)):
+            value = int(value)
+        if field.name in self.choices:
+            value = self.choices[field.name].get(str(value).lower(), value)
+        return field.clean(value, None)
+
+    def clean(self, row):
+        values, errors = {}, {}
+        for index, field in self.columns:
+            try:
+                values[field.attname] = self.clean_value(field, row[index] if index < len(row) else None)
+            except ValidationError as e:
+                errors[field.name] = e.messages
+        if errors:
+            raise ValidationError(errors)
+        return values
+
+
+class CopyWriter:
+    """COPYs each chunk into a temporary staging table and merges it once at the end"""
+
+    STAGING_TABLE = 'register_import_staging'
+
+    def __init__(self, register, update_fields, connection):
+        self.register = register
+        self.connection = connection
+        model = register.model
+        self.columns = [field.attname for field in register.insert_fields()]
+        quote = connection.ops.quote_name
+        column_list = ', '.join(quote(column) for column in self.columns)
+        table = quote(model._meta.db_table)
+        staging = quote(self.STAGING_TABLE)
+
+        self.copy_sql = f'COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv)'
+        self.merge_sql = f'INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {staging}'
+        if register.key:
+            assignments = ', '.join(
+                f'{quote(column)} = EXCLUDED.{quote(column)}'
+                for column in (model._meta.get_field(name).attname for name in update_fields)
+            )
+            self.merge_sql += f' ON CONFLICT ({quote(register.key_field.column)}) DO UPDATE SET {assignments}'
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {staging}')
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {staging} ON COMMIT DROP AS '
+                f'SELECT {column_list} FROM {table} WITH NO DATA'
+            )
+
+    @staticmethod
+    def copy_value(value):
+        # Unquoted empty is NULL in COPY's csv format, quoted empty is ''
+        if value is None:
+            return ''
+        return '"' + str(value).replace('"', '""') + '"'
+
+    def write(self, rows):
+        buffer = io.StringIO()
+        for values in rows:
+            buffer.write(','.join(self.copy_value(values[column]) for column in self.columns))
+            buffer.write('\n')
+        buffer.seek(0)
+        with self.connection.cursor() as cursor:
+            cursor.cursor.copy_expert(self.copy_sql, buffer)
+
+    def finish(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(self.merge_sql)
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_import(register_name, file, extension, user_id, client_id=None, progress=None):
+    """
+    Import a register file into its table. Returns a summary dict; invalid rows
+    are reported in it with nothing written. `progress(dict)` is called after
+    every chunk. Raises RegisterImportError for a file that can't be read.
+    """
+    register = REGISTERS[register_name]
+    model = register.model
+    reader = READERS.get(extension.lower())
+    if reader is None:
+        raise RegisterImportError('Registers must be .xlsx or .csv files')
+    if register.client == 'required' and client_id is None:
+        raise RegisterImportError(f'A client is required to import a {register.name} register')
+
+    total, rows = reader(file)
+    header = next(rows, None)
+    if header is None:
+        raise RegisterImportError('The file is empty')
+    columns, ignored = map_header(register, header)
+    cleaner = RowCleaner(register, columns)
+
+    present = [name for _, name in columns]
+    update_fields = [name for name in present if name != register.key] + ['updated_by', 'updated_at']
+    rollup_fields = sorted(rollups.rollup_fields(model))
+    lookup_fields = [register.key, *rollup_fields] + (['client_id'] if register.client else [])
+    now = timezone.now()
+    constants = {'created_at': now, 'updated_at': now}
+    if register.client:
+        constants['client_id'] = client_id
+    defaults = {
+        field.attname: field.get_default() for field in register.insert_fields()
+        if field.attname not in constants
+    }
+
+    summary = {
+        'register': register.name, 'rows': 0, 'created': 0, 'updated': 0,
+        'ignored_columns': ignored, 'errors': [], 'error_count': 0,
+    }
+    seen_keys = set()
+    before, after = Counter(), Counter()
+    max_rows = settings.IMPORT_MAX_ROWS
+    max_errors = settings.IMPORT_MAX_ERRORS
+
+    def fail(row_number, errors):
+        summary['error_count'] += 1
+        if len(summary['errors']) < max_errors:
+            summary['errors'].append({'row': row_number, 'errors': errors})
+
+    database = router.db_for_write(model)
+    connection = connections[database]
+    with transaction.atomic(using=database):
+        writer = CopyWriter(register, update_fields, connection)
+
+        # Sheet row numbers, header being row 1; blank rows are skipped
+        numbered = (
+            (number, row) for number, row in enumerate(rows, start=2)
+            if any(cell is not None and str(cell).strip() != '' for cell in row)
+        )
+        for chunk in _chunks(numbered, settings.IMPORT_CHUNK_SIZE):
+            summary['rows'] += len(chunk)
+            if summary['rows'] > max_rows:
+                raise RegisterImportError(f'Registers are limited to {max_rows} rows')
+
+            accepted = []
+            for number, row in chunk:
+                try:
+                    values = cleaner.clean(row)
+                except ValidationError as e:
+                    fail(number, e.message_dict)
+                    continue
+                if register.key:
+                    key = values[register.key_field.attname]
+                    if key in seen_keys:
+                        fail(number, {register.key: [f'Duplicate {register.key} in this file.']})
+                        continue
+                    seen_keys.add(key)
+                accepted.append((number, values))
+
+            existing = {}
+            if register.key and accepted:
+                existing = {
+                    row[register.key]: row for row in model.objects.filter(**{
+                        f'{register.key}__in': [values[register.key_field.attname] for _, values in accepted]
+                    }).values(*lookup_fields)
+                }
+
+            written = []
+            updated_keys = []
+            for number, values in accepted:
+                current = existing.get(values.get(register.key_field.attname)) if register.key else None
+                if current is not None and register.client and current['client_id'] != client_id:
+                    fail(number, {register.key: [
+                        f'{capfirst(model._meta.verbose_name)} with this {register.key} belongs to another client.'
+                    ]})
+                    continue
+                values = {**defaults, **constants, **values}
+                if current is not None:
+                    values['updated_by_id'] = user_id
+                    summary['updated'] += 1
+                    updated_keys.append(values[register.key_field.attname])
+                    stored = {name: current[name] for name in rollup_fields}
+                    before.update(rollups.rollup_keys(model, stored))
+                    after.update(rollups.rollup_keys(model, {**stored, **{
+                        name: values[name] for name in rollup_fields if name in present
+                    }}))
+                else:
+                    values['created_by_id'] = user_id
+                    summary['created'] += 1
+                    after.update(rollups.rollup_keys(model, {name: values[name] for name in rollup_fields}))
+                written.append(values)
+
+            if not summary['error_count']:
+                writer.write(written)
+                if model is Equipment and updated_keys:
+                    # The merge skips post_save, so drop the sticker payloads embedding these rows here
+                    async_cache.invalidate_stickers(database, assigned_equipment__tag_code__in=updated_keys)
+            if progress is not None:
+                progress({
+                    'register': register.name, 'stage': 'loading',
+                    'rows': summary['rows'], 'total': total if total and total >= summary['rows'] else None,
+                    'error_count': summary['error_count'],
+                })
+
+        if not summary['rows']:
+            raise RegisterImportError('The file has no data rows')
+        if summary['error_count']:
+            transaction.set_rollback(True, using=database)
+            summary.update(created=0, updated=0)
+            summary['errors'].sort(key=lambda error: error['row'])
+            return summary
+
+        if progress is not None:
+            progress({'register': register.name, 'stage': 'merging', 'rows': summary['rows'], 'total': summary['rows']})
+        writer.finish()
+        rollups.record_change(before, after)
+    return summary
@@ -0,0 +1,72 @@
+"""
+Django management command to measure response compression on job order responses
+Usage: python manage.py benchmark_compression [--job-order ID] [--line-items N] [--iterations N]
+"""
+
+import timeit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from inspections.middleware import _BrotliCompressor, _GzipCompressor
+from inspections.renderers import ORJSONRenderer, MessagePackRenderer
+from inspections.management.commands.benchmark_renderers import Command as BenchmarkRenderersCommand
+
+
+class Command(BaseCommand):
+    help = 'Measure gzip and brotli size and time on typical /job-orders/{id}/ responses'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--job-order',
+            type=int,
+            help='Measure this job order from the database instead of synthetic data',
+        )
+        parser.add_argument(
+            '--line-items',
+            type=int,
+            default=50,
+            help='Number of line items in the synthetic job order (default: 50)',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20,
+            help='Number of compressions per codec (default: 20)',
+        )
+
+    def handle(self, *args, **options):
+        payload_source = BenchmarkRenderersCommand()
+        if options['job_order']:
+            name, payload = payload_source.load_payloads(options['job_order'])[0]
+        else:
+            name, payload = payload_source.build_payloads(options['line_items'])[0]
+
+        codecs = [
+            (f'gzip-{level}', lambda level=level: _GzipCompressor(level)) for level in (1, 6, 9)
+        ] + [
+            (f'br-{quality}', lambda quality=quality: _BrotliCompressor(quality)) for quality in (1, 5, 11)
+        ]
+
+        iterations = options['iterations']
+        for body_name, renderer in (('json', ORJSONRenderer()), ('msgpack', MessagePackRenderer())):
+            body = renderer.render(payload)
+            self.stdout.write(self.style.SUCCESS(f'\n{name} as {body_name}: {len(body) / 1024:.1f} KiB'))
+
+            def compress(factory):
+                compressor = factory()
+                return compressor.compress(body) + compressor.finish()
+
+            for codec_name, factory in codecs:
+                size = len(compress(factory))
+                elapsed = timeit.timeit(lambda: compress(factory), number=iterations)
+                self.stdout.write(
+                    f'  {codec_name:<8} {size / 1024:9.1f} KiB  {len(body) / size:6.1f}:1  '
+                    f'{elapsed / iterations * 1000:8.2f} ms'
+                )
+
+        self.stdout.write(
+            f'\nConfigured: gzip level {settings.COMPRESSION_GZIP_LEVEL}, '
+            f'brotli quality {settings.COMPRESSION_BROTLI_QUALITY}, '
+            f'minimum size {settings.COMPRESSION_MIN_SIZE} bytes'
+        )
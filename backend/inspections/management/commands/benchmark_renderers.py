@@ -0,0 +1,198 @@
+"""
+Django management command to compare API renderer encode times
+Usage: python manage.py benchmark_renderers [--job-order ID] [--line-items N] [--iterations N]
+"""
+
+import timeit
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Prefetch
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from inspections.models import JobOrder, JobLineItem, Inspection
+from inspections.renderers import ORJSONRenderer, MessagePackRenderer
+from inspections.serializers import JobOrderSerializer, InspectionSerializer
+
+
+RENDERERS = [
+    ('drf-json', JSONRenderer()),
+    ('orjson', ORJSONRenderer()),
+    ('msgpack', MessagePackRenderer()),
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark encode times of the API renderers on representative job order and inspection responses'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--job-order',
+            type=int,
+            help='Serialize this job order (and its inspections) from the database instead of synthetic data',
+        )
+        parser.add_argument(
+            '--line-items',
+            type=int,
+            default=200,
+            help='Number of line items in the synthetic job order (default: 200)',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=50,
+            help='Number of encodes per renderer and payload (default: 50)',
+        )
+
+    def handle(self, *args, **options):
+        if options['job_order']:
+            payloads = self.load_payloads(options['job_order'])
+        else:
+            payloads = self.build_payloads(options['line_items'])
+
+        iterations = options['iterations']
+        for payload_name, payload in payloads:
+            self.stdout.write(self.style.SUCCESS(f'\n{payload_name}'))
+            baseline = None
+            for renderer_name, renderer in RENDERERS:
+                size = len(renderer.render(payload))
+                elapsed = timeit.timeit(lambda: renderer.render(payload), number=iterations)
+                per_call_ms = elapsed / iterations * 1000
+                baseline = baseline or per_call_ms
+                self.stdout.write(
+                    f'  {renderer_name:<10} {per_call_ms:9.3f} ms/encode  '
+                    f'{size / 1024:9.1f} KiB  x{baseline / per_call_ms:5.1f}'
+                )
+
+    def load_payloads(self, job_order_id):
+        """Serialize a real job order and its inspections"""
+        try:
+            job_order = JobOrder.objects.select_related('client', 'created_by').prefetch_related(
+                Prefetch(
+                    'line_items',
+                    queryset=JobLineItem.objects.select_related('equipment__client').prefetch_related(
+                        'inspections__answers__photos', 'inspections__photos'
+                    )
+                )
+            ).get(id=job_order_id)
+        except JobOrder.DoesNotExist:
+            raise CommandError(f'Job order {job_order_id} does not exist')
+
+        inspections = Inspection.objects.filter(job_line_item__job_order=job_order).select_related(
+            'job_line_item__equipment__client', 'inspector'
+        ).prefetch_related('answers__photos', 'photos')
+
+        return [
+            (f'JobOrderSerializer (JO-{job_order.id})', JobOrderSerializer(job_order).data),
+            (f'InspectionSerializer list (JO-{job_order.id})', InspectionSerializer(inspections, many=True).data),
+        ]
+
+    def build_payloads(self, line_item_count):
+        """Build synthetic payloads shaped like the job order and inspection responses"""
+        now = timezone.now()
+
+        def equipment(i):
+            return {
+                'id': i,
+                'client': 1,
+                'client_name': 'Acme Lifting Services',
+                'tag_code': f'EQ-{i:06d}',
+                'type': 'Overhead Crane',
+                'manufacturer': 'Konecranes',
+                'model': 'CXT',
+                'serial_number': f'SN{i:010d}',
+                'swl': Decimal('12500.00'),
+                'location': 'Bay 4, Jebel Ali Industrial Area',
+                'next_due': (now + timedelta(days=i % 365)).date(),
+                'created_at': now,
+                'updated_at': now,
+            }
+
+        def photo(i, slot):
+            return {
+                'id': i,
+                'inspection': i,
+                'answer': None,
+                'file': f'/media/inspection_photos/{uuid.uuid4()}.jpg',
+                'slot_name': slot,
+                'uploaded_at': now,
+                'geotag_lat': Decimal('25.011234'),
+                'geotag_lng': Decimal('55.061234'),
+            }
+
+        def inspection(i):
+            return {
+                'id': i,
+                'job_line_item': i,
+                'inspector': 7,
+                'inspector_name': 'Omar Haddad',
+                'checklist_template': 'LOLER-CRANE-v3',
+                'start_time': now,
+                'end_time': now + timedelta(hours=2),
+                'status': 'SUBMITTED',
+                'geo_location_lat': Decimal('25.011234'),
+                'geo_location_lng': Decimal('55.061234'),
+                'inspector_signature': None,
+                'client_signature': None,
+                'answers': [
+                    {
+                        'id': i * 100 + q,
+                        'inspection': i,
+                        'question_key': f'Q{q:03d}',
+                        'result': 'SAFE',
+                        'comment': 'Checked and within tolerance',
+                        'photos': [],
+                        'created_at': now,
+                        'updated_at': now,
+                    }
+                    for q in range(40)
+                ],
+                'photos': [photo(i, slot) for slot in ('FRONT', 'SIDE1', 'PLATE')],
+                'equipment_info': equipment(i),
+                'created_at': now,
+                'updated_at': now,
+            }
+
+        inspections = [inspection(i) for i in range(1, line_item_count + 1)]
+        job_order = {
+            'id': 1,
+            'client': 1,
+            'client_name': 'Acme Lifting Services',
+            'po_reference': 'PO-2026-0042',
+            'status': 'IN_PROGRESS',
+            'site_location': 'Jebel Ali Industrial Area',
+            'scheduled_start': now,
+            'scheduled_end': now + timedelta(days=5),
+            'tentative_date': now.date(),
+            'notes': '',
+            'invoice_number': None,
+            'finance_status': 'PENDING',
+            'line_items': [
+                {
+                    'id': item['id'],
+                    'job_order': 1,
+                    'equipment': item['equipment_info']['id'],
+                    'equipment_info': item['equipment_info'],
+                    'type': 'Thorough Examination',
+                    'description': 'Annual LOLER examination',
+                    'quantity': 1,
+                    'status': 'COMPLETED',
+                    'inspections': [item],
+                    'created_at': now,
+                    'updated_at': now,
+                }
+                for item in inspections
+            ],
+            'created_by': 1,
+            'created_by_name': 'Admin User',
+            'created_at': now,
+            'updated_at': now,
+        }
+
+        return [
+            (f'Synthetic job order ({line_item_count} line items)', job_order),
+            (f'Synthetic inspection list ({line_item_count} inspections)', inspections),
+        ]
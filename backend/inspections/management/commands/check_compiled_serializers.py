@@ -0,0 +1,99 @@
+"""
+Django management command to verify compiled serializers match DRF output and time both
+Usage: python manage.py check_compiled_serializers [--limit N] [--iterations N]
+"""
+
+import timeit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from rest_framework import viewsets
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from inspections.compiled_serializers import CompiledRepresentationMixin
+from inspections.management.commands.check_msgpack_compat import Command as MessagePackCompatCommand
+from inspections.urls import router
+
+
+class Command(BaseCommand):
+    help = 'Serialize every API model serializer with and without compiled read paths, compare and time them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=200,
+            help='Number of database rows to serialize per serializer (default: 200)',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=5,
+            help='Number of timed serializations per mode (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        request = APIRequestFactory().get('/api/', HTTP_HOST='localhost')
+        admin = get_user_model().objects.filter(role='ADMIN').first()
+        if admin:
+            force_authenticate(request, user=admin)
+        request = Request(request)
+        context = {'request': request}
+        views = self.get_views(request)
+        iterations = options['iterations']
+        failures = []
+
+        for name, serializer_class in MessagePackCompatCommand().get_serializer_classes():
+            if not issubclass(serializer_class, CompiledRepresentationMixin):
+                continue
+            model = serializer_class.Meta.model
+            view = views.get(serializer_class)
+            queryset = view.get_queryset() if view else model._default_manager.all()
+            instances = list(queryset[:options['limit']])
+            if not instances:
+                self.stdout.write(self.style.WARNING(f'  {name}: no {model.__name__} rows, skipped'))
+                continue
+
+            def serialize():
+                return serializer_class(instances, many=True, context=context).data
+
+            # Querysets come from the API viewsets, so related rows are
+            # prefetched and the timings compare serializer overhead only.
+            with override_settings(COMPILED_SERIALIZERS=False):
+                expected = serialize()
+                generic = timeit.timeit(serialize, number=iterations) / iterations
+            compiled_data = serialize()
+            compiled = timeit.timeit(serialize, number=iterations) / iterations
+
+            if compiled_data != expected:
+                failures.append(f'{name}: compiled output differs from DRF output')
+                continue
+            self.stdout.write(
+                f'  {name:<36} {len(instances):5} rows  drf {generic * 1000:8.2f} ms  '
+                f'compiled {compiled * 1000:8.2f} ms  {generic / compiled:5.1f}x'
+            )
+
+        if failures:
+            for failure in failures:
+                self.stderr.write(self.style.ERROR(f'  {failure}'))
+            raise CommandError(f'{len(failures)} compiled serializer mismatch(es)')
+        self.stdout.write(self.style.SUCCESS('All compiled serializers match DRF output'))
+
+    def get_views(self, request):
+        """
+        Map serializer classes to the API view serving them, so rows are loaded
+        with that view's select/prefetch
+        """
+        views = {}
+        if request.user.is_anonymous:
+            return views
+        for _, viewset_class, _ in router.registry:
+            # Plain ViewSets (dashboard, batch, sync) have no serializer class
+            if not issubclass(viewset_class, viewsets.GenericViewSet):
+                continue
+            for action in ('list', 'retrieve'):
+                view = viewset_class(request=request, action=action, format_kwarg=None, kwargs={})
+                views.setdefault(view.get_serializer_class(), view)
+        return views
@@ -0,0 +1,65 @@
+"""
+Django management command to verify MessagePack responses match JSON responses
+Usage: python manage.py check_msgpack_compat [--limit N]
+"""
+
+import inspect
+import io
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework import serializers as drf_serializers
+
+from inspections import serializers as api_serializers
+from inspections.parsers import ORJSONParser, MessagePackParser
+from inspections.renderers import ORJSONRenderer, MessagePackRenderer
+from inspections.management.commands.benchmark_renderers import Command as BenchmarkCommand
+
+
+class Command(BaseCommand):
+    help = 'Round-trip every API serializer through JSON and MessagePack and check the decoded payloads match'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=50,
+            help='Number of database rows to serialize per serializer (default: 50)',
+        )
+
+    def handle(self, *args, **options):
+        failures = []
+
+        for name, payload in BenchmarkCommand().build_payloads(5):
+            failures += self.round_trip(name, payload)
+
+        for name, serializer_class in self.get_serializer_classes():
+            model = serializer_class.Meta.model
+            instances = list(model._default_manager.all()[:options['limit']])
+            if not instances:
+                self.stdout.write(self.style.WARNING(f'  {name}: no {model.__name__} rows, skipped'))
+                continue
+            payload = serializer_class(instances, many=True).data
+            failures += self.round_trip(f'{name} ({len(instances)} rows)', payload)
+
+        if failures:
+            for failure in failures:
+                self.stderr.write(self.style.ERROR(f'  {failure}'))
+            raise CommandError(f'{len(failures)} MessagePack compatibility failure(s)')
+        self.stdout.write(self.style.SUCCESS('All serializers round-trip identically through JSON and MessagePack'))
+
+    def get_serializer_classes(self):
+        """Every model serializer defined by the API"""
+        for name, obj in inspect.getmembers(api_serializers, inspect.isclass):
+            if (
+                issubclass(obj, drf_serializers.ModelSerializer)
+                and obj.__module__ == api_serializers.__name__
+            ):
+                yield name, obj
+
+    def round_trip(self, name, payload):
+        from_json = ORJSONParser().parse(io.BytesIO(ORJSONRenderer().render(payload)))
+        from_msgpack = MessagePackParser().parse(io.BytesIO(MessagePackRenderer().render(payload)))
+        if from_json != from_msgpack:
+            return [f'{name}: MessagePack payload differs from JSON payload']
+        self.stdout.write(f'  {name}: ok')
+        return []
@@ -7,7 +7,7 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from inspections.models import (
-    Client, Equipment, JobOrder, JobLineItem, Inspection,
+    Client, ClientMembership, Equipment, JobOrder, JobLineItem, Inspection,
     InspectionAnswer, PhotoRef, Certificate, Sticker,
     FieldInspectionReport, Approval, Publication, Tool, Calibration
 )
@@ -45,6 +45,10 @@ class Command(BaseCommand):
         clients = self.create_clients(users['admin'])
         self.stdout.write(self.style.SUCCESS(f'✓ Created {len(clients)} clients'))
 
+        # Bind client users to client companies
+        memberships = self.create_client_memberships(users['clients'], clients)
+        self.stdout.write(self.style.SUCCESS(f'✓ Created {len(memberships)} client memberships'))
+
         # Create equipment
         equipment_list = self.create_equipment(clients, users['admin'])
         self.stdout.write(self.style.SUCCESS(f'✓ Created {len(equipment_list)} equipment items'))
@@ -114,6 +118,7 @@ class Command(BaseCommand):
         JobOrder.objects.all().delete()
         Sticker.objects.all().delete()
         Equipment.objects.all().delete()
+        ClientMembership.objects.all().delete()
         Client.objects.all().delete()
         User.objects.filter(is_superuser=False).delete()
 
@@ -239,6 +244,14 @@ class Command(BaseCommand):
         
         return clients
 
+    def create_client_memberships(self, client_users, clients):
+        """Bind each client user to one of the client companies"""
+        memberships = []
+        for client_user, client in zip(client_users, clients):
+            membership, _ = ClientMembership.objects.get_or_create(user=client_user, client=client)
+            memberships.append(membership)
+        return memberships
+
     def create_equipment(self, clients, created_by):
         """Create equipment items"""
         equipment_list = []
@@ -0,0 +1,19 @@
+"""
+Django management command to rebuild the operations dashboard counters
+Usage: python manage.py refresh_dashboard_rollups
+"""
+
+from django.core.management.base import BaseCommand
+
+from inspections.models import DashboardRollup
+from inspections.rollups import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute all dashboard rollup counters from the source tables (run once after deploying)'
+
+    def handle(self, *args, **options):
+        refreshed_at = refresh_rollups(include_live=True)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {DashboardRollup.objects.count()} dashboard counters at {refreshed_at.isoformat()}'
+        ))
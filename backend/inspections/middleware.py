@@ -0,0 +1,343 @@
+"""
+Middleware for the inspection API
+"""
+import logging
+import zlib
+
+import brotli
+import redis
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from . import db_router, idempotency
+from .query_budget import QueryRecorder, QueryBudgetExceeded, get_view_query_budget
+
+
+logger = logging.getLogger(__name__)
+
+
+class _GzipCompressor:
+    def __init__(self, level):
+        # wbits=31 writes a gzip header and trailer around the deflate stream
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def _compress_stream(chunks, compressor):
+    # Flushing each chunk sends it on as soon as it is produced instead of
+    # when the compressor's window fills
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def _acompress_stream(chunks, compressor):
+    async for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def _parse_accept_encoding(header):
+    """Return {coding: q} for an Accept-Encoding header"""
+    codings = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding] = q
+    return codings
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses with brotli or gzip, whichever the client prefers.
+
+    Bodies smaller than COMPRESSION_MIN_SIZE and already-compressed content types
+    (images, PDFs, archives, spreadsheets) are passed through untouched. Streaming
+    responses are compressed and flushed chunk by chunk so large exports never
+    sit in memory and reach the client as they are produced.
+
+    HTML pages and responses setting the CSRF cookie are never compressed: they
+    can carry the CSRF token next to reflected input, which is what the BREACH
+    attack needs to recover the token from compressed sizes.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+        self.gzip_level = getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6)
+        self.brotli_quality = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5)
+        self.excluded_content_types = tuple(getattr(settings, 'COMPRESSION_EXCLUDED_CONTENT_TYPES', ()))
+
+    def select_encoding(self, request):
+        codings = _parse_accept_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        wildcard = codings.get('*', 0.0)
+        br = codings.get('br', wildcard)
+        gzip = codings.get('gzip', wildcard)
+        if br > 0 and br >= gzip:
+            return 'br'
+        if gzip > 0:
+            return 'gzip'
+        return None
+
+    def get_compressor(self, encoding):
+        if encoding == 'br':
+            return _BrotliCompressor(self.brotli_quality)
+        return _GzipCompressor(self.gzip_level)
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type.startswith(self.excluded_content_types):
+            return response
+
+        if content_type == 'text/html' or settings.CSRF_COOKIE_NAME in response.cookies:
+            return response
+
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = self.select_encoding(request)
+        if encoding is None:
+            return response
+
+        compressor = self.get_compressor(encoding)
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = _acompress_stream(response.streaming_content, compressor)
+            else:
+                response.streaming_content = _compress_stream(response.streaming_content, compressor)
+            # The compressed size is unknown until the stream has been sent.
+            del response.headers['Content-Length']
+        else:
+            compressed = compressor.compress(response.content) + compressor.finish()
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+
+        return response
+
+
+class QueryBudgetMiddleware:
+    """
+    Development/test guard that records every SQL query per request.
+
+    Repeated query shapes (N+1) are logged together with the serializer field
+    that issued them, and a request running more queries than its endpoint's
+    budget (viewset `query_budget`, else QUERY_BUDGET_DEFAULT) fails with
+    QueryBudgetExceeded. Enabled with QUERY_BUDGET_ENABLED (defaults to DEBUG).
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_BUDGET_ENABLED', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+
+        response.headers['X-Query-Count'] = str(len(recorder))
+
+        match = request.resolver_match
+        view_class = getattr(match.func, 'cls', None) if match else None
+        if view_class is None:
+            return response
+
+        actions = getattr(match.func, 'actions', None) or {}
+        action = actions.get(request.method.lower())
+        label = f'{view_class.__name__}.{action or request.method.lower()}'
+
+        if recorder.repeated_shapes():
+            logger.warning('Possible N+1 in %s (%s)\n%s', label, request.path, recorder.report())
+
+        budget = get_view_query_budget(view_class, action)
+        if len(recorder) > budget:
+            raise QueryBudgetExceeded(label, budget, recorder)
+        return response
+
+
+def _token_user_id(request):
+    """User id claim of the request's JWT, without touching the database"""
+    authenticator = JWTAuthentication()
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return None
+    try:
+        return authenticator.get_validated_token(raw_token)[jwt_settings.USER_ID_CLAIM]
+    except (InvalidToken, TokenError, KeyError):
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Route each request's reads between the primary and the read replicas.
+
+    Safe-method requests read from a replica unless their user wrote within
+    REPLICA_STICKY_SECONDS; a request that writes marks its user sticky.
+    Users are identified by their JWT (or admin session) without a database
+    read. Installed only when DATABASE_REPLICAS is configured.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        user_id = _token_user_id(request)
+        if user_id is None and settings.SESSION_COOKIE_NAME in request.COOKIES:
+            user_id = request.session.get(SESSION_KEY)
+
+        replica = request.method in SAFE_METHODS and not (user_id and db_router.is_sticky(user_id))
+        with db_router.route(replica) as state:
+            response = self.get_response(request)
+
+        if state.wrote and user_id:
+            db_router.mark_sticky(user_id)
+        return response
+
+    async def __acall__(self, request):
+        user_id = _token_user_id(request)
+
+        replica = request.method in SAFE_METHODS and not (user_id and await db_router.ais_sticky(user_id))
+        with db_router.route(replica) as state:
+            response = await self.get_response(request)
+
+        if state.wrote and user_id:
+            await db_router.amark_sticky(user_id)
+        return response
+
+
+class IdempotencyMiddleware:
+    """
+    Run a POST carrying an Idempotency-Key header at most once per key and
+    replay its stored response to retries (see idempotency.py). Other
+    requests, and requests without a JWT user, pass straight through.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def prepare(self, request):
+        """(record key, fingerprint, error response); the key is None when the request isn't covered"""
+        key = request.META.get(idempotency.HEADER)
+        if request.method != 'POST' or key is None:
+            return None, None, None
+        if not key or len(key) > idempotency.MAX_KEY_LENGTH:
+            return None, None, JsonResponse(
+                {'error': f'Idempotency-Key must be 1 to {idempotency.MAX_KEY_LENGTH} characters'},
+                status=400,
+            )
+        user_id = _token_user_id(request)
+        if user_id is None:
+            return None, None, None
+        return idempotency.record_key(user_id, key), idempotency.fingerprint(request), None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        key, request_fingerprint, response = self.prepare(request)
+        if response is not None:
+            return response
+        if key is None:
+            return self.get_response(request)
+
+        try:
+            record = idempotency.claim(key, request_fingerprint)
+        except (redis.RedisError, OSError) as e:
+            logger.warning('Idempotency claim failed for %s, running without it: %s', key, e)
+            return self.get_response(request)
+        if record is not None:
+            return idempotency.stored_response(record, request_fingerprint)
+
+        response = self.get_response(request)
+        idempotency.complete(key, request_fingerprint, response)
+        return response
+
+    async def __acall__(self, request):
+        key, request_fingerprint, response = self.prepare(request)
+        if response is not None:
+            return response
+        if key is None:
+            return await self.get_response(request)
+
+        try:
+            record = await idempotency.aclaim(key, request_fingerprint)
+        except (redis.RedisError, OSError) as e:
+            logger.warning('Idempotency claim failed for %s, running without it: %s', key, e)
+            return await self.get_response(request)
+        if record is not None:
+            return idempotency.stored_response(record, request_fingerprint)
+
+        response = await self.get_response(request)
+        await idempotency.acomplete(key, request_fingerprint, response)
+        return response
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_memberships(apps, schema_editor):
+    """Bind existing CLIENT users to the clients that share their email"""
+    User = apps.get_model('inspections', 'User')
+    Client = apps.get_model('inspections', 'Client')
+    ClientMembership = apps.get_model('inspections', 'ClientMembership')
+
+    memberships = []
+    for user_id, email in User.objects.filter(role='CLIENT').exclude(email='').values_list('id', 'email'):
+        for client_id in Client.objects.filter(email=email).values_list('id', flat=True):
+            memberships.append(ClientMembership(user_id=user_id, client_id=client_id))
+    ClientMembership.objects.bulk_create(memberships, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inspections', '0004_toolincident_toolusagelog_tool_assignment_mode_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='inspections.client')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='client_memberships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'client_memberships',
+                'ordering': ['user', 'client'],
+                'unique_together': {('user', 'client')},
+            },
+        ),
+        migrations.RunPython(backfill_memberships, migrations.RunPython.noop),
+    ]
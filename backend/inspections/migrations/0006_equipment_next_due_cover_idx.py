@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inspections', '0005_clientmembership'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(condition=models.Q(('next_due__isnull', False)), fields=['next_due'], include=('client',), name='equipment_next_due_cover_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inspections', '0006_equipment_next_due_cover_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=50)),
+                ('bucket', models.CharField(help_text='Status, month (YYYY-MM) or day (YYYY-MM-DD)', max_length=50)),
+                ('value', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'dashboard_rollups',
+                'ordering': ['metric', 'bucket'],
+                'unique_together': {('metric', 'bucket')},
+            },
+        ),
+    ]
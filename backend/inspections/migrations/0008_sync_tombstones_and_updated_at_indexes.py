@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:27
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inspections', '0007_dashboardrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(max_length=50)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'sync_tombstones',
+                'ordering': ['deleted_at', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['updated_at', 'id'], name='equipment_updated_bb260c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inspection',
+            index=models.Index(fields=['updated_at', 'id'], name='inspections_updated_321874_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inspectionanswer',
+            index=models.Index(fields=['updated_at', 'id'], name='inspection__updated_94573c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='joblineitem',
+            index=models.Index(fields=['updated_at', 'id'], name='job_line_it_updated_37b21c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='joborder',
+            index=models.Index(fields=['updated_at', 'id'], name='job_orders_updated_810cc8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='photoref',
+            index=models.Index(fields=['updated_at', 'id'], name='photo_refs_updated_87629c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['updated_at', 'id'], name='services_updated_c8bca9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='serviceversion',
+            index=models.Index(fields=['updated_at', 'id'], name='service_ver_updated_cf6292_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='toolcategory',
+            index=models.Index(fields=['updated_at', 'id'], name='tool_catego_updated_842d28_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='synctombstone',
+            index=models.Index(fields=['deleted_at', 'id'], name='sync_tombst_deleted_88c5b6_idx'),
+        ),
+    ]
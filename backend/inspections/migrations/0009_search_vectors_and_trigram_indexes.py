@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:30
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inspections', '0008_sync_tombstones_and_updated_at_indexes'),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.TrigramExtension(),
+        migrations.AddField(
+            model_name='client',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('name', config='simple', weight='A'), '||', django.contrib.postgres.search.SearchVector('contact_person', config='simple', weight='B'), django.contrib.postgres.search.SearchConfig('simple')), '||', django.contrib.postgres.search.SearchVector('email', config='simple', weight='C'), django.contrib.postgres.search.SearchConfig('simple')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('tag_code', 'serial_number', config='simple', weight='A'), '||', django.contrib.postgres.search.SearchVector('manufacturer', 'model', config='simple', weight='B'), django.contrib.postgres.search.SearchConfig('simple')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddField(
+            model_name='person',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('first_name', 'last_name', config='simple', weight='A'), '||', django.contrib.postgres.search.SearchVector('email', config='simple', weight='B'), django.contrib.postgres.search.SearchConfig('simple')), '||', django.contrib.postgres.search.SearchVector('employer', config='simple', weight='C'), django.contrib.postgres.search.SearchConfig('simple')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddField(
+            model_name='tool',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('name', 'serial_number', config='simple', weight='A'), '||', django.contrib.postgres.search.SearchVector('location', config='simple', weight='C'), django.contrib.postgres.search.SearchConfig('simple')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='clients_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='equipment_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['tag_code'], name='equipment_tag_code_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['serial_number'], name='equipment_serial_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='people_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tool',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='tools_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tool',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['serial_number'], name='tools_serial_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inspections', '0010_code_sequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inspection',
+            index=models.Index(condition=models.Q(('status', 'SUBMITTED')), fields=['end_time', 'id'], name='inspection_submitted_idx'),
+        ),
+    ]
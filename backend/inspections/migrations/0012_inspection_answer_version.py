@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inspections', '0011_inspection_submitted_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inspection',
+            name='version',
+            field=models.PositiveIntegerField(default=1, help_text='Incremented on every save'),
+        ),
+        migrations.AddField(
+            model_name='inspectionanswer',
+            name='version',
+            field=models.PositiveIntegerField(default=1, help_text='Incremented on every save'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inspections', '0012_inspection_answer_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='synctombstone',
+            name='client_id',
+            field=models.BigIntegerField(blank=True, help_text='Client the row belonged to, if its entity is scoped by client', null=True),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 import uuid
@@ -60,6 +62,39 @@ class AuditedModel(TimeStampedModel):
         abstract = True
 
 
+class VersionConflict(Exception):
+    """Raised when saving a versioned row that another write changed since it was read"""
+    
+    def __init__(self, instance):
+        super().__init__(f"{instance._meta.object_name} {instance.pk} was modified concurrently")
+        self.instance = instance
+
+
+class VersionedModel(models.Model):
+    """
+    Abstract base model with optimistic concurrency control.
+    
+    Every save runs UPDATE ... SET version = version + 1 WHERE id = %s AND
+    version = <the instance's version>, so a save based on a stale read
+    raises VersionConflict instead of overwriting the newer row.
+    """
+    version = models.PositiveIntegerField(default=1, help_text="Incremented on every save")
+    
+    class Meta:
+        abstract = True
+    
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        version_field = self._meta.get_field('version')
+        values = [value for value in values if value[0] is not version_field]
+        values.append((version_field, None, models.F('version') + 1))
+        if base_qs.filter(pk=pk_val, version=self.version)._update(values):
+            self.version += 1
+            return True
+        if base_qs.filter(pk=pk_val).exists():
+            raise VersionConflict(self)
+        return False
+
+
 class Client(AuditedModel):
     """Client/Customer model"""
     name = models.CharField(max_length=255)
@@ -69,6 +104,15 @@ class Client(AuditedModel):
     address = models.TextField()
     billing_reference = models.CharField(max_length=100, blank=True)
     is_active = models.BooleanField(default=True)
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('name', weight='A', config='simple')
+            + SearchVector('contact_person', weight='B', config='simple')
+            + SearchVector('email', weight='C', config='simple')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
     
     class Meta:
         db_table = 'clients'
@@ -76,12 +120,27 @@ class Client(AuditedModel):
         indexes = [
             models.Index(fields=['name']),
             models.Index(fields=['email']),
+            GinIndex(fields=['search_vector'], name='clients_search_idx'),
         ]
     
     def __str__(self):
         return self.name
 
 
+class ClientMembership(TimeStampedModel):
+    """Binds a CLIENT user to the client companies whose data they may see"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='client_memberships')
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='memberships')
+
+    class Meta:
+        db_table = 'client_memberships'
+        ordering = ['user', 'client']
+        unique_together = ['user', 'client']
+
+    def __str__(self):
+        return f"{self.user} -> {self.client}"
+
+
 class Equipment(AuditedModel):
     """Equipment model for items to be inspected"""
     client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='equipment')
@@ -100,6 +159,14 @@ class Equipment(AuditedModel):
     )
     location = models.TextField()
     next_due = models.DateField(null=True, blank=True, help_text="Next inspection due date")
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('tag_code', 'serial_number', weight='A', config='simple')
+            + SearchVector('manufacturer', 'model', weight='B', config='simple')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
     
     class Meta:
         db_table = 'equipment'
@@ -108,6 +175,18 @@ class Equipment(AuditedModel):
             models.Index(fields=['tag_code']),
             models.Index(fields=['serial_number']),
             models.Index(fields=['client', 'next_due']),
+            # Covers the due-soon range scan and its week/client rollup without heap reads
+            models.Index(
+                fields=['next_due'],
+                include=['client'],
+                condition=models.Q(next_due__isnull=False),
+                name='equipment_next_due_cover_idx',
+            ),
+            models.Index(fields=['updated_at', 'id']),
+            GinIndex(fields=['search_vector'], name='equipment_search_idx'),
+            # Fuzzy and substring matching on codes that don't tokenize into words
+            GinIndex(fields=['tag_code'], opclasses=['gin_trgm_ops'], name='equipment_tag_code_trgm_idx'),
+            GinIndex(fields=['serial_number'], opclasses=['gin_trgm_ops'], name='equipment_serial_trgm_idx'),
         ]
         verbose_name_plural = 'Equipment'
     
@@ -150,6 +229,7 @@ class Service(AuditedModel):
         indexes = [
             models.Index(fields=['code']),
             models.Index(fields=['category', 'status']),
+            models.Index(fields=['updated_at', 'id']),
         ]
 
     def __str__(self):
@@ -222,6 +302,7 @@ class ServiceVersion(AuditedModel):
         indexes = [
             models.Index(fields=['service', 'version_number']),
             models.Index(fields=['service', 'is_published']),
+            models.Index(fields=['updated_at', 'id']),
         ]
 
     def __str__(self):
@@ -281,6 +362,7 @@ class JobOrder(AuditedModel):
         indexes = [
             models.Index(fields=['client', 'status']),
             models.Index(fields=['status', 'scheduled_start']),
+            models.Index(fields=['updated_at', 'id']),
         ]
     
     def __str__(self):
@@ -312,12 +394,15 @@ class JobLineItem(AuditedModel):
     class Meta:
         db_table = 'job_line_items'
         ordering = ['job_order', 'id']
+        indexes = [
+            models.Index(fields=['updated_at', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.job_order} - {self.type}"
 
 
-class Inspection(AuditedModel):
+class Inspection(VersionedModel, AuditedModel):
     """Inspection execution model"""
     
     class Status(models.TextChoices):
@@ -353,13 +438,20 @@ class Inspection(AuditedModel):
         indexes = [
             models.Index(fields=['inspector', 'status']),
             models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['updated_at', 'id']),
+            # Approvals inbox: only the (few) submitted rows, oldest submission first
+            models.Index(
+                fields=['end_time', 'id'],
+                condition=models.Q(status='SUBMITTED'),
+                name='inspection_submitted_idx',
+            ),
         ]
     
     def __str__(self):
         return f"Inspection {self.id} - {self.job_line_item}"
 
 
-class InspectionAnswer(TimeStampedModel):
+class InspectionAnswer(VersionedModel, TimeStampedModel):
     """Checklist answers for an inspection"""
     
     class Result(models.TextChoices):
@@ -380,6 +472,9 @@ class InspectionAnswer(TimeStampedModel):
         db_table = 'inspection_answers'
         unique_together = ['inspection', 'question_key']
         ordering = ['inspection', 'question_key']
+        indexes = [
+            models.Index(fields=['updated_at', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.inspection} - {self.question_key}: {self.result}"
@@ -410,6 +505,7 @@ class PhotoRef(TimeStampedModel):
         ordering = ['inspection', 'slot_name']
         indexes = [
             models.Index(fields=['inspection', 'slot_name']),
+            models.Index(fields=['updated_at', 'id']),
         ]
     
     def __str__(self):
@@ -599,6 +695,9 @@ class ToolCategory(AuditedModel):
     class Meta:
         db_table = 'tool_categories'
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['updated_at', 'id']),
+        ]
         verbose_name_plural = 'Tool Categories'
 
     def __str__(self):
@@ -642,6 +741,14 @@ class Tool(AuditedModel):
         blank=True,
         related_name='tools'
     )
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('name', 'serial_number', weight='A', config='simple')
+            + SearchVector('location', weight='C', config='simple')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
 
     class Meta:
         db_table = 'tools'
@@ -649,6 +756,8 @@ class Tool(AuditedModel):
         indexes = [
             models.Index(fields=['status']),
             models.Index(fields=['category', 'status']),
+            GinIndex(fields=['search_vector'], name='tools_search_idx'),
+            GinIndex(fields=['serial_number'], opclasses=['gin_trgm_ops'], name='tools_serial_trgm_idx'),
         ]
 
     def __str__(self):
@@ -807,6 +916,54 @@ class AuditLog(models.Model):
         return f"{self.user} - {self.action} - {self.entity_type} {self.entity_id}"
 
 
+class CodeSequence(models.Model):
+    """Named counter that hands out contiguous ranges of numbers (e.g. sticker codes)"""
+    name = models.CharField(max_length=50, primary_key=True)
+    last_value = models.BigIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'code_sequences'
+        ordering = ['name']
+    
+    def __str__(self):
+        return f"{self.name} = {self.last_value}"
+
+
+class DashboardRollup(models.Model):
+    """Pre-aggregated counter behind the operations dashboard"""
+    metric = models.CharField(max_length=50)
+    bucket = models.CharField(max_length=50, help_text="Status, month (YYYY-MM) or day (YYYY-MM-DD)")
+    value = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'dashboard_rollups'
+        ordering = ['metric', 'bucket']
+        unique_together = ['metric', 'bucket']
+    
+    def __str__(self):
+        return f"{self.metric}[{self.bucket}] = {self.value}"
+
+
+class SyncTombstone(models.Model):
+    """Record of a deleted row, so offline devices can drop it on their next delta sync"""
+    entity = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    # Not a foreign key: the client may be deleted in the same cascade as the row
+    client_id = models.BigIntegerField(null=True, blank=True, help_text='Client the row belonged to, if its entity is scoped by client')
+    deleted_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'sync_tombstones'
+        ordering = ['deleted_at', 'id']
+        indexes = [
+            models.Index(fields=['deleted_at', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.entity} {self.object_id} deleted {self.deleted_at}"
+
+
 class CompetenceAuthorization(AuditedModel):
     """Structured competence authorizations per service/discipline."""
 
@@ -896,6 +1053,15 @@ class Person(AuditedModel):
     employer = models.CharField(max_length=255, blank=True)
     client = models.ForeignKey(Client, on_delete=models.SET_NULL, null=True, blank=True, related_name='associated_people')
     notes = models.TextField(blank=True)
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('first_name', 'last_name', weight='A', config='simple')
+            + SearchVector('email', weight='B', config='simple')
+            + SearchVector('employer', weight='C', config='simple')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
 
     class Meta:
         db_table = 'people'
@@ -903,6 +1069,7 @@ class Person(AuditedModel):
         indexes = [
             models.Index(fields=['person_type']),
             models.Index(fields=['client', 'person_type']),
+            GinIndex(fields=['search_vector'], name='people_search_idx'),
         ]
 
     def __str__(self):
@@ -0,0 +1,136 @@
+"""
+Pagination for very large list endpoints
+
+`EstimatedCountPagination` replaces the exact `COUNT(*)` behind a page with
+the PostgreSQL planner's row estimate: `pg_class` statistics for unfiltered
+lists, the top plan node of `EXPLAIN` for filtered ones. Estimates below
+PAGINATION_EXACT_COUNT_THRESHOLD are replaced by an exact count, which is
+cheap at that size. Responses carry `count_is_estimated` so clients can show
+"about N" instead of a precise total.
+"""
+import json
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+
+def table_row_estimate(queryset):
+    """Planner row estimate for the queryset's whole table, or None before the first ANALYZE"""
+    connection = connections[queryset.db]
+    with connection.cursor() as cursor:
+        # Scale the last ANALYZE's tuple density by the table's current size, as the planner does
+        cursor.execute(
+            """
+            SELECT CASE WHEN c.reltuples < 0 OR c.relpages = 0 THEN NULL
+                        ELSE c.reltuples / c.relpages
+                             * (pg_relation_size(c.oid) / current_setting('block_size')::int)
+                   END
+            FROM pg_class c
+            WHERE c.oid = %s::regclass
+            """,
+            [connection.ops.quote_name(queryset.model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    return int(row[0]) if row and row[0] is not None else None
+
+
+def plan_row_estimate(queryset):
+    """Row estimate of the queryset's top plan node"""
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def is_unfiltered(queryset):
+    query = queryset.query
+    return (
+        not query.where and not query.distinct and not query.combinator
+        and query.low_mark == 0 and query.high_mark is None
+    )
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator whose count comes from planner estimates on large results.
+
+    While the count is estimated, pages past the estimate stay reachable:
+    each page fetches one extra row to know whether another page follows, and
+    a short page replaces the estimate with the now-known exact count.
+    """
+
+    count_is_estimated = False
+
+    def estimate_count(self):
+        queryset = self.object_list
+        estimate = table_row_estimate(queryset) if is_unfiltered(queryset) else None
+        if estimate is None:
+            estimate = plan_row_estimate(queryset)
+        return estimate
+
+    @cached_property
+    def count(self):
+        estimate = self.estimate_count()
+        if estimate is None or estimate < settings.PAGINATION_EXACT_COUNT_THRESHOLD:
+            return super().count
+        self.count_is_estimated = True
+        return estimate
+
+    def validate_number(self, number):
+        if not self.count_is_estimated:
+            return super().validate_number(number)
+        # Like Paginator.validate_number, without the upper bound
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages['invalid_page'])
+        if number < 1:
+            raise EmptyPage(self.error_messages['min_page'])
+        return number
+
+    def page(self, number):
+        # Reading the count first decides whether it is estimated
+        if not (self.count and self.count_is_estimated):
+            return super().page(number)
+
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if len(rows) > self.per_page:
+            rows = rows[:self.per_page]
+            # Keep a next page reachable even if the estimate was too low
+            self.__dict__['count'] = max(self.count, bottom + self.per_page + 1)
+        elif rows or number == 1:
+            self.__dict__['count'] = bottom + len(rows)
+            self.count_is_estimated = False
+        else:
+            raise EmptyPage(self.error_messages['no_results'])
+        self.__dict__.pop('num_pages', None)
+        return self._get_page(rows, number, self)
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """Page number pagination with planner-estimated counts for very large lists"""
+
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.page.paginator.count,
+            'count_is_estimated': self.page.paginator.count_is_estimated,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_is_estimated'] = {
+            'type': 'boolean',
+            'example': False,
+        }
+        return response_schema
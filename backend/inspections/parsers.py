@@ -0,0 +1,59 @@
+"""
+Fast parsers for the REST API
+"""
+import msgpack
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+from .renderers import ORJSONRenderer, MessagePackRenderer, LegacyMessagePackRenderer
+
+
+class ORJSONParser(JSONParser):
+    """Drop-in replacement for DRF's JSONParser backed by orjson"""
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackParser(BaseParser):
+    """Parses MessagePack request bodies sent by mobile clients"""
+    media_type = 'application/msgpack'
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False, strict_map_key=False)
+        except (msgpack.ExtraData, msgpack.FormatError, msgpack.StackError, ValueError) as exc:
+            raise ParseError('MessagePack parse error - %s' % str(exc))
+
+
+class LegacyMessagePackParser(MessagePackParser):
+    """MessagePack parser for the unregistered x- media type"""
+    media_type = 'application/x-msgpack'
+    renderer_class = LegacyMessagePackRenderer
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline-delimited JSON lazily: the parsed data is an iterator that
+    reads one line of the body per item, so large uploads are never held in
+    memory whole. A line that isn't valid JSON yields a ParseError in its place.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return self._iter_lines(stream) if stream is not None else iter(())
+
+    def _iter_lines(self, stream):
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                yield orjson.loads(line)
+            except orjson.JSONDecodeError as exc:
+                yield ParseError('JSON parse error - %s' % str(exc))
@@ -37,6 +37,16 @@ class IsInspector(permissions.BasePermission):
         )
 
 
+class IsStaffMember(permissions.BasePermission):
+    """Permission for internal staff (any role except client)"""
+    def has_permission(self, request, view):
+        return (
+            request.user and
+            request.user.is_authenticated and
+            request.user.role != 'CLIENT'
+        )
+
+
 class IsClient(permissions.BasePermission):
     """Permission for client users"""
     def has_permission(self, request, view):
@@ -0,0 +1,139 @@
+"""
+Query recording, N+1 detection and per-endpoint query budgets
+"""
+import re
+import sys
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from rest_framework import serializers
+
+
+_in_list_re = re.compile(r'IN \((?:%s, )*%s\)')
+_whitespace_re = re.compile(r'\s+')
+
+
+def query_shape(sql):
+    """Normalise SQL so queries that differ only by parameters share a shape"""
+    return _whitespace_re.sub(' ', _in_list_re.sub('IN (...)', sql)).strip()
+
+
+def _serializer_field_from_stack(frame):
+    """Name the innermost serializer field ('Serializer.field') on the call stack, if any"""
+    while frame is not None:
+        # Compiled serializer read paths hold the field as a `field` closure variable
+        for name in ('self', 'field'):
+            candidate = frame.f_locals.get(name)
+            if (
+                isinstance(candidate, serializers.Field)
+                and candidate.field_name
+                and candidate.parent is not None
+            ):
+                return f'{type(candidate.parent).__name__}.{candidate.field_name}'
+        frame = frame.f_back
+    return None
+
+
+class QueryRecorder:
+    """
+    Record every SQL statement executed on any database while active.
+
+    Each entry carries the query shape and the serializer field that triggered
+    it, so repeated shapes can be traced back to the field causing an N+1.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self._stack = None
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for alias in connections:
+            self._stack.enter_context(connections[alias].execute_wrapper(self._record))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+        self._stack = None
+
+    def _record(self, execute, sql, params, many, context):
+        self.queries.append({
+            'sql': sql,
+            'shape': query_shape(sql),
+            'alias': context['connection'].alias,
+            'field': _serializer_field_from_stack(sys._getframe(1)),
+        })
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def repeated_shapes(self, threshold=None):
+        """Return [(shape, count, fields)] for shapes executed at least `threshold` times"""
+        if threshold is None:
+            threshold = getattr(settings, 'QUERY_BUDGET_N_PLUS_ONE_THRESHOLD', 5)
+        counts = Counter(query['shape'] for query in self.queries)
+        repeated = []
+        for shape, count in counts.most_common():
+            if count < threshold:
+                break
+            fields = sorted({
+                query['field'] for query in self.queries
+                if query['shape'] == shape and query['field']
+            })
+            repeated.append((shape, count, fields))
+        return repeated
+
+    def report(self, threshold=None):
+        lines = [f'{len(self.queries)} queries executed']
+        for shape, count, fields in self.repeated_shapes(threshold):
+            source = ', '.join(fields) if fields else 'unknown (not inside a serializer field)'
+            lines.append(f'  N+1: {count}x from {source}: {shape[:200]}')
+        by_field = Counter(query['field'] for query in self.queries if query['field'])
+        for field, count in by_field.most_common():
+            lines.append(f'  {count} queries from serializer field {field}')
+        return '\n'.join(lines)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a request or block exceeds its query budget or repeats a query shape"""
+
+    def __init__(self, label, budget, recorder):
+        self.label = label
+        self.budget = budget
+        self.recorder = recorder
+        super().__init__(f'{label} violated its query budget of {budget}:\n{recorder.report()}')
+
+
+def get_view_query_budget(view_class, action):
+    """
+    Resolve the budget for a viewset action.
+
+    Viewsets may declare `query_budget` as an int or as a dict keyed by action
+    name; anything else falls back to QUERY_BUDGET_DEFAULT.
+    """
+    default = getattr(settings, 'QUERY_BUDGET_DEFAULT', 50)
+    budget = getattr(view_class, 'query_budget', None)
+    if isinstance(budget, dict):
+        return budget.get(action, budget.get('default', default))
+    if budget is None:
+        return default
+    return budget
+
+
+@contextmanager
+def assert_query_budget(budget, label='block', n_plus_one_threshold=None):
+    """
+    Test helper: fail if the block runs more than `budget` queries.
+
+        with assert_query_budget(5, label='inspection list'):
+            client.get('/api/inspections/')
+    """
+    with QueryRecorder() as recorder:
+        yield recorder
+    if len(recorder) > budget:
+        raise QueryBudgetExceeded(label, budget, recorder)
+    if n_plus_one_threshold is not None and recorder.repeated_shapes(n_plus_one_threshold):
+        raise QueryBudgetExceeded(label, budget, recorder)
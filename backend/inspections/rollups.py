@@ -0,0 +1,256 @@
+"""
+Pre-aggregated counters behind the operations dashboard
+
+Each rollup maps a row of a source model to at most one (metric, bucket)
+counter in DashboardRollup. Status counters are live: signals (and the bulk
+write paths, which skip them) move rows between buckets as they are saved
+and deleted. Dated counters are owned by `refresh_rollups`, run every
+DASHBOARD_REFRESH_SECONDS, and lag writes by up to that long.
+
+No counter is written by both, so the periodic refresh can't race the
+increments applied after commit. `refresh_rollups(include_live=True)`
+rebuilds the live counters as well; it is meant for the initial backfill and
+for repairs, and increments applied while it runs may be lost or counted
+twice.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import (
+    DashboardRollup, JobOrder, Inspection, Certificate, Tool,
+    PersonCredential, CompetenceAuthorization
+)
+
+
+class StatusRollup:
+    """Count rows per status value"""
+    live = True
+
+    def __init__(self, metric, model, field='status'):
+        self.metric = metric
+        self.model = model
+        self.fields = (field,)
+        self.field = field
+
+    def bucket(self, values):
+        return values[self.field]
+
+    def aggregate(self):
+        rows = self.model.objects.order_by().values(self.field).annotate(count=Count('pk'))
+        return ((row[self.field], row['count']) for row in rows)
+
+
+class DateRollup:
+    """Count rows per day of a date field, restricted to rows matching `condition`"""
+    live = False
+
+    def __init__(self, metric, model, field, condition):
+        self.metric = metric
+        self.model = model
+        self.field = field
+        self.condition = condition
+        self.fields = (field,) + tuple(condition)
+
+    def bucket(self, values):
+        if values[self.field] is None:
+            return None
+        for name, allowed in self.condition.items():
+            if values[name] not in allowed:
+                return None
+        return values[self.field].isoformat()
+
+    def aggregate(self):
+        filters = {f'{name}__in': allowed for name, allowed in self.condition.items()}
+        rows = (
+            self.model.objects.order_by()
+            .filter(**filters, **{f'{self.field}__isnull': False})
+            .values(self.field)
+            .annotate(count=Count('pk'))
+        )
+        return ((row[self.field].isoformat(), row['count']) for row in rows)
+
+
+class MonthRollup:
+    """Count rows per calendar month (current timezone) of a datetime field"""
+    live = False
+
+    def __init__(self, metric, model, field, exclude_status):
+        self.metric = metric
+        self.model = model
+        self.field = field
+        self.exclude_status = exclude_status
+        self.fields = (field, 'status')
+
+    def bucket(self, values):
+        if values[self.field] is None or values['status'] in self.exclude_status:
+            return None
+        return timezone.localtime(values[self.field]).strftime('%Y-%m')
+
+    def aggregate(self):
+        rows = (
+            self.model.objects.order_by()
+            .exclude(status__in=self.exclude_status)
+            .annotate(month=TruncMonth(self.field))
+            .values('month')
+            .annotate(count=Count('pk'))
+        )
+        return ((row['month'].strftime('%Y-%m'), row['count']) for row in rows)
+
+
+JOB_ORDERS_BY_STATUS = 'job_orders_by_status'
+INSPECTIONS_BY_STATUS = 'inspections_by_status'
+CERTIFICATES_ISSUED = 'certificates_issued'
+TOOL_CALIBRATION_DUE = 'tool_calibration_due'
+CREDENTIALS_VALID_UNTIL = 'credentials_valid_until'
+AUTHORIZATIONS_VALID_UNTIL = 'authorizations_valid_until'
+
+ROLLUPS = [
+    StatusRollup(JOB_ORDERS_BY_STATUS, JobOrder),
+    StatusRollup(INSPECTIONS_BY_STATUS, Inspection),
+    MonthRollup(CERTIFICATES_ISSUED, Certificate, 'issued_date', exclude_status=[Certificate.Status.DRAFT]),
+    DateRollup(
+        TOOL_CALIBRATION_DUE, Tool, 'calibration_due',
+        condition={'status': [s for s in Tool.Status.values if s not in (Tool.Status.RETIRED, Tool.Status.LOST)]},
+    ),
+    DateRollup(
+        CREDENTIALS_VALID_UNTIL, PersonCredential, 'valid_until',
+        condition={'status': [PersonCredential.CredentialStatus.ACTIVE]},
+    ),
+    DateRollup(
+        AUTHORIZATIONS_VALID_UNTIL, CompetenceAuthorization, 'valid_until',
+        condition={'status': [CompetenceAuthorization.Status.ACTIVE]},
+    ),
+]
+
+OPEN_JOB_ORDER_STATUSES = [
+    JobOrder.Status.DRAFT, JobOrder.Status.SCHEDULED, JobOrder.Status.IN_PROGRESS,
+]
+
+
+def rollups_for(model):
+    """Live rollups counting `model`, the ones its writes must update"""
+    return [rollup for rollup in ROLLUPS if rollup.live and rollup.model is model]
+
+
+def rollup_keys(model, values):
+    """(metric, bucket) counters a row with `values` contributes to"""
+    keys = []
+    for rollup in rollups_for(model):
+        bucket = rollup.bucket(values)
+        if bucket is not None:
+            keys.append((rollup.metric, bucket))
+    return keys
+
+
+def rollup_fields(model):
+    return {name for rollup in rollups_for(model) for name in rollup.fields}
+
+
+def instance_values(model, instance):
+    return {name: getattr(instance, name) for name in rollup_fields(model)}
+
+
+def stored_values(model, pk):
+    """Rollup fields of the row as currently stored, or None if it doesn't exist"""
+    return model.objects.filter(pk=pk).values(*rollup_fields(model)).first()
+
+
+def apply_deltas(deltas):
+    """Add {(metric, bucket): delta} to the stored counters"""
+    now = timezone.now()
+    for (metric, bucket), delta in deltas.items():
+        if not delta:
+            continue
+        counter = DashboardRollup.objects.filter(metric=metric, bucket=bucket)
+        if counter.update(value=F('value') + delta, updated_at=now):
+            continue
+        try:
+            with transaction.atomic():
+                DashboardRollup.objects.create(metric=metric, bucket=bucket, value=delta)
+        except IntegrityError:
+            counter.update(value=F('value') + delta, updated_at=now)
+
+
+def record_change(before, after):
+    """
+    Schedule counter updates for a row moving from `before` keys to `after` keys.
+
+    Counters are bumped after commit so hot counter rows are never locked for
+    the lifetime of the transaction that changed the source row.
+    """
+    deltas = Counter(after)
+    deltas.subtract(Counter(before))
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if deltas:
+        transaction.on_commit(lambda: apply_deltas(deltas))
+
+
+def refresh_rollups(include_live=False):
+    """Recompute the dated counters, and the live ones too with `include_live`, from the source tables"""
+    now = timezone.now()
+    with transaction.atomic():
+        for rollup in ROLLUPS:
+            if rollup.live and not include_live:
+                continue
+            DashboardRollup.objects.filter(metric=rollup.metric).delete()
+            DashboardRollup.objects.bulk_create([
+                DashboardRollup(metric=rollup.metric, bucket=bucket, value=count, updated_at=now)
+                for bucket, count in rollup.aggregate()
+            ])
+    return now
+
+
+def read_dashboard(today=None):
+    """Dashboard KPIs from the rollup table in two indexed reads"""
+    today = today or timezone.localdate()
+    window_end = today + timedelta(days=settings.DASHBOARD_EXPIRY_WINDOW_DAYS)
+    this_month = today.strftime('%Y-%m')
+
+    counters = DashboardRollup.objects.filter(
+        Q(metric__in=[JOB_ORDERS_BY_STATUS, INSPECTIONS_BY_STATUS]) |
+        Q(metric=CERTIFICATES_ISSUED, bucket=this_month)
+    ).values_list('metric', 'bucket', 'value')
+
+    job_orders_by_status = {status: 0 for status in JobOrder.Status.values}
+    inspections_by_status = {}
+    certificates_this_month = 0
+    for metric, bucket, value in counters:
+        if metric == JOB_ORDERS_BY_STATUS:
+            job_orders_by_status[bucket] = value
+        elif metric == INSPECTIONS_BY_STATUS:
+            inspections_by_status[bucket] = value
+        else:
+            certificates_this_month = value
+
+    today_key, window_key = today.isoformat(), window_end.isoformat()
+    dated = DashboardRollup.objects.filter(
+        metric__in=[TOOL_CALIBRATION_DUE, CREDENTIALS_VALID_UNTIL, AUTHORIZATIONS_VALID_UNTIL],
+        bucket__lte=window_key,
+    ).aggregate(
+        overdue_calibrations=Sum('value', filter=Q(metric=TOOL_CALIBRATION_DUE, bucket__lt=today_key)),
+        expiring_person_credentials=Sum(
+            'value', filter=Q(metric=CREDENTIALS_VALID_UNTIL, bucket__gte=today_key)
+        ),
+        expiring_competence_authorizations=Sum(
+            'value', filter=Q(metric=AUTHORIZATIONS_VALID_UNTIL, bucket__gte=today_key)
+        ),
+    )
+
+    return {
+        'open_job_orders': sum(job_orders_by_status[status] for status in OPEN_JOB_ORDER_STATUSES),
+        'job_orders_by_status': job_orders_by_status,
+        'inspections_awaiting_approval': inspections_by_status.get(Inspection.Status.SUBMITTED, 0),
+        'certificates_issued_this_month': certificates_this_month,
+        'overdue_calibrations': dated['overdue_calibrations'] or 0,
+        'expiring_credentials': {
+            'window_days': settings.DASHBOARD_EXPIRY_WINDOW_DAYS,
+            'person_credentials': dated['expiring_person_credentials'] or 0,
+            'competence_authorizations': dated['expiring_competence_authorizations'] or 0,
+        },
+    }
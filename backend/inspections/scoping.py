@@ -0,0 +1,18 @@
+"""
+Helpers for scoping querysets to the clients a CLIENT user belongs to
+"""
+from .models import ClientMembership
+
+
+def get_client_ids(request):
+    """Return the client ids bound to the requesting user, resolved once per request"""
+    client_ids = getattr(request, '_client_ids', None)
+    if client_ids is None:
+        # Users authenticated from a cached snapshot already carry their memberships
+        client_ids = getattr(request.user, '_snapshot_client_ids', None)
+    if client_ids is None:
+        client_ids = list(
+            ClientMembership.objects.filter(user_id=request.user.id).values_list('client_id', flat=True)
+        )
+        request._client_ids = client_ids
+    return client_ids
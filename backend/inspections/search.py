@@ -0,0 +1,169 @@
+"""
+Index-backed search for list endpoints
+
+`FullTextSearchFilter` is a drop-in `SearchFilter` that keeps each view's
+`search_fields` declaration but answers the model's own columns from its generated `search_vector` column and GIN indexes instead
+of `ILIKE '%term%'` on every column:
+
+* columns folded into the model's `search_vector` are matched as word
+  prefixes against that vector;
+* columns with a `gin_trgm_ops` index (tag codes, serial numbers) are
+  matched by substring and by trigram word similarity, so near-miss codes
+  still hit;
+* anything else (related fields, prefixed lookups) keeps DRF's lookup.
+
+Results are annotated with `search_rank`, which `SearchRankOrderingFilter`
+uses as the default ordering while a search is active.
+"""
+import operator
+import re
+from functools import reduce
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, TrigramWordSimilarity
+)
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import filters
+
+
+SEARCH_CONFIG = 'simple'
+SEARCH_VECTOR = 'search_vector'
+SEARCH_RANK = 'search_rank'
+
+# A term with none of these has no lexemes to match
+_WORD_RE = re.compile(r'[^\W_]')
+
+_vector_columns_cache = {}
+_trigram_columns_cache = {}
+
+
+def vector_columns(model):
+    """Columns folded into the model's generated search_vector"""
+    columns = _vector_columns_cache.get(model)
+    if columns is None:
+        try:
+            field = model._meta.get_field(SEARCH_VECTOR)
+        except FieldDoesNotExist:
+            columns = frozenset()
+        else:
+            columns = frozenset(
+                node.name for node in field.expression.flatten() if isinstance(node, models.F)
+            )
+        _vector_columns_cache[model] = columns
+    return columns
+
+
+def trigram_columns(model):
+    """Columns with a gin_trgm_ops index"""
+    columns = _trigram_columns_cache.get(model)
+    if columns is None:
+        columns = frozenset(
+            field_name
+            for index in model._meta.indexes
+            if isinstance(index, GinIndex) and 'gin_trgm_ops' in index.opclasses
+            for field_name in index.fields
+        )
+        _trigram_columns_cache[model] = columns
+    return columns
+
+
+def prefix_query(term):
+    """
+    tsquery matching `term` as a prefix. The term is passed as one quoted
+    operand so PostgreSQL tokenizes it exactly like the indexed columns,
+    e.g. emails and hyphenated codes, and multi-word terms match as phrases.
+    """
+    if not _WORD_RE.search(term):
+        return None
+    quoted = term.replace('\\', '\\\\').replace("'", "''")
+    return SearchQuery(f"'{quoted}':*", search_type='raw', config=SEARCH_CONFIG)
+
+
+@models.CharField.register_lookup
+class TrigramContains(models.Lookup):
+    """
+    Case-insensitive substring match written as `col ILIKE '%term%'`, the
+    form a gin_trgm_ops index on the column can serve. (`icontains`
+    compiles to `UPPER(col::text) LIKE ...`, which it can't.)
+    """
+    lookup_name = 'trigram_contains'
+
+    def get_db_prep_lookup(self, value, connection):
+        return '%s', [f'%{connection.ops.prep_for_like_query(value)}%']
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} ILIKE {rhs}', [*lhs_params, *rhs_params]
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """SearchFilter served from search_vector and trigram indexes"""
+
+    def split_search_fields(self, model, search_fields):
+        """Return (vector fields, trigram fields, other fields)"""
+        vector, trigram, other = [], [], []
+        indexed_vector = vector_columns(model)
+        indexed_trigram = trigram_columns(model)
+        for search_field in map(str, search_fields):
+            if search_field in indexed_trigram:
+                trigram.append(search_field)
+            elif search_field in indexed_vector:
+                vector.append(search_field)
+            else:
+                other.append(search_field)
+        return vector, trigram, other
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        if not search_fields or not search_terms:
+            return super().filter_queryset(request, queryset, view)
+
+        vector, trigram, other = self.split_search_fields(queryset.model, search_fields)
+        if not vector and not trigram:
+            return super().filter_queryset(request, queryset, view)
+
+        other_lookups = [self.construct_search(field, queryset) for field in other]
+        queries = []
+        conditions = []
+        for term in search_terms:
+            term_conditions = []
+            query = prefix_query(term) if vector else None
+            if query is not None:
+                queries.append(query)
+                term_conditions.append(models.Q(**{SEARCH_VECTOR: query}))
+            for field in trigram:
+                term_conditions.append(models.Q(**{f'{field}__trigram_contains': term}))
+                term_conditions.append(models.Q(**{f'{field}__trigram_word_similar': term}))
+            for lookup in other_lookups:
+                term_conditions.append(models.Q(**{lookup: term}))
+            # A term with no word characters and no other field to match filters nothing
+            if term_conditions:
+                conditions.append(reduce(operator.or_, term_conditions))
+        if not conditions:
+            return super().filter_queryset(request, queryset, view)
+
+        base = queryset
+        queryset = queryset.filter(reduce(operator.and_, conditions))
+        if other and self.must_call_distinct(queryset, other):
+            queryset = base.filter(models.Exists(queryset.filter(pk=models.OuterRef('pk'))))
+
+        ranks = [TrigramWordSimilarity(' '.join(search_terms), field) for field in trigram]
+        if queries:
+            ranks.append(SearchRank(models.F(SEARCH_VECTOR), reduce(operator.and_, queries)))
+        if not ranks:
+            return queryset
+        return queryset.annotate(**{SEARCH_RANK: reduce(operator.add, ranks)})
+
+
+class SearchRankOrderingFilter(filters.OrderingFilter):
+    """OrderingFilter that puts the best search matches first unless an ordering is requested"""
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if request.query_params.get(self.ordering_param) or SEARCH_RANK not in queryset.query.annotations:
+            return ordering
+        return [f'-{SEARCH_RANK}', *(ordering or [])]
@@ -1,6 +1,10 @@
+import os
+
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.utils.functional import cached_property
+from .compiled_serializers import CompiledRepresentationMixin
 from .models import (
     Client, Equipment, JobOrder, JobLineItem, Inspection,
     InspectionAnswer, PhotoRef, Certificate, Sticker,
@@ -11,7 +15,7 @@ from .models import (
 )
 
 
-class ServiceVersionSerializer(serializers.ModelSerializer):
+class ServiceVersionSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """Service version serializer"""
     class Meta:
         model = ServiceVersion
@@ -27,7 +31,7 @@ class ServiceVersionSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'version_number', 'created_at', 'updated_at', 'created_by', 'updated_by']
 
 
-class ServiceSerializer(serializers.ModelSerializer):
+class ServiceSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """Service serializer"""
     versions = ServiceVersionSerializer(many=True, read_only=True)
     current_version = ServiceVersionSerializer(read_only=True)
@@ -44,7 +48,7 @@ class ServiceSerializer(serializers.ModelSerializer):
 User = get_user_model()
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """User serializer"""
     class Meta:
         model = User
@@ -52,7 +56,7 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class ClientSerializer(serializers.ModelSerializer):
+class ClientSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """Client serializer"""
     class Meta:
         model = Client
@@ -64,7 +68,7 @@ class ClientSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class EquipmentSerializer(serializers.ModelSerializer):
+class EquipmentSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """Equipment serializer"""
     client_name = serializers.CharField(source='client.name', read_only=True)
     
@@ -78,7 +82,7 @@ class EquipmentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class PhotoRefSerializer(serializers.ModelSerializer):
+class PhotoRefSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """Photo reference serializer"""
     class Meta:
         model = PhotoRef
@@ -89,7 +93,19 @@ class PhotoRefSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'uploaded_at']
 
 
-class InspectionAnswerSerializer(serializers.ModelSerializer):
+class VersionedSerializerMixin:
+    """
+    Serializer for a VersionedModel. On update, the submitted `version` (the
+    one the client last read) is the version the save expects; new rows
+    always start at version 1.
+    """
+    
+    def create(self, validated_data):
+        validated_data.pop('version', None)
+        return super().create(validated_data)
+
+
+class InspectionAnswerSerializer(VersionedSerializerMixin, CompiledRepresentationMixin, serializers.ModelSerializer):
     """Inspection answer serializer"""
     photos = PhotoRefSerializer(many=True, read_only=True)
     
@@ -97,12 +113,12 @@ class InspectionAnswerSerializer(serializers.ModelSerializer):
         model = InspectionAnswer
         fields = [
             'id', 'inspection', 'question_key', 'result',
-            'comment', 'photos', 'created_at', 'updated_at'
+            'comment', 'photos', 'version', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class InspectionSerializer(serializers.ModelSerializer):
+class InspectionSerializer(VersionedSerializerMixin, CompiledRepresentationMixin, serializers.ModelSerializer):
     """Inspection serializer"""
     inspector_name = serializers.CharField(source='inspector.get_full_name', read_only=True)
     answers = InspectionAnswerSerializer(many=True, read_only=True)
@@ -116,18 +132,23 @@ class InspectionSerializer(serializers.ModelSerializer):
             'checklist_template', 'start_time', 'end_time', 'status',
             'geo_location_lat', 'geo_location_lng',
             'inspector_signature', 'client_signature',
-            'answers', 'photos', 'equipment_info',
+            'answers', 'photos', 'equipment_info', 'version',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
     
+    @cached_property
+    def _equipment_serializer(self):
+        # Built once and reused for every row instead of once per inspection
+        return EquipmentSerializer()
+
     def get_equipment_info(self, obj):
         if obj.job_line_item and obj.job_line_item.equipment:
-            return EquipmentSerializer(obj.job_line_item.equipment).data
+            return self._equipment_serializer.to_representation(obj.job_line_item.equipment)
         return None
 
 
-class JobLineItemSerializer(serializers.ModelSerializer):
+class JobLineItemSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """Job line item serializer"""
     equipment_info = EquipmentSerializer(source='equipment', read_only=True)
     inspections = InspectionSerializer(many=True, read_only=True)
@@ -142,7 +163,7 @@ class JobLineItemSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class JobOrderSerializer(serializers.ModelSerializer):
+class JobOrderSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """Job order serializer"""
     client_name = serializers.CharField(source='client.name', read_only=True)
     line_items = JobLineItemSerializer(many=True, read_only=True)
@@ -160,7 +181,7 @@ class JobOrderSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at', 'created_by']
 
 
-class JobOrderListSerializer(serializers.ModelSerializer):
+class JobOrderListSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """Simplified job order serializer for list views"""
     client_name = serializers.CharField(source='client.name', read_only=True)
     line_items_count = serializers.IntegerField(source='line_items.count', read_only=True)
@@ -175,7 +196,7 @@ class JobOrderListSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
-class CertificateSerializer(serializers.ModelSerializer):
+class CertificateSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """Certificate serializer"""
     inspection_info = InspectionSerializer(source='inspection', read_only=True)
     generated_by_name = serializers.CharField(source='generated_by.get_full_name', read_only=True)
@@ -200,7 +221,7 @@ class CertificateSerializer(serializers.ModelSerializer):
         return None
 
 
-class StickerSerializer(serializers.ModelSerializer):
+class StickerSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """Sticker serializer"""
     equipment_info = EquipmentSerializer(source='assigned_equipment', read_only=True)
     assigned_by_name = serializers.CharField(source='assigned_by.get_full_name', read_only=True)
@@ -223,7 +244,7 @@ class StickerResolveSerializer(serializers.Serializer):
     inspection_history = InspectionSerializer(many=True, required=False)
 
 
-class FieldInspectionReportSerializer(serializers.ModelSerializer):
+class FieldInspectionReportSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """Field inspection report serializer"""
     job_order_info = JobOrderListSerializer(source='job_order', read_only=True)
     
@@ -237,7 +258,7 @@ class FieldInspectionReportSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'share_link_token', 'created_at', 'updated_at']
 
 
-class ApprovalSerializer(serializers.ModelSerializer):
+class ApprovalSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """Approval serializer"""
     approver_name = serializers.CharField(source='approver.get_full_name', read_only=True)
     
@@ -251,7 +272,7 @@ class ApprovalSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class PublicationSerializer(serializers.ModelSerializer):
+class PublicationSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """Publication serializer"""
     job_order_info = JobOrderListSerializer(source='job_order', read_only=True)
     published_by_name = serializers.CharField(source='published_by.get_full_name', read_only=True)
@@ -266,7 +287,7 @@ class PublicationSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class ToolCategorySerializer(serializers.ModelSerializer):
+class ToolCategorySerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """Serializer for tool categories"""
 
     class Meta:
@@ -279,7 +300,7 @@ class ToolCategorySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class ToolSerializer(serializers.ModelSerializer):
+class ToolSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """Tool serializer"""
 
     assigned_to_name = serializers.CharField(source='assigned_to.get_full_name', read_only=True)
@@ -297,7 +318,7 @@ class ToolSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'category_info', 'assigned_to_name', 'is_overdue_for_calibration', 'created_at', 'updated_at']
 
 
-class CalibrationSerializer(serializers.ModelSerializer):
+class CalibrationSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """Calibration serializer"""
     tool_info = ToolSerializer(source='tool', read_only=True)
     
@@ -311,7 +332,7 @@ class CalibrationSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class ToolAssignmentSerializer(serializers.ModelSerializer):
+class ToolAssignmentSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """Serializer for tool assignments"""
 
     tool_info = ToolSerializer(source='tool', read_only=True)
@@ -336,7 +357,7 @@ class ToolAssignmentSerializer(serializers.ModelSerializer):
         ]
 
 
-class ToolUsageLogSerializer(serializers.ModelSerializer):
+class ToolUsageLogSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """Serializer for tool usage logs"""
 
     tool_info = ToolSerializer(source='tool', read_only=True)
@@ -356,7 +377,7 @@ class ToolUsageLogSerializer(serializers.ModelSerializer):
         ]
 
 
-class ToolIncidentSerializer(serializers.ModelSerializer):
+class ToolIncidentSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """Serializer for tool incidents"""
 
     tool_info = ToolSerializer(source='tool', read_only=True)
@@ -371,7 +392,7 @@ class ToolIncidentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'tool_info', 'created_by', 'updated_by', 'created_at', 'updated_at']
 
 
-class CompetenceEvidenceSerializer(serializers.ModelSerializer):
+class CompetenceEvidenceSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """Evidence serializer for competence authorizations"""
 
     class Meta:
@@ -384,7 +405,7 @@ class CompetenceEvidenceSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class CompetenceAuthorizationSerializer(serializers.ModelSerializer):
+class CompetenceAuthorizationSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """Competence authorization serializer"""
 
     user_name = serializers.CharField(source='user.get_full_name', read_only=True)
@@ -402,7 +423,7 @@ class CompetenceAuthorizationSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_by', 'updated_by', 'created_at', 'updated_at']
 
 
-class PersonCredentialSerializer(serializers.ModelSerializer):
+class PersonCredentialSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """Serializer for credentials held by a person"""
 
     class Meta:
@@ -415,7 +436,7 @@ class PersonCredentialSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class PersonSerializer(serializers.ModelSerializer):
+class PersonSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """People registry serializer with credential summaries"""
 
     client_name = serializers.CharField(source='client.name', read_only=True)
@@ -432,16 +453,113 @@ class PersonSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'client_name', 'credentials', 'created_by', 'updated_by', 'created_at', 'updated_at']
 
 
+class InspectionAnswerUpsertSerializer(serializers.ModelSerializer):
+    """One checklist answer in a bulk upsert (the inspection comes from the URL)"""
+    class Meta:
+        model = InspectionAnswer
+        fields = ['question_key', 'result', 'comment']
+
+
 class InspectionSubmitSerializer(serializers.Serializer):
     """Serializer for inspection submission"""
-    answers = InspectionAnswerSerializer(many=True)
-    photos = serializers.ListField(
-        child=serializers.ImageField(),
-        required=False
+    answers = InspectionAnswerUpsertSerializer(
+        many=True, allow_empty=False, max_length=settings.INSPECTION_ANSWERS_MAX
     )
     inspector_signature = serializers.ImageField(required=False)
     client_signature = serializers.ImageField(required=False)
 
+    def validate_answers(self, value):
+        seen = set()
+        errors = []
+        for answer in value:
+            key = answer['question_key']
+            errors.append({'question_key': ['Duplicate question_key in this request.']} if key in seen else {})
+            seen.add(key)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return value
+
+
+class InspectionInboxSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
+    """Submitted inspection awaiting a decision, as listed in the approvals inbox"""
+    inspector_name = serializers.CharField(source='inspector.get_full_name', read_only=True)
+    job_order = serializers.IntegerField(source='job_line_item.job_order_id', read_only=True)
+    po_reference = serializers.CharField(source='job_line_item.job_order.po_reference', read_only=True)
+    client_name = serializers.CharField(source='job_line_item.job_order.client.name', read_only=True)
+    equipment_tag = serializers.CharField(source='job_line_item.equipment.tag_code', read_only=True, default=None)
+    
+    class Meta:
+        model = Inspection
+        fields = [
+            'id', 'job_line_item', 'job_order', 'po_reference', 'client_name',
+            'equipment_tag', 'inspector', 'inspector_name', 'checklist_template',
+            'start_time', 'end_time', 'status', 'created_at'
+        ]
+        read_only_fields = fields
+
+
+class InspectionDecisionSerializer(serializers.Serializer):
+    """One approve/reject decision in a bulk decision request"""
+    inspection = serializers.IntegerField()
+    decision = serializers.ChoiceField(choices=[Approval.Decision.APPROVED, Approval.Decision.REJECTED])
+    comment = serializers.CharField(required=False, allow_blank=True, default='')
+
+    def validate(self, attrs):
+        if attrs['decision'] == Approval.Decision.REJECTED and not attrs['comment']:
+            raise serializers.ValidationError({'comment': ['Comment is required for rejection.']})
+        return attrs
+
+
+class InspectionBulkDecisionSerializer(serializers.Serializer):
+    """Serializer for bulk approve/reject of submitted inspections"""
+    decisions = InspectionDecisionSerializer(
+        many=True, allow_empty=False, max_length=settings.INSPECTION_DECISIONS_MAX
+    )
+
+    def validate_decisions(self, value):
+        seen = set()
+        errors = []
+        for decision in value:
+            inspection = decision['inspection']
+            errors.append({'inspection': ['Duplicate inspection in this request.']} if inspection in seen else {})
+            seen.add(inspection)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return value
+
+
+class EquipmentBulkItemSerializer(serializers.ModelSerializer):
+    """One row of a bulk equipment upsert (clients and tag_code uniqueness are checked per chunk)"""
+    client = serializers.IntegerField(write_only=True)
+    
+    class Meta:
+        model = Equipment
+        fields = [
+            'client', 'tag_code', 'type', 'manufacturer', 'model',
+            'serial_number', 'swl', 'location', 'next_due'
+        ]
+        extra_kwargs = {'tag_code': {'validators': []}}
+
+
+class RegisterImportSerializer(serializers.Serializer):
+    """An uploaded register spreadsheet (`client_required` in the context for client-owned registers)"""
+    file = serializers.FileField()
+    client = serializers.PrimaryKeyRelatedField(queryset=Client.objects.all(), required=False, allow_null=True)
+    
+    def validate_file(self, value):
+        if os.path.splitext(value.name)[1].lower() not in ('.xlsx', '.csv'):
+            raise serializers.ValidationError('Registers must be .xlsx or .csv files.')
+        if value.size > settings.IMPORT_MAX_UPLOAD_BYTES:
+            raise serializers.ValidationError(
+                f'Registers are limited to {settings.IMPORT_MAX_UPLOAD_BYTES // (1024 * 1024)} MB.'
+            )
+        return value
+    
+    def validate(self, attrs):
+        if self.context.get('client_required') and attrs.get('client') is None:
+            raise serializers.ValidationError({'client': ['This field is required.']})
+        return attrs
+
 
 class AssignInspectorSerializer(serializers.Serializer):
     """Serializer for assigning inspector to job order"""
@@ -450,3 +568,66 @@ class AssignInspectorSerializer(serializers.Serializer):
         child=serializers.IntegerField(),
         required=False
     )
+
+
+class BatchItemSerializer(serializers.Serializer):
+    """A single sub-request inside a batch call"""
+    id = serializers.JSONField(required=False, help_text="Client reference echoed back in the response")
+    method = serializers.ChoiceField(choices=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
+    path = serializers.CharField(help_text="API path including any query string, e.g. /api/job-orders/5/")
+    body = serializers.JSONField(required=False, allow_null=True)
+
+    def validate_path(self, value):
+        if not value.startswith('/api/'):
+            raise serializers.ValidationError('Path must start with /api/.')
+        return value
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    """Serializer for batch API calls"""
+    requests = BatchItemSerializer(many=True, allow_empty=False, max_length=settings.BATCH_MAX_REQUESTS)
+    atomic = serializers.BooleanField(default=False, help_text="Run all sub-requests in one transaction")
+
+
+class SyncJobOrderSerializer(JobOrderSerializer):
+    """Flat job order for delta sync (line items sync separately)"""
+    line_items = None
+
+    class Meta(JobOrderSerializer.Meta):
+        fields = [f for f in JobOrderSerializer.Meta.fields if f != 'line_items']
+
+
+class SyncJobLineItemSerializer(JobLineItemSerializer):
+    """Flat line item for delta sync"""
+    equipment_info = None
+    inspections = None
+
+    class Meta(JobLineItemSerializer.Meta):
+        fields = [f for f in JobLineItemSerializer.Meta.fields if f not in ('equipment_info', 'inspections')]
+
+
+class SyncInspectionSerializer(InspectionSerializer):
+    """Flat inspection for delta sync (answers and photos sync separately)"""
+    answers = None
+    photos = None
+    equipment_info = None
+
+    class Meta(InspectionSerializer.Meta):
+        fields = [f for f in InspectionSerializer.Meta.fields if f not in ('answers', 'photos', 'equipment_info')]
+
+
+class SyncInspectionAnswerSerializer(InspectionAnswerSerializer):
+    """Flat inspection answer for delta sync"""
+    photos = None
+
+    class Meta(InspectionAnswerSerializer.Meta):
+        fields = [f for f in InspectionAnswerSerializer.Meta.fields if f != 'photos']
+
+
+class SyncServiceSerializer(ServiceSerializer):
+    """Flat service for delta sync (versions sync separately)"""
+    versions = None
+    current_version = None
+
+    class Meta(ServiceSerializer.Meta):
+        fields = [f for f in ServiceSerializer.Meta.fields if f != 'versions']
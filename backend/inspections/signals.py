@@ -1,7 +1,12 @@
-from django.db.models.signals import post_save, post_delete
+from contextvars import ContextVar
+
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
 from django.dispatch import receiver
+from . import async_cache, authentication, rollups, sync
 from .models import (
-    Inspection, Certificate, JobOrder, Approval, Publication, AuditLog
+    Inspection, Certificate, JobOrder, Approval, Publication, AuditLog,
+    SyncTombstone, FieldInspectionReport, Sticker, User, ClientMembership,
+    Equipment
 )
 
 
@@ -43,3 +48,119 @@ def log_publication(sender, instance, created, **kwargs):
             entity_id=instance.job_order.id,
             changes={'status': instance.status, 'note': instance.note}
         )
+
+
+def track_rollup_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Remember which dashboard counters the row counted towards before saving"""
+    if raw or (update_fields is not None and not rollups.rollup_fields(sender) & set(update_fields)):
+        # Saves that don't touch any counted field leave the counters alone
+        instance._rollup_keys = None
+        return
+    if instance._state.adding or instance.pk is None:
+        instance._rollup_keys = []
+        return
+    values = rollups.stored_values(sender, instance.pk)
+    instance._rollup_keys = rollups.rollup_keys(sender, values) if values else []
+
+
+def update_rollups_on_save(sender, instance, raw=False, **kwargs):
+    """Move dashboard counters from the row's previous state to its new one"""
+    before = getattr(instance, '_rollup_keys', None)
+    if raw or before is None:
+        return
+    after = rollups.rollup_keys(sender, rollups.instance_values(sender, instance))
+    rollups.record_change(before, after)
+
+
+def update_rollups_on_delete(sender, instance, **kwargs):
+    """Remove a deleted row from the dashboard counters"""
+    before = rollups.rollup_keys(sender, rollups.instance_values(sender, instance))
+    rollups.record_change(before, [])
+
+
+for rollup_model in {rollup.model for rollup in rollups.ROLLUPS if rollup.live}:
+    pre_save.connect(track_rollup_state, sender=rollup_model, dispatch_uid=f'rollup_pre_save_{rollup_model.__name__}')
+    post_save.connect(update_rollups_on_save, sender=rollup_model, dispatch_uid=f'rollup_post_save_{rollup_model.__name__}')
+    post_delete.connect(update_rollups_on_delete, sender=rollup_model, dispatch_uid=f'rollup_post_delete_{rollup_model.__name__}')
+
+
+# Tombstones queued by the deletes in progress: {(using, id(origin)): (origin, tombstones, parent clients)}
+_pending_tombstones = ContextVar('sync_pending_tombstones', default=None)
+
+
+def queue_sync_tombstone(sender, instance, using, origin=None, **kwargs):
+    """Queue a tombstone so offline devices drop the deleted row on their next sync"""
+    # pre_delete, while the rows leading to the owning client still exist
+    pending = _pending_tombstones.get()
+    if pending is None:
+        pending = {}
+        _pending_tombstones.set(pending)
+    key = (using, id(origin))
+    if key not in pending or pending[key][0] is not origin:
+        pending[key] = (origin, [], {})
+    _, tombstones, parents = pending[key]
+    entity = sync.entity_for_model(sender)
+    tombstones.append(SyncTombstone(
+        entity=entity.name, object_id=instance.pk, client_id=entity.client_of(instance, using, parents)
+    ))
+
+
+def write_sync_tombstones(sender, instance, using, origin=None, **kwargs):
+    """Write a delete's queued tombstones in one INSERT, inside the delete's transaction"""
+    # Every pre_delete of a delete is sent before its first post_delete
+    pending = _pending_tombstones.get() or {}
+    queued = pending.get((using, id(origin)))
+    if queued is not None and queued[0] is origin:
+        del pending[(using, id(origin))]
+        SyncTombstone.objects.using(using).bulk_create(queued[1])
+
+
+for sync_entity in sync.SYNC_ENTITIES:
+    pre_delete.connect(queue_sync_tombstone, sender=sync_entity.model, dispatch_uid=f'sync_tombstone_{sync_entity.name}')
+    post_delete.connect(write_sync_tombstones, sender=sync_entity.model, dispatch_uid=f'sync_tombstone_write_{sync_entity.name}')
+
+
+@receiver([post_save, post_delete], sender=Certificate)
+def invalidate_certificate_cache(sender, instance, using, **kwargs):
+    """Drop the cached public verification payload of a changed certificate"""
+    async_cache.invalidate(async_cache.cache_key('certificate', instance.share_link_token), using=using)
+
+
+@receiver([post_save, post_delete], sender=FieldInspectionReport)
+def invalidate_field_report_cache(sender, instance, using, **kwargs):
+    """Drop the cached public payload of a changed field inspection report"""
+    async_cache.invalidate(async_cache.cache_key('field_report', instance.share_link_token), using=using)
+
+
+@receiver([post_save, post_delete], sender=Sticker)
+def invalidate_sticker_cache(sender, instance, using, **kwargs):
+    """Drop the cached resolve payload of a changed sticker"""
+    async_cache.invalidate(async_cache.cache_key('sticker', instance.sticker_code), using=using)
+
+
+@receiver(post_save, sender=Equipment)
+@receiver(pre_delete, sender=Equipment)
+def invalidate_equipment_sticker_cache(sender, instance, using, **kwargs):
+    """Drop the cached resolve payloads that embed a changed equipment"""
+    # pre_delete, because deleting the equipment unassigns its stickers without signals
+    async_cache.invalidate_stickers(using, assigned_equipment=instance.pk)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_snapshot_on_save(sender, instance, using, update_fields=None, **kwargs):
+    """Drop the cached auth snapshot when a snapshot column may have changed"""
+    if update_fields is not None and not set(update_fields) & set(authentication.SNAPSHOT_FIELDS):
+        return
+    authentication.invalidate_snapshot(instance.pk, using=using)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_user_snapshot_on_delete(sender, instance, using, **kwargs):
+    """Drop the cached auth snapshot of a deleted user"""
+    authentication.invalidate_snapshot(instance.pk, using=using)
+
+
+@receiver([post_save, post_delete], sender=ClientMembership)
+def invalidate_user_snapshot_on_membership(sender, instance, using, **kwargs):
+    """Drop the cached auth snapshot when a user's client scope changes"""
+    authentication.invalidate_snapshot(instance.user_id, using=using)
@@ -0,0 +1,85 @@
+"""
+Sticker code allocation
+
+Sticker numbers come from the `stickers` CodeSequence row. A generator
+reserves its whole range with a single atomic UPDATE of that row, so
+concurrent generators always get disjoint ranges and never collide on
+`sticker_code`. The row lock is held only for that short reservation, not
+for the inserts. Stickers are then written with `bulk_create` in chunks of
+STICKER_BULK_CHUNK_SIZE. A failed run leaves a gap in the numbering, never
+a duplicate.
+
+A counter row rather than a database sequence: `nextval` hands out one
+number per call, and concurrent callers interleave, so a batch's codes
+would not be contiguous without altering the sequence's increment (DDL) per
+batch. The row reserves any range size in one UPDATE, and its first value
+is seeded from the existing codes in the same transaction instead of a
+separate `setval` migration.
+"""
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Length
+
+from .models import CodeSequence, Sticker
+
+
+STICKER_SEQUENCE = 'stickers'
+QR_PAYLOAD_URL = 'https://inspection-saas.com/sticker/{code}'
+
+
+def sticker_code(number):
+    return f"{settings.STICKER_CODE_PREFIX}-{number:06d}"
+
+
+def highest_sticker_number():
+    """Highest number among existing prefixed sticker codes (codes widen past 999999)"""
+    prefix = f"{settings.STICKER_CODE_PREFIX}-"
+    code = (
+        Sticker.objects.filter(sticker_code__startswith=prefix)
+        .annotate(code_length=Length('sticker_code'))
+        .order_by('-code_length', '-sticker_code')
+        .values_list('sticker_code', flat=True)
+        .first()
+    )
+    try:
+        return int(code[len(prefix):]) if code else 0
+    except ValueError:
+        return 0
+
+
+def reserve_numbers(name, count, initial=lambda: 0):
+    """
+    Reserve `count` consecutive numbers from the named sequence and return the
+    first. `initial()` gives the sequence's starting point on first use.
+    """
+    with transaction.atomic():
+        sequence = CodeSequence.objects.filter(name=name)
+        if not sequence.update(last_value=F('last_value') + count):
+            try:
+                with transaction.atomic():
+                    CodeSequence.objects.create(name=name, last_value=initial() + count)
+            except IntegrityError:
+                # Another generator created the row first
+                sequence.update(last_value=F('last_value') + count)
+        last_value = sequence.values_list('last_value', flat=True).get()
+    return last_value - count + 1
+
+
+def generate_stickers(count, created_by_id=None):
+    """Create `count` AVAILABLE stickers and return their codes in order"""
+    first = reserve_numbers(STICKER_SEQUENCE, count, initial=highest_sticker_number)
+    codes = [sticker_code(number) for number in range(first, first + count)]
+    chunk_size = settings.STICKER_BULK_CHUNK_SIZE
+    for start in range(0, count, chunk_size):
+        with transaction.atomic():
+            Sticker.objects.bulk_create([
+                Sticker(
+                    sticker_code=code,
+                    qr_payload=QR_PAYLOAD_URL.format(code=code),
+                    status=Sticker.Status.AVAILABLE,
+                    created_by_id=created_by_id,
+                )
+                for code in codes[start:start + chunk_size]
+            ])
+    return codes
@@ -0,0 +1,278 @@
+"""
+Delta sync for offline-first devices
+
+A sync token carries, per entity, the (updated_at, id) keyset cursor of the
+last row the device received, plus a cursor into the tombstone table. Each
+call returns rows changed after those cursors, in the same visibility scope as
+the regular API, and a new token. Rows younger than SYNC_SETTLE_SECONDS are
+held back until the next call so a transaction that commits late with an
+older updated_at can't slip behind a cursor.
+
+The settle window only covers transactions that commit within
+SYNC_SETTLE_SECONDS of stamping their rows. A row or tombstone committed
+later than that can land behind a device's cursor, and the device won't see
+it until the row changes again or it does a full sync, so the window must
+exceed the longest write transaction.
+
+Tombstones record the client the deleted row belonged to, and inspectors
+only receive those of the clients whose job orders they can see. That is
+coarser than row visibility, so an inspector may receive ids of deleted rows
+of other job orders of the same clients. A delete queues its tombstones as
+rows are collected and writes them with one INSERT once the rows are gone.
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import (
+    Equipment, JobOrder, JobLineItem, Inspection, InspectionAnswer,
+    PhotoRef, Service, ServiceVersion, ToolCategory, SyncTombstone
+)
+from .serializers import (
+    EquipmentSerializer, PhotoRefSerializer, ServiceVersionSerializer,
+    ToolCategorySerializer, SyncJobOrderSerializer, SyncJobLineItemSerializer,
+    SyncInspectionSerializer, SyncInspectionAnswerSerializer, SyncServiceSerializer
+)
+
+
+TOKEN_SALT = 'inspections.sync'
+
+
+class InvalidSyncToken(Exception):
+    """The sync token is malformed or was not issued by this server"""
+
+
+class ExpiredSyncToken(Exception):
+    """The sync token predates tombstone retention; the device must resync from scratch"""
+
+
+def _view_queryset(viewset_class, request):
+    view = viewset_class(request=request, action='list', format_kwarg=None, kwargs={})
+    return view.get_queryset().prefetch_related(None)
+
+
+def visible_job_orders(request):
+    from .views import JobOrderViewSet
+    return _view_queryset(JobOrderViewSet, request)
+
+
+def visible_inspections(request):
+    from .views import InspectionViewSet
+    return _view_queryset(InspectionViewSet, request)
+
+
+class SyncEntity:
+    """A model exposed through delta sync, with its scoped queryset and flat serializer"""
+
+    def __init__(self, name, model, serializer_class, get_queryset, client_path=None):
+        self.name = name
+        self.model = model
+        self.serializer_class = serializer_class
+        self.get_queryset = get_queryset
+        # Lookup from a row to the id of the client it is scoped by; None when every syncing user sees it
+        self.client_path = client_path
+
+    def client_of(self, instance, using=None, parents=None):
+        """
+        Id of the client `instance` is scoped by, read before it is deleted.
+        Multi-hop paths are resolved through the row's parent, once per parent
+        when the same `parents` dict is passed for every row of a delete.
+        """
+        if self.client_path is None:
+            return None
+        field_name, _, rest = self.client_path.partition('__')
+        if not rest:
+            return getattr(instance, field_name)
+        field = self.model._meta.get_field(field_name)
+        key = (field.related_model, getattr(instance, field.attname))
+        if key[1] is None:
+            return None
+        if parents is None or key not in parents:
+            client_id = field.related_model.objects.using(using).filter(pk=key[1]).values_list(rest, flat=True).first()
+            if parents is None:
+                return client_id
+            parents[key] = client_id
+        return parents[key]
+
+
+SYNC_ENTITIES = [
+    SyncEntity(
+        'job_orders', JobOrder, SyncJobOrderSerializer,
+        lambda request: visible_job_orders(request).select_related('client', 'created_by'),
+        'client_id',
+    ),
+    SyncEntity(
+        'line_items', JobLineItem, SyncJobLineItemSerializer,
+        lambda request: JobLineItem.objects.filter(job_order__in=visible_job_orders(request).values('pk')),
+        'job_order__client_id',
+    ),
+    SyncEntity(
+        'inspections', Inspection, SyncInspectionSerializer,
+        lambda request: visible_inspections(request).select_related(None).select_related('inspector'),
+        'job_line_item__job_order__client_id',
+    ),
+    SyncEntity(
+        'answers', InspectionAnswer, SyncInspectionAnswerSerializer,
+        lambda request: InspectionAnswer.objects.filter(inspection__in=visible_inspections(request).values('pk')),
+        'inspection__job_line_item__job_order__client_id',
+    ),
+    SyncEntity(
+        'photos', PhotoRef, PhotoRefSerializer,
+        lambda request: PhotoRef.objects.filter(inspection__in=visible_inspections(request).values('pk')),
+        'inspection__job_line_item__job_order__client_id',
+    ),
+    SyncEntity(
+        'equipment', Equipment, EquipmentSerializer,
+        lambda request: Equipment.objects.select_related('client'),
+    ),
+    SyncEntity('services', Service, SyncServiceSerializer, lambda request: Service.objects.all()),
+    SyncEntity('service_versions', ServiceVersion, ServiceVersionSerializer, lambda request: ServiceVersion.objects.all()),
+    SyncEntity('tool_categories', ToolCategory, ToolCategorySerializer, lambda request: ToolCategory.objects.all()),
+]
+
+SYNC_ENTITIES_BY_NAME = {entity.name: entity for entity in SYNC_ENTITIES}
+
+# (child entity, FK field, parent entity): parents of changed rows are sent along
+# even if they haven't changed, e.g. the job order of a newly assigned inspection
+PARENT_LINKS = [
+    ('answers', 'inspection', 'inspections'),
+    ('photos', 'inspection', 'inspections'),
+    ('inspections', 'job_line_item', 'line_items'),
+    ('line_items', 'job_order', 'job_orders'),
+    ('line_items', 'equipment', 'equipment'),
+]
+
+
+def entity_for_model(model):
+    for entity in SYNC_ENTITIES:
+        if entity.model is model:
+            return entity
+    return None
+
+
+def _parent_attname(child, field):
+    return SYNC_ENTITIES_BY_NAME[child].model._meta.get_field(field).attname
+
+
+def encode_token(cursors, tombstone_cursor, issued_at):
+    return signing.dumps(
+        {
+            'cursors': {name: [ts.isoformat(), pk] for name, (ts, pk) in cursors.items()},
+            'tombstones': [tombstone_cursor[0].isoformat(), tombstone_cursor[1]] if tombstone_cursor else None,
+            'issued_at': issued_at.isoformat(),
+        },
+        salt=TOKEN_SALT,
+        compress=True,
+    )
+
+
+def decode_token(token):
+    """Return (cursors, tombstone_cursor) from a sync token"""
+    try:
+        payload = signing.loads(token, salt=TOKEN_SALT)
+        cursors = {
+            name: (datetime.fromisoformat(ts), pk)
+            for name, (ts, pk) in payload['cursors'].items()
+        }
+        tombstones = payload['tombstones']
+        tombstone_cursor = (datetime.fromisoformat(tombstones[0]), tombstones[1]) if tombstones else None
+        issued_at = datetime.fromisoformat(payload['issued_at'])
+    except (signing.BadSignature, KeyError, TypeError, ValueError) as e:
+        raise InvalidSyncToken(str(e))
+
+    retention = timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    if issued_at < timezone.now() - retention:
+        raise ExpiredSyncToken()
+    return cursors, tombstone_cursor
+
+
+def _visible_tombstones(request):
+    """Tombstones of rows in the user's client scope; sync is staff-only, so only inspectors are narrowed"""
+    tombstones = SyncTombstone.objects.all()
+    if request.user.role != 'INSPECTOR':
+        return tombstones
+    client_ids = visible_job_orders(request).order_by().values('client_id')
+    return tombstones.filter(Q(client_id__isnull=True) | Q(client_id__in=client_ids))
+
+
+def _after(cursor, field):
+    if cursor is None:
+        return Q()
+    ts, pk = cursor
+    return Q(**{f'{field}__gt': ts}) | Q(**{field: ts, 'id__gt': pk})
+
+
+def collect_changes(request, token=None):
+    """
+    Return (changes, next_token, has_more) for everything visible to the user
+    that changed after `token` (everything, when no token is given).
+    """
+    cursors, tombstone_cursor = decode_token(token) if token else ({}, None)
+    now = timezone.now()
+    settled = now - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+    limit = settings.SYNC_PAGE_SIZE
+    has_more = False
+
+    rows = {}
+    created = {}
+    next_cursors = dict(cursors)
+    for entity in SYNC_ENTITIES:
+        cursor = cursors.get(entity.name)
+        page = list(
+            entity.get_queryset(request)
+            .filter(_after(cursor, 'updated_at'), updated_at__lt=settled)
+            .order_by('updated_at', 'id')[:limit + 1]
+        )
+        if len(page) > limit:
+            has_more = True
+            page = page[:limit]
+        if page:
+            next_cursors[entity.name] = (page[-1].updated_at, page[-1].pk)
+        rows[entity.name] = {row.pk: row for row in page}
+        created[entity.name] = {
+            row.pk for row in page if cursor is None or row.created_at > cursor[0]
+        }
+
+    for child, field, parent in PARENT_LINKS:
+        attname = _parent_attname(child, field)
+        referenced = {getattr(row, attname) for row in rows[child].values()}
+        missing = referenced - set(rows[parent]) - {None}
+        if missing:
+            entity = SYNC_ENTITIES_BY_NAME[parent]
+            for row in entity.get_queryset(request).filter(pk__in=missing):
+                rows[parent][row.pk] = row
+
+    tombstones = list(
+        _visible_tombstones(request)
+        .filter(_after(tombstone_cursor, 'deleted_at'), deleted_at__lt=settled)
+        .order_by('deleted_at', 'id')[:limit + 1]
+    )
+    if len(tombstones) > limit:
+        has_more = True
+        tombstones = tombstones[:limit]
+    if tombstones:
+        tombstone_cursor = (tombstones[-1].deleted_at, tombstones[-1].pk)
+
+    context = {'request': request}
+    changes = {}
+    for entity in SYNC_ENTITIES:
+        entity_rows = rows[entity.name]
+        new = [row for pk, row in entity_rows.items() if pk in created[entity.name]]
+        updated = [row for pk, row in entity_rows.items() if pk not in created[entity.name]]
+        changes[entity.name] = {
+            'created': entity.serializer_class(new, many=True, context=context).data,
+            'updated': entity.serializer_class(updated, many=True, context=context).data,
+            'deleted': [t.object_id for t in tombstones if t.entity == entity.name],
+        }
+
+    return changes, encode_token(next_cursors, tombstone_cursor, now), has_more
+
+
+def purge_tombstones():
+    """Delete tombstones older than the retention window and return how many were removed"""
+    cutoff = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    deleted, _ = SyncTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
@@ -13,6 +13,7 @@ import os
 @shared_task
 def generate_certificate_task(inspection_id, user_id, with_letterhead=True):
     """Generate certificate PDF for an approved inspection"""
+    from . import async_cache
     from .models import Inspection, Certificate, User
     from django.core.files.base import ContentFile
     import base64
@@ -101,6 +102,7 @@ def generate_certificate_task(inspection_id, user_id, with_letterhead=True):
         # Save PDF file to MinIO/S3
         pdf_filename = f'certificates/cert_{qr_code_data}.pdf'
         certificate.pdf_file.save(pdf_filename, ContentFile(pdf_file), save=True)
+        async_cache.invalidate_stickers(assigned_equipment=inspection.job_line_item.equipment_id)
         
         return {
             'success': True,
@@ -167,6 +169,58 @@ def send_certificate_email(certificate_id, recipient_email):
         }
 
 
+@shared_task
+def send_publication_email(publication_id, certificate_ids):
+    """Notify the client that a job order's certificates were published"""
+    from .models import Certificate, Publication
+    
+    try:
+        publication = Publication.objects.select_related('job_order__client').get(id=publication_id)
+        job_order = publication.job_order
+        client = job_order.client
+        
+        certificates = Certificate.objects.filter(id__in=certificate_ids).select_related(
+            'inspection__job_line_item__equipment'
+        ).order_by('qr_code')
+        
+        subject = f'Inspection Certificates Published - {job_order.po_reference}'
+        
+        context = {
+            'publication': publication,
+            'job_order': job_order,
+            'client': client,
+            'certificates': [
+                {
+                    'certificate': certificate,
+                    'public_url': f"{settings.FRONTEND_URL}/certificates/public/{certificate.share_link_token}"
+                }
+                for certificate in certificates
+            ],
+        }
+        
+        html_message = render_to_string('emails/publication_email.html', context)
+        
+        email = EmailMessage(
+            subject=subject,
+            body=html_message,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[client.email],
+        )
+        email.content_subtype = 'html'
+        email.send()
+        
+        return {
+            'success': True,
+            'message': f'Publication of {len(context["certificates"])} certificates sent to {client.email}'
+        }
+        
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }
+
+
 @shared_task
 def send_fir_email(fir_id, recipient_email):
     """Send Field Inspection Report via email"""
@@ -222,36 +276,39 @@ def send_fir_email(fir_id, recipient_email):
 def generate_inspection_report(job_order_id):
     """Generate consolidated inspection report for a job order"""
     from .models import JobOrder, FieldInspectionReport, Inspection
+    from .db_router import use_replica
     from django.core.files.base import ContentFile
     
     try:
-        job_order = JobOrder.objects.select_related('client').prefetch_related(
-            'line_items__inspections__answers',
-            'line_items__equipment'
-        ).get(id=job_order_id)
-        
-        inspections = Inspection.objects.filter(
-            job_line_item__job_order=job_order
-        ).select_related('inspector', 'job_line_item__equipment')
-        
-        context = {
-            'job_order': job_order,
-            'client': job_order.client,
-            'inspections': inspections,
-            'generated_at': timezone.now(),
-        }
-        
-        # Render HTML template
-        html_string = render_to_string('reports/fir_template.html', context)
-        
-        # Generate PDF
-        pdf_file = HTML(string=html_string, base_url=settings.MEDIA_ROOT).write_pdf()
-        
-        # Create summary
-        summary = f"Field Inspection Report for {job_order.po_reference}. "
-        summary += f"Total inspections: {inspections.count()}. "
-        summary += f"Approved: {inspections.filter(status='APPROVED').count()}, "
-        summary += f"Pending: {inspections.filter(status='SUBMITTED').count()}."
+        # The report only reads until the FIR is saved, so keep that load off the primary
+        with use_replica():
+            job_order = JobOrder.objects.select_related('client').prefetch_related(
+                'line_items__inspections__answers',
+                'line_items__equipment'
+            ).get(id=job_order_id)
+            
+            inspections = Inspection.objects.filter(
+                job_line_item__job_order=job_order
+            ).select_related('inspector', 'job_line_item__equipment')
+            
+            context = {
+                'job_order': job_order,
+                'client': job_order.client,
+                'inspections': inspections,
+                'generated_at': timezone.now(),
+            }
+            
+            # Render HTML template
+            html_string = render_to_string('reports/fir_template.html', context)
+            
+            # Generate PDF
+            pdf_file = HTML(string=html_string, base_url=settings.MEDIA_ROOT).write_pdf()
+            
+            # Create summary
+            summary = f"Field Inspection Report for {job_order.po_reference}. "
+            summary += f"Total inspections: {inspections.count()}. "
+            summary += f"Approved: {inspections.filter(status='APPROVED').count()}, "
+            summary += f"Pending: {inspections.filter(status='SUBMITTED').count()}."
         
         # Create FIR record
         fir = FieldInspectionReport.objects.create(
@@ -352,3 +409,82 @@ def send_due_inspection_reminders():
         'emails_sent': emails_sent,
         'message': f'Sent {emails_sent} reminder emails'
     }
+
+
+@shared_task
+def refresh_dashboard_rollups():
+    """Recompute the dated operations dashboard counters from the source tables"""
+    from .rollups import refresh_rollups
+    
+    refreshed_at = refresh_rollups()
+    
+    return {
+        'success': True,
+        'refreshed_at': refreshed_at.isoformat(),
+    }
+
+
+@shared_task
+def purge_sync_tombstones():
+    """Delete delta sync tombstones older than the retention window"""
+    from .sync import purge_tombstones
+    
+    count = purge_tombstones()
+    
+    return {
+        'success': True,
+        'deleted_count': count,
+        'message': f'Purged {count} sync tombstones'
+    }
+
+
+@shared_task
+def generate_stickers_task(count, user_id):
+    """Generate a large batch of sticker codes"""
+    from .stickers import generate_stickers
+    
+    codes = generate_stickers(count, created_by_id=user_id)
+    
+    return {
+        'success': True,
+        'count': len(codes),
+        'first_code': codes[0],
+        'last_code': codes[-1],
+        'message': f'Generated {len(codes)} stickers'
+    }
+
+
+@shared_task(bind=True)
+def import_register_task(self, register, path, user_id, client_id=None):
+    """Import an uploaded equipment, tool or people register, reporting progress per chunk"""
+    from django.core.files.storage import default_storage
+    from .imports import RegisterImportError, run_import
+    
+    def report(progress):
+        self.update_state(state='PROGRESS', meta=progress)
+    
+    try:
+        with default_storage.open(path, 'rb') as upload:
+            summary = run_import(
+                register, upload, os.path.splitext(path)[1], user_id, client_id, progress=report
+            )
+    except RegisterImportError as e:
+        return {
+            'success': False,
+            'register': register,
+            'error': str(e)
+        }
+    finally:
+        default_storage.delete(path)
+    
+    if summary['error_count']:
+        return {
+            'success': False,
+            **summary,
+            'error': f"{summary['error_count']} invalid rows; nothing was imported"
+        }
+    return {
+        'success': True,
+        **summary,
+        'message': f"Imported {summary['rows']} {register} rows"
+    }
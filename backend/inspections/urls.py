@@ -1,5 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import (
     ServiceViewSet, ServiceVersionViewSet,
     UserViewSet, ClientViewSet, EquipmentViewSet, JobOrderViewSet,
@@ -7,7 +8,8 @@ from .views import (
     PhotoRefViewSet, CertificateViewSet, FieldInspectionReportViewSet, StickerViewSet, ApprovalViewSet,
     PublicationViewSet, ToolViewSet, CalibrationViewSet, CompetenceAuthorizationViewSet,
     CompetenceEvidenceViewSet, PersonViewSet, PersonCredentialViewSet, ToolCategoryViewSet,
-    ToolAssignmentViewSet, ToolUsageLogViewSet, ToolIncidentViewSet
+    ToolAssignmentViewSet, ToolUsageLogViewSet, ToolIncidentViewSet,
+    DashboardViewSet, BatchViewSet, SyncViewSet
 )
 
 router = DefaultRouter()
@@ -36,7 +38,16 @@ router.register(r'competence-authorizations', CompetenceAuthorizationViewSet, ba
 router.register(r'competence-evidence', CompetenceEvidenceViewSet, basename='competenceevidence')
 router.register(r'people', PersonViewSet, basename='person')
 router.register(r'person-credentials', PersonCredentialViewSet, basename='personcredential')
+router.register(r'dashboard', DashboardViewSet, basename='dashboard')
+router.register(r'batch', BatchViewSet, basename='batch')
+router.register(r'sync', SyncViewSet, basename='sync')
 
 urlpatterns = [
+    # Async views; the first three take precedence over the viewset actions on the same paths
+    path('certificates/public/', async_views.certificate_public, name='certificate-public-async'),
+    path('field-reports/public/', async_views.field_report_public, name='fieldinspectionreport-public-async'),
+    path('stickers/resolve/<str:code>/', async_views.sticker_resolve, name='sticker-resolve-async'),
+    path('files/sign/', async_views.sign_storage_url, name='storage-sign'),
+    path('tasks/<str:task_id>/', async_views.task_status, name='task-status'),
     path('', include(router.urls)),
 ]
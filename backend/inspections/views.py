@@ -1,14 +1,24 @@
+import os
+import uuid
 from datetime import datetime
+from itertools import islice
 
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.settings import api_settings
+from rest_framework.views import set_rollback
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+from django.core.files.storage import default_storage
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime
-from django.db.models import Q, Count, Prefetch
+from django.db import transaction
+from django.db.models import F, Q, Count, Prefetch
+from django.db.models.functions import TruncWeek
 
 from .models import (
     Client, Equipment, JobOrder, JobLineItem, Inspection,
@@ -16,7 +26,7 @@ from .models import (
     FieldInspectionReport, Approval, Publication, Tool, Calibration, User,
     Service, ServiceVersion, CompetenceAuthorization, CompetenceEvidence,
     Person, PersonCredential, ToolCategory, ToolAssignment, ToolUsageLog,
-    ToolIncident
+    ToolIncident, AuditLog, VersionConflict
 )
 from .serializers import (
     ClientSerializer, EquipmentSerializer, JobOrderSerializer,
@@ -28,12 +38,51 @@ from .serializers import (
     InspectionSubmitSerializer, ServiceSerializer, ServiceVersionSerializer,
     CompetenceAuthorizationSerializer, CompetenceEvidenceSerializer,
     PersonSerializer, PersonCredentialSerializer, ToolCategorySerializer,
-    ToolAssignmentSerializer, ToolUsageLogSerializer, ToolIncidentSerializer
+    ToolAssignmentSerializer, ToolUsageLogSerializer, ToolIncidentSerializer,
+    BatchRequestSerializer, InspectionInboxSerializer, InspectionBulkDecisionSerializer,
+    RegisterImportSerializer
 )
 from .permissions import (
     IsAdmin, IsAdminOrTeamLead, IsInspector, CanApprove,
-    CanPublish, ClientReadOnly, IsOwnerOrAdmin, IsAdminOrTechnicalManager
+    CanPublish, ClientReadOnly, IsOwnerOrAdmin, IsAdminOrTechnicalManager,
+    IsStaffMember
 )
+from . import async_cache, rollups
+from .batch import run_batch
+from .equipment_bulk import upsert_equipment
+from .exports import ExportMixin
+from .imports import REGISTERS
+from .db_router import use_primary, use_replica
+from .pagination import EstimatedCountPagination
+from .parsers import NDJSONParser
+from .rollups import read_dashboard
+from .search import FullTextSearchFilter, SearchRankOrderingFilter
+from .stickers import generate_stickers
+from .sync import collect_changes, InvalidSyncToken, ExpiredSyncToken
+from .scoping import get_client_ids
+
+
+def _start_register_import(request, register):
+    """Store an uploaded register and import it in the background"""
+    serializer = RegisterImportSerializer(
+        data=request.data, context={'client_required': REGISTERS[register].client == 'required'}
+    )
+    serializer.is_valid(raise_exception=True)
+    upload = serializer.validated_data['file']
+    client = serializer.validated_data.get('client')
+    
+    path = default_storage.save(
+        f'imports/{uuid.uuid4().hex}{os.path.splitext(upload.name)[1].lower()}', upload
+    )
+    
+    from .tasks import import_register_task
+    
+    task = import_register_task.delay(register, path, request.user.id, client.id if client else None)
+    
+    return Response({
+        'message': f'Import of {register} register started',
+        'task_id': task.id
+    }, status=status.HTTP_202_ACCEPTED)
 
 
 def _parse_datetime_param(value):
@@ -52,12 +101,62 @@ def _parse_datetime_param(value):
     return dt
 
 
+def _item_error_results(submitted, list_errors, key):
+    """
+    Per-item results for a rejected bulk request, or None if the errors aren't
+    per item. Each result echoes the item's `key` field.
+    """
+    if isinstance(list_errors, list) and list_errors and all(isinstance(e, dict) for e in list_errors):
+        list_errors = dict(enumerate(list_errors))
+    elif not (isinstance(list_errors, dict) and all(str(index).isdigit() for index in list_errors)):
+        return None
+    item_errors = {int(index): errors for index, errors in list_errors.items() if errors}
+    return [
+        {
+            'index': index,
+            key: item.get(key) if isinstance(item, dict) else None,
+            'status': 'invalid' if index in item_errors else 'valid',
+            'errors': item_errors.get(index, {}),
+        }
+        for index, item in enumerate(submitted if isinstance(submitted, list) else [])
+    ]
+
+
+def _expect_version(instance, data):
+    """
+    Make the next save of `instance` expect the `version` the client sent, if
+    any. Returns an error Response for an unusable value.
+    """
+    if data.get('version') in (None, ''):
+        return None
+    try:
+        instance.version = int(data['version'])
+    except (TypeError, ValueError):
+        return Response({'error': 'version must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    return None
+
+
+class VersionConflictMixin:
+    """Answer 409 with the row's current state when a save loses an optimistic concurrency race"""
+    
+    def handle_exception(self, exc):
+        if not isinstance(exc, VersionConflict):
+            return super().handle_exception(exc)
+        set_rollback()
+        current = self.get_queryset().filter(pk=exc.instance.pk).first()
+        return Response({
+            'error': f'This {exc.instance._meta.verbose_name} was changed by another request; '
+                     'review the current version and retry',
+            'current': self.get_serializer(current).data if current is not None else None,
+        }, status=status.HTTP_409_CONFLICT)
+
+
 class ServiceViewSet(viewsets.ModelViewSet):
     """ViewSet for governed services"""
     queryset = Service.objects.prefetch_related('versions').all()
     serializer_class = ServiceSerializer
     permission_classes = [IsAuthenticated, IsAdmin]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, SearchRankOrderingFilter]
     filterset_fields = ['category', 'status']
     search_fields = ['code', 'name_en', 'name_ar', 'discipline']
     ordering_fields = ['code', 'name_en', 'created_at']
@@ -76,7 +175,7 @@ class CompetenceAuthorizationViewSet(viewsets.ModelViewSet):
     queryset = CompetenceAuthorization.objects.select_related('user', 'service', 'created_by', 'updated_by').prefetch_related('evidence_items')
     serializer_class = CompetenceAuthorizationSerializer
     permission_classes = [IsAuthenticated, IsAdminOrTechnicalManager]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, SearchRankOrderingFilter]
     filterset_fields = ['user', 'service', 'status', 'level']
     search_fields = ['user__first_name', 'user__last_name', 'user__username', 'discipline', 'service__code']
     ordering_fields = ['valid_from', 'valid_until', 'updated_at']
@@ -95,7 +194,7 @@ class CompetenceEvidenceViewSet(viewsets.ModelViewSet):
     queryset = CompetenceEvidence.objects.select_related('authorization__user', 'authorization__service')
     serializer_class = CompetenceEvidenceSerializer
     permission_classes = [IsAuthenticated, IsAdminOrTechnicalManager]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, SearchRankOrderingFilter]
     filterset_fields = ['authorization', 'evidence_type', 'issued_on']
     search_fields = ['issued_by', 'reference_code', 'authorization__user__username']
     ordering_fields = ['issued_on', 'created_at']
@@ -108,7 +207,7 @@ class PersonViewSet(viewsets.ModelViewSet):
     queryset = Person.objects.select_related('client', 'created_by', 'updated_by').prefetch_related('credentials')
     serializer_class = PersonSerializer
     permission_classes = [IsAuthenticated, IsAdminOrTechnicalManager]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, SearchRankOrderingFilter]
     filterset_fields = ['person_type', 'client']
     search_fields = ['first_name', 'last_name', 'email', 'employer', 'client__name']
     ordering_fields = ['last_name', 'person_type', 'created_at']
@@ -120,6 +219,11 @@ class PersonViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         serializer.save(updated_by=self.request.user)
 
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_register(self, request):
+        """Import a people register (XLSX or CSV) in the background; every row creates a person"""
+        return _start_register_import(request, 'people')
+
 
 class PersonCredentialViewSet(viewsets.ModelViewSet):
     """ViewSet for person credentials."""
@@ -127,7 +231,7 @@ class PersonCredentialViewSet(viewsets.ModelViewSet):
     queryset = PersonCredential.objects.select_related('person', 'person__client')
     serializer_class = PersonCredentialSerializer
     permission_classes = [IsAuthenticated, IsAdminOrTechnicalManager]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, SearchRankOrderingFilter]
     filterset_fields = ['person', 'status']
     search_fields = ['person__first_name', 'person__last_name', 'credential_name', 'reference_code']
     ordering_fields = ['issued_on', 'valid_until', 'created_at']
@@ -155,7 +259,7 @@ class UserViewSet(viewsets.ModelViewSet):
     """ViewSet for users."""
 
     serializer_class = UserSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [FullTextSearchFilter, SearchRankOrderingFilter]
     search_fields = ['username', 'email', 'first_name', 'last_name']
     ordering_fields = ['username', 'role']
     ordering = ['username']
@@ -187,7 +291,7 @@ class ClientViewSet(viewsets.ModelViewSet):
     queryset = Client.objects.all()
     serializer_class = ClientSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, SearchRankOrderingFilter]
     filterset_fields = ['is_active']
     search_fields = ['name', 'contact_person', 'email']
     ordering_fields = ['name', 'created_at']
@@ -200,16 +304,23 @@ class ClientViewSet(viewsets.ModelViewSet):
         serializer.save(updated_by=self.request.user)
 
 
-class EquipmentViewSet(viewsets.ModelViewSet):
+class EquipmentViewSet(ExportMixin, viewsets.ModelViewSet):
     """ViewSet for equipment"""
     queryset = Equipment.objects.select_related('client').all()
     serializer_class = EquipmentSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, SearchRankOrderingFilter]
     filterset_fields = ['client', 'type']
     search_fields = ['tag_code', 'serial_number', 'manufacturer', 'model']
     ordering_fields = ['tag_code', 'next_due', 'created_at']
     ordering = ['tag_code']
+    export_fields = [
+        'tag_code', ('client__name', 'Client'), 'type', 'manufacturer', 'model',
+        'serial_number', ('swl', 'SWL'), 'location', 'next_due',
+    ]
+    due_soon_max_days = 365
+    # bulk: two reads and up to two writes per chunk, plus the transaction and auth
+    query_budget = {'bulk': 4 * (settings.EQUIPMENT_BULK_MAX // settings.EQUIPMENT_BULK_CHUNK_SIZE + 1) + 10}
     
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
@@ -217,40 +328,147 @@ class EquipmentViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         serializer.save(updated_by=self.request.user)
     
+    @action(
+        detail=False, methods=['post'], permission_classes=[IsStaffMember],
+        parser_classes=[*api_settings.DEFAULT_PARSER_CLASSES, NDJSONParser]
+    )
+    def bulk(self, request):
+        """
+        Create or update many equipment rows, matched by tag_code. Send a JSON
+        array, or NDJSON (one row per line) to stream large registers. Every
+        row is validated before anything is committed; the response lists
+        each row's outcome in request order.
+        """
+        rows = request.data
+        if isinstance(rows, (dict, str)) or not hasattr(rows, '__iter__'):
+            return Response(
+                {'error': 'Expected a list of equipment rows'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        limit = settings.EQUIPMENT_BULK_MAX
+        with transaction.atomic():
+            results, valid = upsert_equipment(islice(rows, limit + 1), request.user)
+            if len(results) > limit:
+                transaction.set_rollback(True)
+                return Response(
+                    {'error': f'At most {limit} equipment rows can be sent per request'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if not results:
+                return Response(
+                    {'error': 'Expected a list of equipment rows'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if not valid:
+                transaction.set_rollback(True)
+                return Response(
+                    {'error': 'Validation failed; no equipment was saved', 'results': results},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        return Response({
+            'created': sum(result['status'] == 'created' for result in results),
+            'updated': sum(result['status'] == 'updated' for result in results),
+            'results': results,
+        }, status=status.HTTP_200_OK)
+    
+    @action(
+        detail=False, methods=['post'], url_path='import', permission_classes=[IsStaffMember],
+        parser_classes=[MultiPartParser]
+    )
+    def import_register(self, request):
+        """
+        Import a client's equipment register (XLSX or CSV) in the background,
+        matching equipment by tag_code. Poll /api/tasks/{task_id}/ for progress.
+        """
+        return _start_register_import(request, 'equipment')
+    
     @action(detail=False, methods=['get'])
     def due_soon(self, request):
-        """Get equipment due for inspection soon"""
-        days = int(request.query_params.get('days', 30))
+        """Get a paginated forecast of equipment due for inspection, with week/client buckets"""
+        try:
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            return Response({'error': 'days must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if days < 0 or days > self.due_soon_max_days:
+            return Response(
+                {'error': f'days must be between 0 and {self.due_soon_max_days}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         today = timezone.now().date()
         future_date = today + timezone.timedelta(days=days)
-        
-        equipment = self.queryset.filter(
+
+        equipment = self.filter_queryset(self.get_queryset()).filter(
             next_due__gte=today,
             next_due__lte=future_date
         )
-        
-        serializer = self.get_serializer(equipment, many=True)
-        return Response(serializer.data)
+        if 'ordering' not in request.query_params:
+            equipment = equipment.order_by('next_due', 'tag_code')
+
+        # One GROUP BY (week, client) query; both bucket lists are folded from it.
+        by_week = {}
+        by_client = {}
+        rows = equipment.order_by().values(
+            'client_id', 'client__name', week=TruncWeek('next_due')
+        ).annotate(total=Count('pk'))
+        for row in rows:
+            week = row['week'].date() if isinstance(row['week'], datetime) else row['week']
+            by_week[week] = by_week.get(week, 0) + row['total']
+            client_bucket = by_client.setdefault(
+                row['client_id'],
+                {'client': row['client_id'], 'client_name': row['client__name'], 'count': 0}
+            )
+            client_bucket['count'] += row['total']
+
+        buckets = {
+            'by_week': [{'week_start': week, 'count': count} for week, count in sorted(by_week.items())],
+            'by_client': sorted(by_client.values(), key=lambda bucket: (-bucket['count'], bucket['client_name'])),
+        }
+        window = {'from': today, 'to': future_date, 'days': days}
 
+        page = self.paginate_queryset(equipment)
+        serializer = self.get_serializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
+        response.data['window'] = window
+        response.data['buckets'] = buckets
+        return response
 
-class JobOrderViewSet(viewsets.ModelViewSet):
+
+class JobOrderViewSet(ExportMixin, viewsets.ModelViewSet):
     """ViewSet for job orders"""
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, SearchRankOrderingFilter]
     filterset_fields = ['client', 'status', 'finance_status']
     search_fields = ['po_reference', 'site_location']
     ordering_fields = ['created_at', 'scheduled_start', 'status']
     ordering = ['-created_at']
+    export_fields = [
+        'id', ('client__name', 'Client'), ('po_reference', 'PO reference'), 'status', 'site_location',
+        'scheduled_start', 'scheduled_end', 'tentative_date', 'invoice_number',
+        'finance_status', 'created_at',
+    ]
     
     def get_queryset(self):
-        queryset = JobOrder.objects.select_related('client', 'created_by').prefetch_related(
-            Prefetch('line_items', queryset=JobLineItem.objects.select_related('equipment'))
-        )
+        queryset = JobOrder.objects.select_related('client', 'created_by')
+        if self.action != 'assign':
+            # Assignment works on line item ids and never serializes the job order
+            line_items = JobLineItem.objects.select_related('equipment__client')
+            if self.action != 'list':
+                # Detail responses nest inspections with their answers and photos
+                line_items = line_items.prefetch_related(
+                    Prefetch(
+                        'inspections',
+                        queryset=Inspection.objects.select_related('inspector').prefetch_related('answers__photos', 'photos')
+                    )
+                )
+            queryset = queryset.prefetch_related(Prefetch('line_items', queryset=line_items))
         
         # Filter by role
         if self.request.user.role == 'CLIENT':
             # Clients only see their own job orders
-            queryset = queryset.filter(client__email=self.request.user.email)
+            queryset = queryset.filter(client_id__in=get_client_ids(self.request))
         elif self.request.user.role == 'INSPECTOR':
             # Inspectors see job orders assigned to them
             queryset = queryset.filter(
@@ -283,27 +501,51 @@ class JobOrderViewSet(viewsets.ModelViewSet):
         
         inspector = get_object_or_404(User, id=inspector_id, role='INSPECTOR')
         
-        # Get line items to assign
+        line_items = job_order.line_items.all()
         if line_item_ids:
-            line_items = job_order.line_items.filter(id__in=line_item_ids)
-        else:
-            line_items = job_order.line_items.all()
-        
-        # Create inspections for each line item
-        inspections_created = []
-        for line_item in line_items:
-            inspection, created = Inspection.objects.get_or_create(
-                job_line_item=line_item,
-                defaults={
-                    'inspector': inspector,
-                    'status': 'DRAFT',
-                    'created_by': request.user
-                }
+            line_items = line_items.filter(id__in=line_item_ids)
+        
+        now = timezone.now()
+        with transaction.atomic():
+            # Locking the line items serializes concurrent assignments of the same
+            # items, so the existence check below sees any inspection created first
+            locked_ids = list(line_items.select_for_update().order_by('id').values_list('id', flat=True))
+            assigned_ids = set(
+                Inspection.objects.filter(job_line_item_id__in=locked_ids).values_list('job_line_item_id', flat=True)
             )
-            if created:
-                inspections_created.append(inspection.id)
-                line_item.status = 'ASSIGNED'
-                line_item.save()
+            new_ids = [line_item_id for line_item_id in locked_ids if line_item_id not in assigned_ids]
+            
+            inspections = Inspection.objects.bulk_create([
+                Inspection(
+                    job_line_item_id=line_item_id,
+                    inspector=inspector,
+                    status='DRAFT',
+                    created_by=request.user
+                )
+                for line_item_id in new_ids
+            ])
+            JobLineItem.objects.filter(id__in=new_ids).update(status='ASSIGNED', updated_at=now)
+            
+            # bulk_create skips post_save, so write the audit rows, counter updates
+            # and cache invalidation it would have
+            AuditLog.objects.bulk_create([
+                AuditLog(
+                    user=request.user,
+                    action=AuditLog.Action.CREATE,
+                    entity_type='Inspection',
+                    entity_id=inspection.id,
+                    changes={'status': inspection.status}
+                )
+                for inspection in inspections
+            ])
+            rollups.record_change([], [
+                key
+                for inspection in inspections
+                for key in rollups.rollup_keys(Inspection, rollups.instance_values(Inspection, inspection))
+            ])
+            async_cache.invalidate_stickers(assigned_equipment__line_items__in=new_ids)
+        
+        inspections_created = [inspection.id for inspection in inspections]
         
         return Response({
             'message': f'Assigned {len(inspections_created)} inspections to {inspector.get_full_name()}',
@@ -338,7 +580,12 @@ class JobOrderViewSet(viewsets.ModelViewSet):
 
 class JobLineItemViewSet(viewsets.ModelViewSet):
     """ViewSet for job line items"""
-    queryset = JobLineItem.objects.select_related('job_order', 'equipment').all()
+    queryset = JobLineItem.objects.select_related('job_order', 'equipment__client').prefetch_related(
+        Prefetch(
+            'inspections',
+            queryset=Inspection.objects.select_related('inspector').prefetch_related('answers__photos', 'photos')
+        )
+    )
     serializer_class = JobLineItemSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
@@ -352,7 +599,7 @@ class JobLineItemViewSet(viewsets.ModelViewSet):
         serializer.save(updated_by=self.request.user)
 
 
-class InspectionViewSet(viewsets.ModelViewSet):
+class InspectionViewSet(VersionConflictMixin, viewsets.ModelViewSet):
     """ViewSet for inspections"""
     serializer_class = InspectionSerializer
     permission_classes = [IsAuthenticated]
@@ -363,16 +610,18 @@ class InspectionViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         queryset = Inspection.objects.select_related(
             'job_line_item__job_order__client',
-            'job_line_item__equipment',
+            'job_line_item__equipment__client',
             'inspector'
-        ).prefetch_related('answers', 'photos')
+        )
+        if self.action not in ['upsert_answers', 'inbox', 'decide']:
+            queryset = queryset.prefetch_related('answers__photos', 'photos')
         
         # Filter by role
         if self.request.user.role == 'INSPECTOR':
             queryset = queryset.filter(inspector=self.request.user)
         elif self.request.user.role == 'CLIENT':
             queryset = queryset.filter(
-                job_line_item__job_order__client__email=self.request.user.email,
+                job_line_item__job_order__client_id__in=get_client_ids(self.request),
                 status='APPROVED'
             )
         
@@ -391,6 +640,9 @@ class InspectionViewSet(viewsets.ModelViewSet):
     def submit(self, request, pk=None):
         """Submit inspection for review"""
         inspection = self.get_object()
+        version_error = _expect_version(inspection, request.data)
+        if version_error is not None:
+            return version_error
         
         # Verify inspector owns this inspection
         if inspection.inspector != request.user and request.user.role != 'ADMIN':
@@ -412,14 +664,109 @@ class InspectionViewSet(viewsets.ModelViewSet):
         # Update line item status
         inspection.job_line_item.status = 'COMPLETED'
         inspection.job_line_item.save()
+        async_cache.invalidate_stickers(assigned_equipment=inspection.job_line_item.equipment_id)
         
         serializer = self.get_serializer(inspection)
         return Response(serializer.data)
     
+    @action(detail=True, methods=['post'], url_path='answers', permission_classes=[IsInspector])
+    def upsert_answers(self, request, pk=None):
+        """
+        Create or update many checklist answers in one request. Every answer is
+        validated before anything is written; the response lists each answer's
+        outcome in request order.
+        """
+        inspection = self.get_object()
+        
+        if inspection.inspector != request.user and request.user.role != 'ADMIN':
+            return Response(
+                {'error': 'You can only answer your own inspections'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        if inspection.status not in ['DRAFT', 'IN_PROGRESS']:
+            return Response(
+                {'error': 'Answers can only be changed on draft or in-progress inspections'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        serializer = InspectionSubmitSerializer(data=request.data)
+        if not serializer.is_valid():
+            errors = dict(serializer.errors)
+            submitted = serializer.fields['answers'].get_value(request.data)
+            results = _item_error_results(submitted, errors.get('answers'), 'question_key')
+            if results is not None:
+                errors.pop('answers')
+                errors['results'] = results
+            return Response(
+                {'error': 'Validation failed; no answers were saved', **errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        data = serializer.validated_data
+        
+        with transaction.atomic():
+            # Lock the inspection so a concurrent submit or upsert waits, then
+            # re-check it and read the existing answers under the lock
+            inspection = Inspection.objects.select_for_update().get(pk=inspection.pk)
+            if inspection.status not in ['DRAFT', 'IN_PROGRESS']:
+                return Response(
+                    {'error': 'Answers can only be changed on draft or in-progress inspections'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            answers = [InspectionAnswer(inspection=inspection, **answer) for answer in data['answers']]
+            existing = set(
+                inspection.answers.filter(
+                    question_key__in=[answer.question_key for answer in answers]
+                ).values_list('question_key', flat=True)
+            )
+            
+            # One INSERT ... ON CONFLICT (inspection_id, question_key) DO UPDATE per batch
+            saved = InspectionAnswer.objects.bulk_create(
+                answers,
+                update_conflicts=True,
+                unique_fields=['inspection', 'question_key'],
+                update_fields=['result', 'comment', 'updated_at'],
+            )
+            # The upsert is last-write-wins; bumping the versions makes single-answer
+            # edits based on an earlier read conflict instead of undoing it
+            InspectionAnswer.objects.filter(
+                inspection=inspection, question_key__in=existing
+            ).update(version=F('version') + 1)
+            
+            signature_fields = [
+                field for field in ['inspector_signature', 'client_signature'] if field in data
+            ]
+            for field in signature_fields:
+                setattr(inspection, field, data[field])
+            if signature_fields:
+                inspection.updated_by = request.user
+                inspection.save(update_fields=[*signature_fields, 'updated_by', 'updated_at'])
+        
+        results = [
+            {
+                'index': index,
+                'question_key': answer.question_key,
+                'id': answer.pk,
+                'status': 'updated' if answer.question_key in existing else 'created',
+            }
+            for index, answer in enumerate(saved)
+        ]
+        return Response({
+            'inspection': inspection.id,
+            'created': sum(result['status'] == 'created' for result in results),
+            'updated': sum(result['status'] == 'updated' for result in results),
+            'results': results,
+        }, status=status.HTTP_200_OK)
+    
     @action(detail=True, methods=['post'], permission_classes=[CanApprove])
+    @use_primary()
     def approve(self, request, pk=None):
         """Approve inspection"""
         inspection = self.get_object()
+        version_error = _expect_version(inspection, request.data)
+        if version_error is not None:
+            return version_error
         
         if inspection.status != 'SUBMITTED':
             return Response(
@@ -429,26 +776,33 @@ class InspectionViewSet(viewsets.ModelViewSet):
         
         comment = request.data.get('comment', '')
         
-        # Create approval record
-        Approval.objects.create(
-            entity_type='INSPECTION',
-            entity_id=inspection.id,
-            approver=request.user,
-            decision='APPROVED',
-            comment=comment,
-            decided_at=timezone.now()
-        )
-        
-        inspection.status = 'APPROVED'
-        inspection.save()
+        with transaction.atomic():
+            # Save first: a version conflict must not leave a decision behind
+            inspection.status = 'APPROVED'
+            inspection.save()
+            
+            # Create approval record
+            Approval.objects.create(
+                entity_type='INSPECTION',
+                entity_id=inspection.id,
+                approver=request.user,
+                decision='APPROVED',
+                comment=comment,
+                decided_at=timezone.now()
+            )
+            async_cache.invalidate_stickers(assigned_equipment=inspection.job_line_item.equipment_id)
         
         serializer = self.get_serializer(inspection)
         return Response(serializer.data)
     
     @action(detail=True, methods=['post'], permission_classes=[CanApprove])
+    @use_primary()
     def reject(self, request, pk=None):
         """Reject inspection"""
         inspection = self.get_object()
+        version_error = _expect_version(inspection, request.data)
+        if version_error is not None:
+            return version_error
         
         if inspection.status != 'SUBMITTED':
             return Response(
@@ -463,28 +817,148 @@ class InspectionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Create approval record
-        Approval.objects.create(
-            entity_type='INSPECTION',
-            entity_id=inspection.id,
-            approver=request.user,
-            decision='REJECTED',
-            comment=comment,
-            decided_at=timezone.now()
-        )
-        
-        inspection.status = 'REJECTED'
-        inspection.save()
+        with transaction.atomic():
+            # Save first: a version conflict must not leave a decision behind
+            inspection.status = 'REJECTED'
+            inspection.save()
+            
+            # Create approval record
+            Approval.objects.create(
+                entity_type='INSPECTION',
+                entity_id=inspection.id,
+                approver=request.user,
+                decision='REJECTED',
+                comment=comment,
+                decided_at=timezone.now()
+            )
+            async_cache.invalidate_stickers(assigned_equipment=inspection.job_line_item.equipment_id)
         
         serializer = self.get_serializer(inspection)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'], permission_classes=[CanApprove])
+    def inbox(self, request):
+        """Submitted inspections awaiting a decision, oldest submission first"""
+        inspections = self.filter_queryset(self.get_queryset()).filter(status='SUBMITTED')
+        if 'ordering' not in request.query_params:
+            inspections = inspections.order_by('end_time', 'id')
+        
+        page = self.paginate_queryset(inspections)
+        serializer = InspectionInboxSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+    
+    @action(detail=False, methods=['post'], url_path='decisions', permission_classes=[CanApprove])
+    @use_primary()
+    def decide(self, request):
+        """
+        Approve or reject many submitted inspections in one transaction. Every
+        decision is validated before anything is written; the response lists
+        each decision's outcome in request order.
+        """
+        serializer = InspectionBulkDecisionSerializer(data=request.data)
+        if not serializer.is_valid():
+            errors = dict(serializer.errors)
+            submitted = serializer.fields['decisions'].get_value(request.data)
+            results = _item_error_results(submitted, errors.get('decisions'), 'inspection')
+            if results is not None:
+                errors.pop('decisions')
+                errors['results'] = results
+            return Response(
+                {'error': 'Validation failed; no decisions were applied', **errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        decisions = serializer.validated_data['decisions']
+        ids = [decision['inspection'] for decision in decisions]
+        now = timezone.now()
+        
+        with transaction.atomic():
+            # Lock the inspections so a concurrent decision on any of them waits and then fails validation
+            current = dict(
+                Inspection.objects.filter(id__in=ids).select_for_update()
+                .order_by('id').values_list('id', 'status')
+            )
+            errors = [
+                {'inspection': ['Inspection not found.']} if inspection_id not in current
+                else {'status': ['Only submitted inspections can be approved or rejected.']}
+                if current[inspection_id] != 'SUBMITTED' else {}
+                for inspection_id in ids
+            ]
+            if any(errors):
+                return Response({
+                    'error': 'Validation failed; no decisions were applied',
+                    'results': _item_error_results(decisions, errors, 'inspection'),
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            approvals = Approval.objects.bulk_create([
+                Approval(
+                    entity_type='INSPECTION',
+                    entity_id=decision['inspection'],
+                    approver=request.user,
+                    decision=decision['decision'],
+                    comment=decision['comment'],
+                    decided_at=now
+                )
+                for decision in decisions
+            ])
+            for decision_value in ['APPROVED', 'REJECTED']:
+                decided_ids = [d['inspection'] for d in decisions if d['decision'] == decision_value]
+                if decided_ids:
+                    Inspection.objects.filter(id__in=decided_ids).update(
+                        status=decision_value, updated_by=request.user, updated_at=now,
+                        version=F('version') + 1
+                    )
+            
+            # bulk_create and update() skip post_save, so write the audit rows, counter
+            # updates and cache invalidation they would have
+            AuditLog.objects.bulk_create([
+                log
+                for approval in approvals
+                for log in [
+                    AuditLog(
+                        user=request.user,
+                        action=AuditLog.Action.APPROVE if approval.decision == 'APPROVED' else AuditLog.Action.REJECT,
+                        entity_type=approval.entity_type,
+                        entity_id=approval.entity_id,
+                        changes={'decision': approval.decision, 'comment': approval.comment}
+                    ),
+                    AuditLog(
+                        user=request.user,
+                        action=AuditLog.Action.UPDATE,
+                        entity_type='Inspection',
+                        entity_id=approval.entity_id,
+                        changes={'status': approval.decision}
+                    ),
+                ]
+            ])
+            rollups.record_change(
+                [key for _ in decisions for key in rollups.rollup_keys(Inspection, {'status': 'SUBMITTED'})],
+                [key for d in decisions for key in rollups.rollup_keys(Inspection, {'status': d['decision']})],
+            )
+            async_cache.invalidate_stickers(assigned_equipment__line_items__inspections__in=ids)
+        
+        results = [
+            {
+                'index': index,
+                'inspection': approval.entity_id,
+                'approval': approval.id,
+                'status': approval.decision.lower(),
+            }
+            for index, approval in enumerate(approvals)
+        ]
+        return Response({
+            'approved': sum(result['status'] == 'approved' for result in results),
+            'rejected': sum(result['status'] == 'rejected' for result in results),
+            'results': results,
+        }, status=status.HTTP_200_OK)
 
 
-class InspectionAnswerViewSet(viewsets.ModelViewSet):
+class InspectionAnswerViewSet(VersionConflictMixin, viewsets.ModelViewSet):
     """ViewSet for inspection answers"""
-    queryset = InspectionAnswer.objects.all()
+    queryset = InspectionAnswer.objects.prefetch_related('photos')
     serializer_class = InspectionAnswerSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = EstimatedCountPagination
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['inspection', 'result']
 
@@ -498,25 +972,35 @@ class PhotoRefViewSet(viewsets.ModelViewSet):
     filterset_fields = ['inspection', 'slot_name']
 
 
-class CertificateViewSet(viewsets.ModelViewSet):
+class CertificateViewSet(ExportMixin, viewsets.ModelViewSet):
     """ViewSet for certificates"""
     serializer_class = CertificateSerializer
     permission_classes = [IsAuthenticated, ClientReadOnly]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['status']
     ordering = ['-issued_date']
+    export_fields = [
+        'id', ('qr_code', 'QR code'), 'status', 'issued_date',
+        ('inspection__job_line_item__job_order', 'Job order'),
+        ('inspection__job_line_item__job_order__client__name', 'Client'),
+        ('inspection__job_line_item__equipment__tag_code', 'Tag code'),
+        ('inspection__inspector__username', 'Inspector'),
+        ('generated_by__username', 'Generated by'),
+    ]
     
     def get_queryset(self):
         queryset = Certificate.objects.select_related(
             'inspection__job_line_item__job_order__client',
+            'inspection__job_line_item__equipment__client',
+            'inspection__inspector',
             'generated_by'
-        )
+        ).prefetch_related('inspection__answers__photos', 'inspection__photos')
         
         # Filter by role
         if self.request.user.role == 'CLIENT':
             queryset = queryset.filter(
                 status='PUBLISHED',
-                inspection__job_line_item__job_order__client__email=self.request.user.email
+                inspection__job_line_item__job_order__client_id__in=get_client_ids(self.request)
             )
         
         return queryset
@@ -569,7 +1053,7 @@ class FieldInspectionReportViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet for field inspection reports"""
     serializer_class = FieldInspectionReportSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, SearchRankOrderingFilter]
     filterset_fields = ['job_order']
     search_fields = ['job_order__po_reference', 'job_order__client__name']
     ordering = ['-created_at']
@@ -577,11 +1061,11 @@ class FieldInspectionReportViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         queryset = FieldInspectionReport.objects.select_related(
             'job_order__client'
-        )
+        ).prefetch_related('job_order__line_items')
 
         # Restrict client access to their own reports
         if self.request.user.role == 'CLIENT':
-            queryset = queryset.filter(job_order__client__email=self.request.user.email)
+            queryset = queryset.filter(job_order__client_id__in=get_client_ids(self.request))
 
         created_after = _parse_datetime_param(self.request.query_params.get('created_after'))
         if created_after:
@@ -607,44 +1091,38 @@ class FieldInspectionReportViewSet(viewsets.ReadOnlyModelViewSet):
 
 class StickerViewSet(viewsets.ModelViewSet):
     """ViewSet for stickers"""
-    queryset = Sticker.objects.select_related('assigned_equipment', 'assigned_by').all()
+    queryset = Sticker.objects.select_related('assigned_equipment__client', 'assigned_by').all()
     serializer_class = StickerSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, SearchRankOrderingFilter]
     filterset_fields = ['status']
     search_fields = ['sticker_code']
     ordering = ['sticker_code']
     
     @action(detail=False, methods=['post'], permission_classes=[IsAdminOrTeamLead])
     def generate(self, request):
-        """Generate new sticker codes"""
-        count = int(request.data.get('count', 1))
-        if count < 1 or count > 1000:
+        """Generate new sticker codes (large batches run as a background task)"""
+        try:
+            count = int(request.data.get('count', 1))
+        except (TypeError, ValueError):
+            return Response({'error': 'Count must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if count < 1 or count > settings.STICKER_GENERATE_MAX:
             return Response(
-                {'error': 'Count must be between 1 and 1000'},
+                {'error': f'Count must be between 1 and {settings.STICKER_GENERATE_MAX}'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Get last sticker number
-        last_sticker = Sticker.objects.order_by('-sticker_code').first()
-        if last_sticker:
-            last_number = int(last_sticker.sticker_code.split('-')[1])
-        else:
-            last_number = 0
-        
-        stickers_created = []
-        for i in range(count):
-            number = last_number + i + 1
-            sticker_code = f"TUVINSP-{number:06d}"
-            qr_payload = f"https://inspection-saas.com/sticker/{sticker_code}"
+        if count > settings.STICKER_GENERATE_SYNC_MAX:
+            from .tasks import generate_stickers_task
             
-            sticker = Sticker.objects.create(
-                sticker_code=sticker_code,
-                qr_payload=qr_payload,
-                status='AVAILABLE',
-                created_by=request.user
-            )
-            stickers_created.append(sticker.sticker_code)
+            task = generate_stickers_task.delay(count, request.user.id)
+            
+            return Response({
+                'message': f'Generation of {count} stickers started',
+                'task_id': task.id
+            }, status=status.HTTP_202_ACCEPTED)
+        
+        stickers_created = generate_stickers(count, created_by_id=request.user.id)
         
         return Response({
             'message': f'Generated {count} stickers',
@@ -691,6 +1169,7 @@ class ApprovalViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Approval.objects.select_related('approver').all()
     serializer_class = ApprovalSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = EstimatedCountPagination
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['entity_type', 'decision', 'approver']
     ordering = ['-created_at']
@@ -698,7 +1177,9 @@ class ApprovalViewSet(viewsets.ReadOnlyModelViewSet):
 
 class PublicationViewSet(viewsets.ModelViewSet):
     """ViewSet for publications"""
-    queryset = Publication.objects.select_related('job_order', 'published_by').all()
+    queryset = Publication.objects.select_related('job_order__client', 'published_by').prefetch_related(
+        'job_order__line_items'
+    )
     serializer_class = PublicationSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
@@ -706,6 +1187,7 @@ class PublicationViewSet(viewsets.ModelViewSet):
     ordering = ['-published_at']
     
     @action(detail=False, methods=['post'], permission_classes=[CanPublish])
+    @use_primary()
     def publish_job_order(self, request):
         """Publish all approved certificates for a job order"""
         job_order_id = request.data.get('job_order_id')
@@ -725,27 +1207,55 @@ class PublicationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Update all certificates to published
-        certificates_published = 0
-        for inspection in inspections:
-            if hasattr(inspection, 'certificate'):
-                certificate = inspection.certificate
-                certificate.status = 'PUBLISHED'
-                certificate.save()
-                certificates_published += 1
-        
-        # Create publication record
-        publication = Publication.objects.create(
-            job_order=job_order,
-            published_by=request.user,
-            published_at=timezone.now(),
-            status='PUBLISHED',
-            note=note
-        )
+        now = timezone.now()
+        with transaction.atomic():
+            # Lock the certificates being published; concurrent publishers of the
+            # same job wait here and then find nothing left to publish
+            certificates = Certificate.objects.filter(inspection__in=inspections).exclude(status='PUBLISHED')
+            rows = list(
+                certificates.select_for_update().order_by('id')
+                .values_list('id', 'share_link_token')
+            )
+            certificate_ids = [row[0] for row in rows]
+            Certificate.objects.filter(id__in=certificate_ids).update(
+                status='PUBLISHED', updated_by=request.user, updated_at=now
+            )
+            
+            # Create publication record
+            publication = Publication.objects.create(
+                job_order=job_order,
+                published_by=request.user,
+                published_at=now,
+                status='PUBLISHED',
+                note=note
+            )
+            
+            # update() skips post_save, so write the audit rows and cache
+            # invalidation the certificate signals would have
+            AuditLog.objects.bulk_create([
+                AuditLog(
+                    user=request.user,
+                    action=AuditLog.Action.PUBLISH,
+                    entity_type='Certificate',
+                    entity_id=certificate_id,
+                    changes={'status': 'PUBLISHED', 'publication': publication.id}
+                )
+                for certificate_id in certificate_ids
+            ])
+            async_cache.invalidate(*(async_cache.cache_key('certificate', row[1]) for row in rows))
+            async_cache.invalidate_stickers(assigned_equipment__line_items__inspections__certificate__in=certificate_ids)
+            
+            # Update job order status
+            job_order.status = 'PUBLISHED'
+            job_order.save(update_fields=['status', 'updated_at'])
+            
+            if certificate_ids:
+                from .tasks import send_publication_email
+                transaction.on_commit(
+                    lambda: send_publication_email.delay(publication.id, certificate_ids)
+                )
         
-        # Update job order status
-        job_order.status = 'PUBLISHED'
-        job_order.save()
+        certificates_published = len(certificate_ids)
         
         return Response({
             'message': f'Published {certificates_published} certificates',
@@ -753,16 +1263,20 @@ class PublicationViewSet(viewsets.ModelViewSet):
         }, status=status.HTTP_200_OK)
 
 
-class ToolViewSet(viewsets.ModelViewSet):
+class ToolViewSet(ExportMixin, viewsets.ModelViewSet):
     """ViewSet for tools"""
     queryset = Tool.objects.select_related('assigned_to', 'category').all()
     serializer_class = ToolSerializer
     permission_classes = [IsAuthenticated, IsAdminOrTechnicalManager]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, SearchRankOrderingFilter]
     filterset_fields = ['assigned_to', 'category', 'status', 'assignment_mode']
     search_fields = ['name', 'serial_number', 'location']
     ordering_fields = ['name', 'calibration_due', 'created_at']
     ordering = ['name']
+    export_fields = [
+        'name', 'serial_number', ('category__code', 'Category'), 'status', 'assignment_mode',
+        'location', 'calibration_due', ('assigned_to__username', 'Assigned to'),
+    ]
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
@@ -770,10 +1284,15 @@ class ToolViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         serializer.save(updated_by=self.request.user)
 
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_register(self, request):
+        """Import a tool register (XLSX or CSV) in the background, matching tools by serial_number"""
+        return _start_register_import(request, 'tools')
+
 
 class CalibrationViewSet(viewsets.ModelViewSet):
     """ViewSet for calibrations"""
-    queryset = Calibration.objects.select_related('tool').all()
+    queryset = Calibration.objects.select_related('tool__assigned_to', 'tool__category').all()
     serializer_class = CalibrationSerializer
     permission_classes = [IsAuthenticated, IsAdminOrTechnicalManager]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
@@ -787,7 +1306,7 @@ class ToolCategoryViewSet(viewsets.ModelViewSet):
     queryset = ToolCategory.objects.all()
     serializer_class = ToolCategorySerializer
     permission_classes = [IsAuthenticated, IsAdmin]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, SearchRankOrderingFilter]
     search_fields = ['code', 'name']
     ordering_fields = ['code', 'name']
     ordering = ['code']
@@ -803,11 +1322,11 @@ class ToolAssignmentViewSet(viewsets.ModelViewSet):
     """ViewSet for tool assignments"""
 
     queryset = ToolAssignment.objects.select_related(
-        'tool', 'assigned_user', 'job_order', 'equipment', 'client'
+        'tool__assigned_to', 'tool__category', 'assigned_user', 'job_order', 'equipment', 'client'
     ).all()
     serializer_class = ToolAssignmentSerializer
     permission_classes = [IsAuthenticated, IsAdminOrTechnicalManager]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, SearchRankOrderingFilter]
     filterset_fields = ['tool', 'assignment_type', 'status', 'assigned_user', 'job_order']
     search_fields = ['tool__name', 'tool__serial_number', 'notes']
     ordering_fields = ['assigned_on', 'expected_return']
@@ -823,10 +1342,15 @@ class ToolAssignmentViewSet(viewsets.ModelViewSet):
 class ToolUsageLogViewSet(viewsets.ModelViewSet):
     """ViewSet for tool usage logs"""
 
-    queryset = ToolUsageLog.objects.select_related('tool', 'assignment', 'performed_by').all()
+    queryset = ToolUsageLog.objects.select_related(
+        'tool__assigned_to', 'tool__category', 'performed_by',
+        'assignment__tool__assigned_to', 'assignment__tool__category', 'assignment__assigned_user',
+        'assignment__job_order', 'assignment__equipment', 'assignment__client'
+    ).all()
     serializer_class = ToolUsageLogSerializer
     permission_classes = [IsAuthenticated, IsAdminOrTechnicalManager]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = EstimatedCountPagination
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, SearchRankOrderingFilter]
     filterset_fields = ['tool', 'event_type']
     search_fields = ['tool__name', 'tool__serial_number', 'notes']
     ordering_fields = ['occurred_at']
@@ -836,11 +1360,71 @@ class ToolUsageLogViewSet(viewsets.ModelViewSet):
 class ToolIncidentViewSet(viewsets.ModelViewSet):
     """ViewSet for tool incidents"""
 
-    queryset = ToolIncident.objects.select_related('tool').all()
+    queryset = ToolIncident.objects.select_related('tool__assigned_to', 'tool__category').all()
     serializer_class = ToolIncidentSerializer
     permission_classes = [IsAuthenticated, IsAdminOrTechnicalManager]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, SearchRankOrderingFilter]
     filterset_fields = ['tool', 'incident_type', 'severity']
     search_fields = ['tool__name', 'tool__serial_number', 'description']
     ordering_fields = ['occurred_on', 'severity']
     ordering = ['-occurred_on']
+
+
+class DashboardViewSet(viewsets.ViewSet):
+    """Operations dashboard KPIs served from pre-aggregated rollup counters"""
+    permission_classes = [IsStaffMember]
+    query_budget = 3
+
+    # Counters a few seconds behind are fine here, even right after the user's own writes
+    @use_replica()
+    def list(self, request):
+        return Response(read_dashboard())
+
+
+class BatchViewSet(viewsets.ViewSet):
+    """Run several API requests in one round trip"""
+    permission_classes = [IsAuthenticated]
+    query_budget = settings.BATCH_MAX_REQUESTS * settings.QUERY_BUDGET_DEFAULT
+
+    def create(self, request):
+        serializer = BatchRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        atomic = serializer.validated_data['atomic']
+
+        responses, committed = run_batch(request, serializer.validated_data['requests'], atomic=atomic)
+        return Response({
+            'atomic': atomic,
+            'committed': committed,
+            'responses': responses,
+        })
+
+
+class SyncViewSet(viewsets.ViewSet):
+    """Delta sync for offline inspector devices"""
+    permission_classes = [IsStaffMember]
+    query_budget = 30
+
+    # Cursors assume every row older than the settle window is visible; a lagging replica breaks that
+    @use_primary()
+    def list(self, request):
+        """
+        Everything created, updated or deleted since `token` (omit it for a full sync).
+        Keep calling with the returned sync_token while has_more is true.
+        """
+        token = request.query_params.get('token') or None
+        try:
+            changes, sync_token, has_more = collect_changes(request, token)
+        except InvalidSyncToken:
+            return Response({'error': 'Invalid sync token'}, status=status.HTTP_400_BAD_REQUEST)
+        except ExpiredSyncToken:
+            return Response(
+                {'error': 'Sync token has expired; perform a full sync without a token'},
+                status=status.HTTP_410_GONE
+            )
+
+        return Response({
+            'sync_token': sync_token,
+            'has_more': has_more,
+            'full_sync': token is None,
+            'changes': changes,
+        })